@@ -0,0 +1,110 @@
+"""Coalescence des requêtes : charge Mongo de N GET identiques simultanés.
+
+    python benchmarks/coalescing.py --mongo-url mongodb://localhost:27017
+    python benchmarks/coalescing.py --mongo-url ... --clients 200 --rounds 5
+
+Chaque route reçoit --clients requêtes identiques en parallèle, --rounds fois,
+avec puis sans coalescence (COALESCE_REQUESTS). Le cache de réponses est
+désactivé pour que chaque requête non coalescée aille en base ; on compte les
+commandes Mongo émises (CommandListener) et les exécutions réelles des routes.
+
+La base --db-name est créée (données de /api/init-data) puis supprimée.
+Nécessite un vrai mongod : mongomock exécute chaque opération d'un bloc,
+les requêtes ne se chevauchent jamais et rien n'est coalescé.
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+os.environ.setdefault("DB_NAME", "moviehub_bench")
+
+import httpx  # noqa: E402
+
+import server  # noqa: E402
+from cache import MemoryCache  # noqa: E402
+
+
+def mongo_commands() -> int:
+    return sum(stats[0] for stats in server.metrics.commands.values())
+
+
+async def burst(client, path: str, clients: int) -> float:
+    start = time.perf_counter()
+    responses = await asyncio.gather(*[client.get(path) for _ in range(clients)])
+    elapsed = time.perf_counter() - start
+    for response in responses:
+        response.raise_for_status()
+    return elapsed
+
+
+async def measure(client, path: str, clients: int, rounds: int, coalesce: bool) -> dict:
+    server.cache.flights.enabled = coalesce
+    flights = dict(server.cache.flights.stats)
+    commands = mongo_commands()
+    durations = [await burst(client, path, clients) for _ in range(rounds)]
+    requests = clients * rounds
+    return {
+        "requests": requests,
+        "executions": server.cache.flights.stats["executions"] - flights["executions"],
+        "mongo_commands": mongo_commands() - commands,
+        "mongo_commands_per_request": round((mongo_commands() - commands) / requests, 3),
+        "burst_ms_median": round(statistics.median(durations) * 1000, 2),
+    }
+
+
+async def run(args):
+    mongo_client = server.connect(args.mongo_url)
+    database = mongo_client[args.db_name]
+    server.use_database(database)
+    server.rate_limiter.enabled = False
+    # Chaque entrée est évincée dès son insertion : toutes les lectures vont en base
+    server.cache.backend = MemoryCache(max_entries=0)
+
+    transport = httpx.ASGITransport(app=server.app)
+    results = {}
+    try:
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+            (await client.post("/api/init-data")).raise_for_status()
+            movie_id = (await client.get("/api/movies", params={"limit": 1})).json()["items"][0]["id"]
+            paths = [
+                "/api/movies",
+                f"/api/movies/{movie_id}?expand=actors,genres",
+                "/api/actors",
+                "/api/search?q=the",
+                "/api/stats",
+                "/api/home",
+            ]
+            for path in paths:
+                without = await measure(client, path, args.clients, args.rounds, coalesce=False)
+                with_flights = await measure(client, path, args.clients, args.rounds, coalesce=True)
+                results[path] = {
+                    "without_coalescing": without,
+                    "with_coalescing": with_flights,
+                    "mongo_load_reduction": round(1 - with_flights["mongo_commands"] / max(1, without["mongo_commands"]), 3),
+                }
+                print(f"{path}: {results[path]['mongo_load_reduction']:.1%} fewer Mongo commands", file=sys.stderr)
+    finally:
+        await mongo_client.drop_database(args.db_name)
+
+    print(json.dumps({"clients": args.clients, "rounds": args.rounds, "routes": results}, indent=2))
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mongo-url", required=True, help="Serveur Mongo à utiliser")
+    parser.add_argument("--db-name", default="moviehub_bench_coalescing")
+    parser.add_argument("--clients", type=int, default=100, help="Requêtes identiques simultanées par salve")
+    parser.add_argument("--rounds", type=int, default=3)
+    sys.exit(asyncio.run(run(parser.parse_args())))
+
+
+if __name__ == "__main__":
+    main()
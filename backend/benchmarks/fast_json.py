@@ -0,0 +1,125 @@
+"""CPU par requête de /movies, /actors et /favorites, avec et sans FAST_RESPONSES.
+
+    python benchmarks/fast_json.py --mongo-url mongodb://localhost:27017 --movies 2000
+    python benchmarks/fast_json.py            # mongomock-motor, sans serveur Mongo
+
+Le cache de lecture est vidé avant chaque requête pour mesurer le chemin complet.
+Avec mongomock-motor, le temps CPU inclut aussi la « base » en Python : garder un
+petit catalogue, ou utiliser un vrai mongod pour des chiffres représentatifs.
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+os.environ.setdefault("DB_NAME", "moviehub_bench")
+
+import httpx  # noqa: E402
+
+import server  # noqa: E402
+
+ENDPOINTS = ["/api/movies?limit=100", "/api/actors?limit=100", "/api/favorites"]
+
+
+def build_catalog(movie_count: int, actor_count: int):
+    now = datetime.now(timezone.utc)
+    actors = [
+        {
+            "id": str(uuid.uuid4()),
+            "name": f"Acteur {i}",
+            "age": 20 + i % 60,
+            "image": f"https://example.com/actors/{i}.jpg",
+            "image_settings": {"scale": 100, "positionX": 50, "positionY": 50},
+            "movies": [],
+            "description": "Description de l'acteur " * 5,
+            "genres": [],
+            "is_favorite": i % 10 == 0,
+            "created_at": (now - timedelta(seconds=i)).isoformat(),
+        }
+        for i in range(actor_count)
+    ]
+    movies = [
+        {
+            "id": str(uuid.uuid4()),
+            "title": f"Film {i}",
+            "url": f"https://example.com/movies/{i}",
+            "image": f"https://example.com/movies/{i}.jpg",
+            "image_settings": {"scale": 100, "positionX": 50, "positionY": 50},
+            "actors": [actors[(i + k) % actor_count]["id"] for k in range(5)],
+            "description": "Synopsis du film " * 10,
+            "genres": [],
+            "duration": 90 + i % 60,
+            "is_favorite": i % 10 == 0,
+            "created_at": (now - timedelta(seconds=i)).isoformat(),
+        }
+        for i in range(movie_count)
+    ]
+    return movies, actors
+
+
+async def measure(client, path: str, requests: int) -> float:
+    samples = []
+    for _ in range(requests):
+        await server.cache.clear()
+        start = time.process_time()
+        response = await client.get(path)
+        samples.append(time.process_time() - start)
+        response.raise_for_status()
+    return statistics.median(samples) * 1000
+
+
+async def run(args):
+    if args.mongo_url:
+        database = server.connect(args.mongo_url)[args.db_name]
+    else:
+        import mongomock_motor
+        database = mongomock_motor.AsyncMongoMockClient()[args.db_name]
+    server.use_database(database)
+
+    movies, actors = build_catalog(args.movies, args.actors)
+    await database.movies.delete_many({})
+    await database.actors.delete_many({})
+    # Au format de stockage de l'API (dates BSON, valeurs par défaut omises)
+    await database.movies.insert_many([server.CODECS["movies"].encode(movie) for movie in movies])
+    await database.actors.insert_many([server.CODECS["actors"].encode(actor) for actor in actors])
+
+    results = {}
+    transport = httpx.ASGITransport(app=server.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for path in ENDPOINTS:
+            server.FAST_RESPONSES = False
+            baseline = await measure(client, path, args.requests)
+            server.FAST_RESPONSES = True
+            fast = await measure(client, path, args.requests)
+            results[path] = {
+                "baseline_cpu_ms": round(baseline, 3),
+                "fast_cpu_ms": round(fast, 3),
+                "speedup": round(baseline / fast, 2) if fast else None,
+            }
+
+    if args.mongo_url:
+        await database.movies.drop()
+        await database.actors.drop()
+    print(json.dumps(results, indent=2))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mongo-url", help="Serveur Mongo à utiliser (mongomock-motor par défaut)")
+    parser.add_argument("--db-name", default="moviehub_bench")
+    parser.add_argument("--movies", type=int, default=200)
+    parser.add_argument("--actors", type=int, default=150)
+    parser.add_argument("--requests", type=int, default=50)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
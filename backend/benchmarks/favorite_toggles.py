@@ -0,0 +1,107 @@
+"""Toggles de favoris concurrents : aucun toggle ne doit être perdu.
+
+    python benchmarks/favorite_toggles.py --mongo-url mongodb://localhost:27017
+    python benchmarks/favorite_toggles.py --mongo-url ... --toggles 500 --concurrency 100
+
+Chaque scénario part d'un film non favori et envoie N toggles en parallèle.
+L'état final doit valoir N % 2 et exactement ceil(N / 2) réponses doivent
+annoncer « favori » : chaque toggle a vu l'état laissé par le précédent.
+Le scénario « two-step » rejoue l'ancienne implémentation (find_one puis
+update_one) pour comparaison ; il perd des toggles dès que deux requêtes
+se chevauchent.
+
+Nécessite un vrai mongod : mongomock exécute chaque opération d'un bloc
+(aucune concurrence) et n'évalue pas correctement $not dans un pipeline.
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+import uuid
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+os.environ.setdefault("DB_NAME", "moviehub_bench")
+
+import httpx  # noqa: E402
+
+import server  # noqa: E402
+
+
+async def two_step_toggle(database, movie_id: str) -> bool:
+    movie = await database.movies.find_one({"id": movie_id})
+    new_favorite_status = not movie.get("is_favorite", False)
+    await database.movies.update_one({"id": movie_id}, {"$set": {"is_favorite": new_favorite_status}})
+    return new_favorite_status
+
+
+async def run_scenario(name: str, toggle, database, toggles: int, concurrency: int) -> dict:
+    movie_id = str(uuid.uuid4())
+    await database.movies.insert_one({"id": movie_id, "title": f"Toggle {name}", "is_favorite": False})
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one():
+        async with semaphore:
+            return await toggle(movie_id)
+
+    start = time.perf_counter()
+    states = await asyncio.gather(*[one() for _ in range(toggles)])
+    elapsed = time.perf_counter() - start
+
+    # « non favori » est stocké comme un champ absent
+    final = (await database.movies.find_one({"id": movie_id})).get("is_favorite", False)
+    expected_final = toggles % 2 == 1
+    # Chaque réponse « favori » correspond à un toggle appliqué depuis « non favori »
+    favorites_seen = sum(states)
+    expected_favorites = (toggles + 1) // 2
+    await database.movies.delete_one({"id": movie_id})
+    return {
+        "toggles": toggles,
+        "concurrency": concurrency,
+        "final_is_favorite": final,
+        "expected_final": expected_final,
+        "favorite_responses": favorites_seen,
+        "expected_favorite_responses": expected_favorites,
+        "ok": final == expected_final and favorites_seen == expected_favorites,
+        "toggles_per_second": round(toggles / elapsed, 1),
+    }
+
+
+async def run(args):
+    database = server.connect(args.mongo_url)[args.db_name]
+    server.use_database(database)
+    # Un seul client (ASGITransport) : la limitation de débit fausserait la mesure
+    server.rate_limiter.enabled = False
+
+    transport = httpx.ASGITransport(app=server.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        async def endpoint_toggle(movie_id: str) -> bool:
+            response = await client.patch(f"/api/movies/{movie_id}/favorite")
+            response.raise_for_status()
+            return response.json()["is_favorite"]
+
+        results = {
+            "atomic": await run_scenario("atomic", endpoint_toggle, database, args.toggles, args.concurrency),
+            "two-step": await run_scenario(
+                "two-step", lambda movie_id: two_step_toggle(database, movie_id), database, args.toggles, args.concurrency
+            ),
+        }
+
+    print(json.dumps(results, indent=2))
+    return 0 if results["atomic"]["ok"] else 1
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mongo-url", required=True, help="Serveur Mongo à utiliser")
+    parser.add_argument("--db-name", default="moviehub_bench")
+    parser.add_argument("--toggles", type=int, default=201)
+    parser.add_argument("--concurrency", type=int, default=50)
+    sys.exit(asyncio.run(run(parser.parse_args())))
+
+
+if __name__ == "__main__":
+    main()
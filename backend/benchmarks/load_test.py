@@ -0,0 +1,479 @@
+"""Test de charge de l'API : latences p50/p95/p99 et req/s par route, en JSON.
+
+    python benchmarks/load_test.py                              # mongomock-motor, petit catalogue
+    python benchmarks/load_test.py --mongo-url mongodb://localhost:27017 --movies 100000
+    python benchmarks/load_test.py --mongo-url ... --skip-seed --routes "GET /movies,GET /search"
+    python benchmarks/load_test.py --no-cache --concurrency 64 --requests 500 -o before.json
+
+Le catalogue synthétique est déterministe (mêmes ids et mêmes liens pour les
+mêmes paramètres) : deux exécutions sont comparables. Chaque film référence
+--actors-per-movie acteurs et --genres-per-movie genres, et chaque acteur
+reçoit en retour les films qui le citent.
+
+Les requêtes passent par httpx.AsyncClient sur l'application ASGI (pas de
+réseau) avec --concurrency requêtes en vol. Les routes d'écriture créent puis
+suppriment leurs propres documents ; le catalogue seedé n'est pas modifié,
+hormis les favoris et réglages d'image.
+
+mongomock-motor ne connaît pas explain : /admin/indexes y répond 500.
+Les erreurs sont comptées par statut plutôt que d'interrompre la mesure ;
+utiliser un vrai mongod pour des chiffres représentatifs.
+
+L'application est démarrée par son lifespan (index, compteurs, flux de
+changements, index de similarité) ; la mesure commence une fois l'index
+/related construit. /events est mesuré jusqu'au premier fragment du flux SSE.
+Les routes de l'API absentes de la table (hors UNMEASURED) sont signalées sur
+stderr et dans le rapport.
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import sys
+import time
+import uuid
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Callable, Iterator, List, NamedTuple, Optional
+from urllib.parse import urlencode
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+os.environ.setdefault("DB_NAME", "moviehub_bench")
+
+import httpx  # noqa: E402
+from fastapi.routing import APIRoute  # noqa: E402
+
+import server  # noqa: E402
+from cache import MemoryCache  # noqa: E402
+
+SEED_BATCH_SIZE = 5000
+SAMPLE_SIZE = 1000
+# Routes volontairement hors mesure
+UNMEASURED = {
+    "GET /api/images/{kind}/{item_id}": "origine distante",
+    "POST /api/init-data": "réinitialise le catalogue",
+    "DELETE /api/admin/cache": "fausserait les routes mesurées ensuite",
+    "POST /api/admin/compact-references": "tâche de fond unique (409 tant qu'elle tourne)",
+}
+WORDS = [
+    "nuit", "ombre", "retour", "dernier", "voyage", "secret", "guerre", "amour", "ville", "étoile",
+    "mémoire", "silence", "orage", "frontière", "jardin", "fleuve", "rêve", "empire", "miroir", "hiver",
+]
+
+
+# Catalogue synthétique
+def seeded_id(namespace: str, index: int) -> str:
+    return str(uuid.uuid5(uuid.NAMESPACE_URL, f"moviehub-bench/{namespace}/{index}"))
+
+
+class Catalog:
+    def __init__(self, movies: int, actors: int, genres: int, actors_per_movie: int, genres_per_movie: int):
+        self.movies = movies
+        self.actors = max(actors, actors_per_movie)
+        self.genres = max(genres, genres_per_movie)
+        self.actors_per_movie = actors_per_movie
+        self.genres_per_movie = genres_per_movie
+        # Acteurs d'un film : actor = (movie + k * stride) % actors, inversible sans tout garder en mémoire
+        self.stride = max(1, self.actors // max(1, actors_per_movie))
+        self.now = datetime.now(timezone.utc)
+
+    def movie_actor_indexes(self, movie: int) -> List[int]:
+        return [(movie + k * self.stride) % self.actors for k in range(self.actors_per_movie)]
+
+    def actor_movie_indexes(self, actor: int) -> Iterator[int]:
+        for k in range(self.actors_per_movie):
+            movie = (actor - k * self.stride) % self.actors
+            while movie < self.movies:
+                yield movie
+                movie += self.actors
+
+    def genre_docs(self) -> List[dict]:
+        return [
+            {
+                "id": seeded_id("genre", i),
+                "name": f"Genre {i}",
+                "type": "movie" if i % 3 else "actor",
+                "created_at": self.now.isoformat(),
+            }
+            for i in range(self.genres)
+        ]
+
+    def _genres_for(self, index: int) -> List[str]:
+        return [seeded_id("genre", (index + k) % self.genres) for k in range(self.genres_per_movie)]
+
+    def _text(self, index: int, words: int) -> str:
+        return " ".join(WORDS[(index * 7 + k * 3) % len(WORDS)] for k in range(words))
+
+    def movie_docs(self) -> Iterator[dict]:
+        for i in range(self.movies):
+            yield server.add_search_keys("movies", {
+                "id": seeded_id("movie", i),
+                "title": f"{self._text(i, 2).capitalize()} {i}",
+                "url": f"https://example.com/movies/{i}",
+                "image": f"https://example.com/movies/{i}.jpg",
+                "image_settings": {"scale": 100, "positionX": 50, "positionY": 50},
+                "actors": [seeded_id("actor", a) for a in self.movie_actor_indexes(i)],
+                "description": self._text(i, 12),
+                "genres": self._genres_for(i),
+                "duration": 80 + i % 90,
+                "is_favorite": i % 20 == 0,
+                "created_at": (self.now - timedelta(seconds=i)).isoformat(),
+            })
+
+    def actor_docs(self) -> Iterator[dict]:
+        for i in range(self.actors):
+            yield server.add_search_keys("actors", {
+                "id": seeded_id("actor", i),
+                "name": f"{self._text(i, 1).capitalize()} Acteur {i}",
+                "age": 18 + i % 70,
+                "image": f"https://example.com/actors/{i}.jpg",
+                "image_settings": {"scale": 100, "positionX": 50, "positionY": 50},
+                "movies": [seeded_id("movie", m) for m in self.actor_movie_indexes(i)],
+                "description": self._text(i, 8),
+                "genres": self._genres_for(i + 1),
+                "is_favorite": i % 20 == 0,
+                "created_at": (self.now - timedelta(seconds=i)).isoformat(),
+            })
+
+
+async def insert_batches(collection, docs: Iterator[dict]) -> int:
+    count, batch = 0, []
+    for doc in docs:
+        batch.append(doc)
+        if len(batch) >= SEED_BATCH_SIZE:
+            await collection.insert_many(batch, ordered=False)
+            count += len(batch)
+            batch = []
+    if batch:
+        await collection.insert_many(batch, ordered=False)
+        count += len(batch)
+    return count
+
+
+async def seed(database, catalog: Catalog) -> dict:
+    start = time.perf_counter()
+    for name in ("movies", "actors", "genres", "users"):
+        await database[name].delete_many({})
+    await database.users.insert_one({
+        "id": str(uuid.uuid4()),
+        "username": "admin",
+        "password_hash": server.get_password_hash("admin123"),
+        "is_admin": True,
+        "created_at": catalog.now.isoformat(),
+    })
+    counts = {
+        # Au format de stockage de l'API (dates BSON, valeurs par défaut omises)
+        "genres": await insert_batches(database.genres, map(server.CODECS["genres"].encode, catalog.genre_docs())),
+        "actors": await insert_batches(database.actors, map(server.CODECS["actors"].encode, catalog.actor_docs())),
+        "movies": await insert_batches(database.movies, map(server.CODECS["movies"].encode, catalog.movie_docs())),
+    }
+    await server.ensure_indexes(database)
+    return {"seconds": round(time.perf_counter() - start, 2), **counts}
+
+
+# Routes mesurées
+class Route(NamedTuple):
+    name: str
+    # i -> (méthode, chemin, kwargs httpx)
+    build: Callable[[int], tuple]
+    auth: bool = False
+    # Réponse sans fin (SSE) : mesurée jusqu'au premier fragment
+    stream: bool = False
+
+
+def percentile(sorted_samples: List[float], pct: float) -> Optional[float]:
+    if not sorted_samples:
+        return None
+    # Rang le plus proche
+    rank = math.ceil(pct / 100 * len(sorted_samples)) - 1
+    return sorted_samples[max(0, rank)]
+
+
+def build_routes(samples: dict, state: dict) -> List[Route]:
+    movies, actors, genres = samples["movies"], samples["actors"], samples["genres"]
+
+    def pick(items: List[str], i: int) -> str:
+        return items[(i * 7919) % len(items)]
+
+    def movie_body(i: int) -> dict:
+        return {
+            "title": f"Bench {i}",
+            "description": "Film créé par le test de charge",
+            "actors": [pick(actors, i), pick(actors, i + 1)],
+            "genres": [pick(genres, i)],
+            "duration": 100,
+        }
+
+    def actor_body(i: int) -> dict:
+        return {"name": f"Bench {i}", "age": 30, "movies": [pick(movies, i)], "genres": [pick(genres, i)]}
+
+    def created(kind: str, i: int) -> str:
+        return state[kind][i % len(state[kind])] if state[kind] else "missing"
+
+    def take(kind: str) -> str:
+        return state[kind].pop() if state[kind] else "missing"
+
+    settings = {"scale": 110, "positionX": 40, "positionY": 60}
+    import_body = "\n".join(
+        json.dumps({"collection": "genres", "document": {"id": genre_id, "name": f"Import {n}", "type": "movie"}})
+        for n, genre_id in enumerate(genres[:20])
+    )
+    return [
+        Route("GET /", lambda i: ("GET", "/api/", {})),
+        Route("POST /auth/login", lambda i: ("POST", "/api/auth/login", {"json": {"username": "admin", "password": "admin123"}})),
+        Route("GET /auth/me", lambda i: ("GET", "/api/auth/me", {}), auth=True),
+        Route("GET /movies", lambda i: ("GET", "/api/movies", {"params": {"limit": 100}})),
+        Route("GET /movies?genre", lambda i: ("GET", "/api/movies", {"params": {"limit": 100, "genre": pick(genres, i)}})),
+        Route("GET /movies?actor", lambda i: ("GET", "/api/movies", {"params": {"limit": 100, "actor": pick(actors, i)}})),
+        Route("GET /movies?fields", lambda i: ("GET", "/api/movies", {"params": {"limit": 100, "fields": "id,title,image"}})),
+        Route("GET /movies?expand", lambda i: ("GET", "/api/movies", {"params": {"limit": 50, "expand": "actors,genres"}})),
+        Route("GET /movies/featured", lambda i: ("GET", "/api/movies/featured", {})),
+        Route("GET /movies/recent", lambda i: ("GET", "/api/movies/recent", {})),
+        Route("GET /movies/favorites", lambda i: ("GET", "/api/movies/favorites", {})),
+        Route("GET /movies/by-genre/{id}", lambda i: ("GET", f"/api/movies/by-genre/{pick(genres, i)}", {})),
+        Route("GET /movies/{id}", lambda i: ("GET", f"/api/movies/{pick(movies, i)}", {})),
+        Route("GET /actors", lambda i: ("GET", "/api/actors", {"params": {"limit": 100}})),
+        Route("GET /actors?movie", lambda i: ("GET", "/api/actors", {"params": {"limit": 100, "movie": pick(movies, i)}})),
+        Route("GET /actors/{id}", lambda i: ("GET", f"/api/actors/{pick(actors, i)}", {})),
+        Route("GET /genres", lambda i: ("GET", "/api/genres", {})),
+        Route("GET /favorites", lambda i: ("GET", "/api/favorites", {})),
+        Route("GET /home", lambda i: ("GET", "/api/home", {})),
+        Route("GET /search", lambda i: ("GET", "/api/search", {"params": {"q": WORDS[i % len(WORDS)][:4]}})),
+        Route("GET /search?expand", lambda i: ("GET", "/api/search", {"params": {"q": WORDS[i % len(WORDS)], "expand": "actors,movies,genres"}})),
+        Route("PATCH /movies/{id}/favorite", lambda i: ("PATCH", f"/api/movies/{pick(movies, i)}/favorite", {})),
+        Route("PATCH /actors/{id}/favorite", lambda i: ("PATCH", f"/api/actors/{pick(actors, i)}/favorite", {})),
+        Route("PATCH /favorites", lambda i: ("PATCH", "/api/favorites", {"json": {
+            "movies": [{"id": pick(movies, i + k), "is_favorite": k % 2 == 0} for k in range(10)],
+            "actors": [{"id": pick(actors, i + k), "is_favorite": k % 2 == 0} for k in range(10)],
+        }})),
+        Route("PATCH /movies/{id}/image-settings", lambda i: ("PATCH", f"/api/movies/{pick(movies, i)}/image-settings", {"json": settings}), auth=True),
+        Route("PATCH /actors/{id}/image-settings", lambda i: ("PATCH", f"/api/actors/{pick(actors, i)}/image-settings", {"json": settings}), auth=True),
+        # Écritures : création, mise à jour puis suppression des mêmes documents
+        Route("POST /movies", lambda i: ("POST", "/api/movies", {"json": movie_body(i)}), auth=True),
+        Route("PUT /movies/{id}", lambda i: ("PUT", f"/api/movies/{created('movies', i)}", {"json": movie_body(i + 1)}), auth=True),
+        Route("DELETE /movies/{id}", lambda i: ("DELETE", f"/api/movies/{take('movies')}", {}), auth=True),
+        Route("POST /actors", lambda i: ("POST", "/api/actors", {"json": actor_body(i)}), auth=True),
+        Route("PUT /actors/{id}", lambda i: ("PUT", f"/api/actors/{created('actors', i)}", {"json": actor_body(i + 1)}), auth=True),
+        Route("DELETE /actors/{id}", lambda i: ("DELETE", f"/api/actors/{take('actors')}", {}), auth=True),
+        Route("POST /genres", lambda i: ("POST", "/api/genres", {"json": {"name": f"Bench {i}", "type": "movie"}}), auth=True),
+        Route("DELETE /genres/{id}", lambda i: ("DELETE", f"/api/genres/{take('genres')}", {}), auth=True),
+        Route("POST /import", lambda i: ("POST", "/api/import", {"params": {"upsert": "true"}, "content": import_body}), auth=True),
+        Route("GET /export?collections=genres", lambda i: ("GET", "/api/export", {"params": {"collections": "genres"}}), auth=True),
+        Route("GET /admin/indexes", lambda i: ("GET", "/api/admin/indexes", {}), auth=True),
+        Route("GET /admin/compact-references", lambda i: ("GET", "/api/admin/compact-references", {}), auth=True),
+        Route("GET /admin/cache", lambda i: ("GET", "/api/admin/cache", {}), auth=True),
+        Route("GET /admin/auth", lambda i: ("GET", "/api/admin/auth", {}), auth=True),
+        Route("GET /stats", lambda i: ("GET", "/api/stats", {})),
+        Route("GET /movies/{id}/related", lambda i: ("GET", f"/api/movies/{pick(movies, i)}/related", {})),
+        Route("GET /actors/{id}/costars", lambda i: ("GET", f"/api/actors/{pick(actors, i)}/costars", {})),
+        Route("GET /metrics", lambda i: ("GET", "/api/metrics", {})),
+        Route("GET /events", lambda i: ("GET", "/api/events", {"params": {"collections": "movies,actors"}}), stream=True),
+        Route("GET /health/ready", lambda i: ("GET", "/api/health/ready", {})),
+        Route("GET /admin/pool", lambda i: ("GET", "/api/admin/pool", {}), auth=True),
+        Route("GET /admin/related", lambda i: ("GET", "/api/admin/related", {}), auth=True),
+        Route("GET /admin/rate-limit", lambda i: ("GET", "/api/admin/rate-limit", {}), auth=True),
+        Route("GET /admin/images", lambda i: ("GET", "/api/admin/images", {}), auth=True),
+        Route("GET /admin/events", lambda i: ("GET", "/api/admin/events", {}), auth=True),
+        Route("POST /admin/counters", lambda i: ("POST", "/api/admin/counters", {}), auth=True),
+        Route("POST /admin/related", lambda i: ("POST", "/api/admin/related", {}), auth=True),
+    ]
+
+
+def unmeasured_routes(routes: List[Route]) -> List[str]:
+    # Chaque chemin construit est résolu comme le ferait le routeur : première route correspondante
+    api_routes = [route for route in server.app.routes if isinstance(route, APIRoute) and route.path.startswith("/api/")]
+    covered = set()
+    for route in routes:
+        method, path, _ = route.build(0)
+        for api_route in api_routes:
+            if method in api_route.methods and api_route.path_regex.match(path):
+                covered.add(f"{method} {api_route.path}")
+                break
+    return sorted(
+        name for name in (f"{method} {route.path}" for route in api_routes for method in sorted(route.methods))
+        if name not in covered and name not in UNMEASURED
+    )
+
+
+async def first_chunk(app, method: str, path: str, params: Optional[dict], headers: Optional[dict]) -> int:
+    # ASGITransport attend la fin de la réponse, qu'un flux SSE n'atteint jamais :
+    # appel ASGI direct, déconnexion du client dès le premier fragment reçu
+    received = asyncio.Event()
+    status_codes = []
+    request_sent = False
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": method, "scheme": "http",
+        "path": path, "raw_path": path.encode(), "query_string": urlencode(params or {}).encode(), "root_path": "",
+        "headers": [(b"host", b"bench"), *((name.lower().encode(), value.encode()) for name, value in (headers or {}).items())],
+        "client": ("127.0.0.1", 0), "server": ("bench", 80),
+    }
+
+    async def receive():
+        nonlocal request_sent
+        if not request_sent:
+            request_sent = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+        await received.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            status_codes.append(message["status"])
+        elif message["type"] == "http.response.body" and (message.get("body") or not message.get("more_body")):
+            received.set()
+
+    await app(scope, receive, send)
+    return status_codes[0] if status_codes else 500
+
+
+async def measure(client, route: Route, headers: dict, requests: int, concurrency: int, warmup: int, state: dict) -> dict:
+    created_kind = route.name.split("/")[1] if route.name.startswith("POST /") else None
+
+    async def send(i: int):
+        method, path, kwargs = route.build(i)
+        start = time.perf_counter()
+        if route.stream:
+            status_code = await first_chunk(server.app, method, path, kwargs.get("params"), headers if route.auth else None)
+            return time.perf_counter() - start, status_code
+        response = await client.request(method, path, headers=headers if route.auth else None, **kwargs)
+        elapsed = time.perf_counter() - start
+        # Les documents créés servent aux routes PUT/DELETE suivantes
+        if created_kind in state and response.status_code == 200:
+            state[created_kind].append(response.json()["id"])
+        return elapsed, response.status_code
+
+    for i in range(warmup):
+        await send(-1 - i)
+
+    queue = iter(range(requests))
+    latencies, statuses = [], Counter()
+
+    async def worker():
+        for i in queue:
+            elapsed, status_code = await send(i)
+            statuses[status_code] += 1
+            if status_code < 400:
+                latencies.append(elapsed)
+
+    start = time.perf_counter()
+    await asyncio.gather(*[worker() for _ in range(concurrency)])
+    wall = time.perf_counter() - start
+
+    latencies.sort()
+    ms = lambda value: None if value is None else round(value * 1000, 3)  # noqa: E731
+    return {
+        "requests": requests,
+        "errors": sum(count for status_code, count in statuses.items() if status_code >= 400),
+        "statuses": {str(status_code): count for status_code, count in sorted(statuses.items())},
+        "req_per_s": round(requests / wall, 1) if wall else None,
+        "mean_ms": ms(sum(latencies) / len(latencies)) if latencies else None,
+        "p50_ms": ms(percentile(latencies, 50)),
+        "p95_ms": ms(percentile(latencies, 95)),
+        "p99_ms": ms(percentile(latencies, 99)),
+        "max_ms": ms(latencies[-1]) if latencies else None,
+    }
+
+
+async def sample_ids(collection, limit: int) -> List[str]:
+    return [doc["id"] async for doc in collection.find({}, {"_id": 0, "id": 1}).limit(limit)]
+
+
+async def run(args) -> dict:
+    if args.mongo_url:
+        server.client = server.connect(args.mongo_url)
+    else:
+        import mongomock_motor
+        server.client = mongomock_motor.AsyncMongoMockClient()
+        # Pas de transactions avec mongomock
+        server._transactions_supported = False
+    database = server.client[args.db_name]
+    server.use_database(database)
+    # Un seul client (ASGITransport) : la limitation de débit fausserait la mesure
+    server.rate_limiter.enabled = False
+    if args.no_cache:
+        # Chaque entrée est évincée dès son insertion : toutes les lectures vont en base
+        server.cache.backend = MemoryCache(max_entries=0)
+
+    catalog = Catalog(args.movies, args.actors or max(50, args.movies // 10), args.genres, args.actors_per_movie, args.genres_per_movie)
+    seed_report = None if args.skip_seed else await seed(database, catalog)
+    samples = {
+        "movies": await sample_ids(database.movies, SAMPLE_SIZE),
+        "actors": await sample_ids(database.actors, SAMPLE_SIZE),
+        "genres": await sample_ids(database.genres, SAMPLE_SIZE),
+    }
+    if not all(samples.values()):
+        raise SystemExit("The catalog is empty: run without --skip-seed first")
+
+    state = {"movies": [], "actors": [], "genres": []}
+    routes = build_routes(samples, state)
+    unmeasured = unmeasured_routes(routes)
+    for name in unmeasured:
+        print(f"warning: {name} is not measured", file=sys.stderr)
+    if args.routes:
+        wanted = {name.strip() for name in args.routes.split(",")}
+        routes = [route for route in routes if route.name in wanted]
+
+    results = {}
+    transport = httpx.ASGITransport(app=server.app, raise_app_exceptions=False)
+    async with server.lifespan(server.app):
+        # Index de similarité construit en tâche de fond : /related répond 503 d'ici là
+        while not server.related.ready:
+            await asyncio.sleep(0.05)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+            login = await client.post("/api/auth/login", json={"username": "admin", "password": "admin123"})
+            login.raise_for_status()
+            headers = {"Authorization": f"Bearer {login.json()['access_token']}"}
+            for route in routes:
+                results[route.name] = await measure(client, route, headers, args.requests, args.concurrency, args.warmup, state)
+                print(f"{route.name}: {results[route.name]['p50_ms']} ms p50", file=sys.stderr)
+
+    return {
+        "config": {
+            "mongo": "mongod" if args.mongo_url else "mongomock-motor",
+            "movies": catalog.movies,
+            "actors": catalog.actors,
+            "genres": catalog.genres,
+            "actors_per_movie": catalog.actors_per_movie,
+            "genres_per_movie": catalog.genres_per_movie,
+            "concurrency": args.concurrency,
+            "requests": args.requests,
+            "warmup": args.warmup,
+            "cache": "disabled" if args.no_cache else "enabled",
+        },
+        "seed": seed_report,
+        "unmeasured": unmeasured,
+        "routes": results,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mongo-url", help="Serveur Mongo à utiliser (mongomock-motor par défaut)")
+    parser.add_argument("--db-name", default="moviehub_bench")
+    parser.add_argument("--movies", type=int, default=2000)
+    parser.add_argument("--actors", type=int, help="Par défaut : movies / 10 (au moins 50)")
+    parser.add_argument("--genres", type=int, default=30)
+    parser.add_argument("--actors-per-movie", type=int, default=5)
+    parser.add_argument("--genres-per-movie", type=int, default=2)
+    parser.add_argument("--skip-seed", action="store_true", help="Réutiliser le catalogue déjà présent")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--requests", type=int, default=200, help="Requêtes mesurées par route")
+    parser.add_argument("--warmup", type=int, default=10)
+    parser.add_argument("--routes", help="Sous-ensemble de routes séparées par des virgules (ex. 'GET /movies,GET /search')")
+    parser.add_argument("--no-cache", action="store_true", help="Désactiver le cache de lecture")
+    parser.add_argument("-o", "--output", default="-", help="Fichier JSON de sortie ('-' pour stdout)")
+    args = parser.parse_args()
+
+    report = asyncio.run(run(args))
+    output = json.dumps(report, indent=2)
+    if args.output == "-":
+        print(output)
+    else:
+        Path(args.output).write_text(output + "\n")
+
+
+if __name__ == "__main__":
+    main()
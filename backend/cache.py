@@ -0,0 +1,387 @@
+import asyncio
+import functools
+import hashlib
+import inspect
+import json
+import os
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from fastapi import Request, Response
+
+from responses import FastJSONResponse, dumps
+
+try:
+    import redis.asyncio as aioredis
+except ImportError:  # redis est optionnel : cache mémoire uniquement
+    aioredis = None
+
+MISS = object()
+
+
+# Cache TTL + LRU local au processus, borné en nombre d'entrées
+class MemoryCache:
+    def __init__(self, max_entries: int = 1024, ttl: float = 60):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._tags: Dict[str, Set[str]] = {}
+        # Les compteurs de version sont propres au processus : l'epoch évite qu'un autre
+        # worker produise le même ETag pour des données différentes
+        self._versions: Dict[str, int] = {}
+        self.epoch = uuid.uuid4().hex[:8]
+        self.stats = {"hits": 0, "misses": 0, "evictions": 0, "expirations": 0, "invalidations": 0}
+
+    async def versions(self, tags: Iterable[str]) -> List[int]:
+        return [self._versions.get(tag, 0) for tag in tags]
+
+    async def bump(self, *tags: str):
+        for tag in tags:
+            self._versions[tag] = self._versions.get(tag, 0) + 1
+
+    async def get(self, key: str) -> Any:
+        entry = self._entries.get(key)
+        if entry is None:
+            self.stats["misses"] += 1
+            return MISS
+        expires_at, value, _ = entry
+        if expires_at <= time.monotonic():
+            self._remove(key)
+            self.stats["expirations"] += 1
+            self.stats["misses"] += 1
+            return MISS
+        self._entries.move_to_end(key)
+        self.stats["hits"] += 1
+        return value
+
+    async def set(self, key: str, value: Any, tags: Iterable[str] = (), ttl: Optional[float] = None):
+        tags = tuple(tags)
+        if key in self._entries:
+            self._remove(key)
+        self._entries[key] = (time.monotonic() + (ttl or self.ttl), value, tags)
+        for tag in tags:
+            self._tags.setdefault(tag, set()).add(key)
+        while len(self._entries) > self.max_entries:
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self.stats["evictions"] += 1
+
+    async def invalidate(self, *tags: str):
+        for tag in tags:
+            for key in self._tags.pop(tag, set()):
+                if key in self._entries:
+                    self._remove(key)
+                    self.stats["invalidations"] += 1
+
+    async def clear(self):
+        self._entries.clear()
+        self._tags.clear()
+
+    def _remove(self, key: str):
+        _, _, tags = self._entries.pop(key)
+        for tag in tags:
+            keys = self._tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tags[tag]
+
+    def info(self) -> dict:
+        return {
+            "backend": "memory",
+            "size": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl": self.ttl,
+            "versions": dict(self._versions),
+            **self.stats
+        }
+
+
+# Cache partagé entre workers via un serveur compatible Redis (ou un fake asyncio)
+class RedisCache:
+    def __init__(self, redis, ttl: float = 60, prefix: str = "moviehub:cache"):
+        self.redis = redis
+        self.ttl = ttl
+        self.prefix = prefix
+        self.epoch = "redis"
+        self.stats = {"hits": 0, "misses": 0, "evictions": 0, "expirations": 0, "invalidations": 0}
+
+    def _key(self, key: str) -> str:
+        return f"{self.prefix}:{key}"
+
+    def _tag(self, tag: str) -> str:
+        return f"{self.prefix}:tag:{tag}"
+
+    def _version(self, tag: str) -> str:
+        return f"{self.prefix}:version:{tag}"
+
+    async def versions(self, tags: Iterable[str]) -> List[int]:
+        tags = list(tags)
+        if not tags:
+            return []
+        values = await self.redis.mget([self._version(tag) for tag in tags])
+        return [int(value or 0) for value in values]
+
+    async def bump(self, *tags: str):
+        async with self.redis.pipeline(transaction=False) as pipe:
+            for tag in tags:
+                pipe.incr(self._version(tag))
+            await pipe.execute()
+
+    async def get(self, key: str) -> Any:
+        raw = await self.redis.get(self._key(key))
+        if raw is None:
+            self.stats["misses"] += 1
+            return MISS
+        self.stats["hits"] += 1
+        return raw
+
+    async def set(self, key: str, value: Any, tags: Iterable[str] = (), ttl: Optional[float] = None):
+        ttl = int(ttl or self.ttl)
+        async with self.redis.pipeline(transaction=False) as pipe:
+            pipe.set(self._key(key), value, ex=ttl)
+            for tag in tags:
+                pipe.sadd(self._tag(tag), self._key(key))
+                pipe.expire(self._tag(tag), ttl)
+            await pipe.execute()
+
+    async def invalidate(self, *tags: str):
+        for tag in tags:
+            keys = await self.redis.smembers(self._tag(tag))
+            if keys:
+                self.stats["invalidations"] += await self.redis.delete(*keys)
+            await self.redis.delete(self._tag(tag))
+
+    async def clear(self):
+        # Les compteurs de version sont conservés pour ne pas réutiliser d'anciens ETags
+        keys = [
+            key async for key in self.redis.scan_iter(match=f"{self.prefix}:*")
+            if not (key.decode() if isinstance(key, bytes) else key).startswith(f"{self.prefix}:version:")
+        ]
+        if keys:
+            await self.redis.delete(*keys)
+
+    def info(self) -> dict:
+        return {"backend": "redis", "ttl": self.ttl, **self.stats}
+
+
+# Requêtes identiques simultanées : une seule exécution, résultat partagé (par processus)
+class SingleFlight:
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self._calls: Dict[str, asyncio.Task] = {}
+        self.stats = {"executions": 0, "coalesced": 0}
+
+    async def do(self, key: str, func):
+        if not self.enabled:
+            self.stats["executions"] += 1
+            return await func()
+        task = self._calls.get(key)
+        if task is None:
+            # Tâche détachée : si le premier client se déconnecte, les autres reçoivent quand même le résultat
+            task = self._calls[key] = asyncio.ensure_future(func())
+            task.add_done_callback(functools.partial(self._done, key))
+            self.stats["executions"] += 1
+        else:
+            self.stats["coalesced"] += 1
+        return await asyncio.shield(task)
+
+    def _done(self, key: str, task: asyncio.Task):
+        if self._calls.get(key) is task:
+            del self._calls[key]
+        if not task.cancelled():
+            task.exception()  # évite « exception never retrieved » si tous les clients sont partis
+
+    def info(self) -> dict:
+        return {"enabled": self.enabled, "in_flight": len(self._calls), **self.stats}
+
+
+def encode_body(result: Any) -> bytes:
+    # Chemin rapide de server.py : la route renvoie déjà une réponse JSON encodée
+    return result.body if isinstance(result, Response) else dumps(result)
+
+
+# Façade utilisée par server.py : décorateur de lecture et invalidation par collection
+class ResponseCache:
+    def __init__(self, backend, cache_control: str = "no-cache", flights: Optional[SingleFlight] = None):
+        self.backend = backend
+        self.cache_control = cache_control
+        self.flights = flights or SingleFlight()
+
+    async def _flight_key(self, name: str, tags: Tuple[str, ...], kwargs: dict) -> Tuple[str, str]:
+        key = f"{name}:{json.dumps(kwargs, sort_keys=True, default=str)}"
+        # Les versions dans la clé : une requête arrivée après une écriture ne rejoint pas un calcul antérieur
+        return key, f"{key}|{await self.backend.versions(tags)}"
+
+    def cached(self, name: str, tags: Iterable[str], ttl: Optional[float] = None):
+        tags = tuple(tags)
+
+        def decorator(func):
+            async def fill(key: str, flight_key: str, kwargs: dict) -> bytes:
+                # Stocké déjà encodé : un hit ne resérialise rien ; pas de stockage si une écriture est passée entre-temps
+                body = encode_body(await func(**kwargs))
+                if f"{key}|{await self.backend.versions(tags)}" == flight_key:
+                    await self.backend.set(key, body, tags, ttl)
+                return body
+
+            @functools.wraps(func)
+            async def wrapper(**kwargs):
+                key, flight_key = await self._flight_key(name, tags, kwargs)
+                body = await self.backend.get(key)
+                if body is MISS:
+                    body = await self.flights.do(flight_key, lambda: fill(key, flight_key, kwargs))
+                return Response(content=body, media_type="application/json")
+            return wrapper
+        return decorator
+
+    def coalesced(self, name: str, tags: Iterable[str]):
+        # Sans stockage : seules les requêtes identiques simultanées partagent la même requête Mongo
+        tags = tuple(tags)
+
+        def decorator(func):
+            async def run(kwargs: dict) -> bytes:
+                return encode_body(await func(**kwargs))
+
+            @functools.wraps(func)
+            async def wrapper(**kwargs):
+                _, flight_key = await self._flight_key(name, tags, kwargs)
+                body = await self.flights.do(flight_key, lambda: run(kwargs))
+                return Response(content=body, media_type="application/json")
+            return wrapper
+        return decorator
+
+    def conditional(self, name: str, tags: Iterable[str], cache_control: Optional[str] = None):
+        # ETag faible dérivé des versions des collections : un If-None-Match valide
+        # renvoie 304 sans toucher Mongo ni sérialiser
+        tags = tuple(tags)
+
+        def decorator(func):
+            signature = inspect.signature(func)
+            request_param = inspect.Parameter("request", inspect.Parameter.KEYWORD_ONLY, annotation=Request)
+
+            @functools.wraps(func)
+            async def wrapper(request: Request, **kwargs):
+                etag = await self.etag(name, tags, str(request.url.path), str(request.url.query))
+                headers = {"ETag": etag, "Cache-Control": cache_control or self.cache_control}
+                if etag_matches(request.headers.get("if-none-match"), etag):
+                    return Response(status_code=304, headers=headers)
+                result = await func(**kwargs)
+                response = result if isinstance(result, Response) else FastJSONResponse(content=result)
+                response.headers.update(headers)
+                return response
+
+            wrapper.__signature__ = signature.replace(parameters=[*signature.parameters.values(), request_param])
+            return wrapper
+        return decorator
+
+    async def etag(self, name: str, tags: Iterable[str], path: str, query: str) -> str:
+        versions = await self.backend.versions(tags)
+        digest = hashlib.sha1(f"{name}|{path}|{query}|{versions}".encode()).hexdigest()[:16]
+        return f'W/"{self.backend.epoch}-{digest}"'
+
+    async def invalidate(self, *collections: str):
+        await self.backend.bump(*collections)
+        await self.backend.invalidate(*collections)
+
+    async def clear(self):
+        await self.backend.clear()
+
+    def info(self) -> dict:
+        return {**self.backend.info(), "flights": self.flights.info()}
+
+
+# Cache d'authentification : jetons JWT déjà vérifiés et utilisateurs associés
+class AuthCache:
+    def __init__(self, max_tokens: int = 4096, user_ttl: float = 60):
+        self.max_tokens = max_tokens
+        self.user_ttl = user_ttl
+        # jeton -> (exp du JWT, username) ; l'entrée meurt avec le jeton
+        self._tokens: "OrderedDict[str, tuple]" = OrderedDict()
+        # username -> (expiration locale, utilisateur)
+        self._users: Dict[str, tuple] = {}
+        self.stats = {
+            "token_hits": 0, "token_misses": 0, "user_hits": 0, "user_misses": 0,
+            "evictions": 0, "requests": 0, "latency_total": 0.0, "latency_max": 0.0
+        }
+
+    def get_token(self, token: str) -> Optional[str]:
+        entry = self._tokens.get(token)
+        if entry is None or entry[0] <= time.time():
+            if entry is not None:
+                del self._tokens[token]
+            self.stats["token_misses"] += 1
+            return None
+        self._tokens.move_to_end(token)
+        self.stats["token_hits"] += 1
+        return entry[1]
+
+    def set_token(self, token: str, username: str, exp: float):
+        self._tokens[token] = (exp, username)
+        self._tokens.move_to_end(token)
+        while len(self._tokens) > self.max_tokens:
+            self._tokens.popitem(last=False)
+            self.stats["evictions"] += 1
+
+    def get_user(self, username: str) -> Any:
+        entry = self._users.get(username)
+        if entry is None or entry[0] <= time.monotonic():
+            self._users.pop(username, None)
+            self.stats["user_misses"] += 1
+            return MISS
+        self.stats["user_hits"] += 1
+        return entry[1]
+
+    def set_user(self, username: str, user: Any):
+        self._users[username] = (time.monotonic() + self.user_ttl, user)
+
+    def invalidate_user(self, username: Optional[str] = None):
+        # Sans argument : tous les utilisateurs (les jetons restent valides jusqu'à leur exp)
+        if username is None:
+            self._users.clear()
+        else:
+            self._users.pop(username, None)
+
+    def observe(self, seconds: float):
+        self.stats["requests"] += 1
+        self.stats["latency_total"] += seconds
+        self.stats["latency_max"] = max(self.stats["latency_max"], seconds)
+
+    def info(self) -> dict:
+        lookups = self.stats["token_hits"] + self.stats["token_misses"]
+        user_lookups = self.stats["user_hits"] + self.stats["user_misses"]
+        requests = self.stats["requests"]
+        return {
+            "tokens": len(self._tokens),
+            "users": len(self._users),
+            "max_tokens": self.max_tokens,
+            "user_ttl": self.user_ttl,
+            "token_hit_rate": self.stats["token_hits"] / lookups if lookups else None,
+            "user_hit_rate": self.stats["user_hits"] / user_lookups if user_lookups else None,
+            "latency_avg": self.stats["latency_total"] / requests if requests else None,
+            **self.stats
+        }
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    # Comparaison faible : le préfixe W/ est ignoré
+    candidates = {candidate.strip().removeprefix("W/") for candidate in if_none_match.split(",")}
+    return etag.removeprefix("W/") in candidates
+
+
+def create_cache() -> ResponseCache:
+    ttl = float(os.environ.get("CACHE_TTL", "60"))
+    cache_control = os.environ.get("CACHE_CONTROL", "no-cache")
+    flights = SingleFlight(enabled=os.environ.get("COALESCE_REQUESTS", "true").lower() == "true")
+    redis_url = os.environ.get("CACHE_REDIS_URL")
+    if redis_url:
+        if aioredis is None:
+            raise RuntimeError("CACHE_REDIS_URL is set but the redis package is not installed")
+        return ResponseCache(RedisCache(aioredis.from_url(redis_url), ttl=ttl), cache_control, flights)
+    backend = MemoryCache(max_entries=int(os.environ.get("CACHE_MAX_ENTRIES", "1024")), ttl=ttl)
+    return ResponseCache(backend, cache_control, flights)
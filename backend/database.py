@@ -0,0 +1,158 @@
+import asyncio
+import importlib.util
+import os
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import pymongo
+from pymongo import monitoring
+from pymongo.read_preferences import make_read_preference, read_pref_mode_from_name
+
+# Module Python requis par chaque compresseur réseau (zlib est toujours disponible)
+COMPRESSOR_MODULES = {"zstd": "zstandard", "snappy": "snappy", "zlib": None}
+
+
+def available_compressors(requested: str) -> List[str]:
+    # zstandard / python-snappy sont optionnels : on ne garde que ce qui est installé
+    compressors = []
+    for name in (name.strip() for name in requested.split(",")):
+        if name not in COMPRESSOR_MODULES:
+            continue
+        module = COMPRESSOR_MODULES[name]
+        if module is None or importlib.util.find_spec(module) is not None:
+            compressors.append(name)
+    return compressors
+
+
+def mongo_options() -> dict:
+    options = {
+        "maxPoolSize": int(os.environ.get("MONGO_MAX_POOL_SIZE", "100")),
+        "minPoolSize": int(os.environ.get("MONGO_MIN_POOL_SIZE", "10")),
+        "maxIdleTimeMS": int(os.environ.get("MONGO_MAX_IDLE_TIME_MS", "300000")),
+        "serverSelectionTimeoutMS": int(os.environ.get("MONGO_SERVER_SELECTION_TIMEOUT_MS", "5000")),
+        "connectTimeoutMS": int(os.environ.get("MONGO_CONNECT_TIMEOUT_MS", "5000")),
+        "appname": os.environ.get("MONGO_APP_NAME", "moviehub-api"),
+        # Dates BSON relues en UTC avec fuseau : sérialisées en ISO 8601 avec +00:00
+        "tz_aware": True,
+    }
+    if os.environ.get("MONGO_WAIT_QUEUE_TIMEOUT_MS"):
+        options["waitQueueTimeoutMS"] = int(os.environ["MONGO_WAIT_QUEUE_TIMEOUT_MS"])
+    compressors = available_compressors(os.environ.get("MONGO_COMPRESSORS", "zstd,snappy,zlib"))
+    if compressors:
+        options["compressors"] = ",".join(compressors)
+    return options
+
+
+def read_preference(name: str):
+    return make_read_preference(read_pref_mode_from_name(name), None)
+
+
+async def warm_pool(client, size: int):
+    # Ouvre les connexions avant le premier trafic plutôt que pendant le premier pic
+    if size > 0:
+        await asyncio.gather(*[client.admin.command("ping") for _ in range(size)])
+
+
+# Statistiques du pool de connexions, par serveur
+class PoolMonitor(monitoring.ConnectionPoolListener):
+    def __init__(self):
+        # Les événements arrivent depuis les threads de Motor
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.pools: Dict[str, dict] = {}
+
+    def _pool(self, address: Tuple[str, int]) -> dict:
+        key = f"{address[0]}:{address[1]}"
+        pool = self.pools.get(key)
+        if pool is None:
+            pool = self.pools[key] = {
+                "open": 0, "in_use": 0, "waiting": 0, "created": 0, "closed": 0,
+                "checkouts": 0, "checkout_failures": 0, "cleared": 0,
+                "wait_seconds_total": 0.0, "wait_seconds_max": 0.0,
+            }
+        return pool
+
+    def _update(self, address, **deltas):
+        with self._lock:
+            pool = self._pool(address)
+            for field, delta in deltas.items():
+                pool[field] += delta
+
+    def _waited(self) -> float:
+        # Début et fin d'attente d'une connexion ont lieu dans le même thread
+        return time.perf_counter() - getattr(self._local, "checkout_started", time.perf_counter())
+
+    def pool_created(self, event):
+        self._update(event.address)
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        self._update(event.address, cleared=1)
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_created(self, event):
+        self._update(event.address, open=1, created=1)
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        self._update(event.address, open=-1, closed=1)
+
+    def connection_check_out_started(self, event):
+        self._local.checkout_started = time.perf_counter()
+        self._update(event.address, waiting=1)
+
+    def connection_check_out_failed(self, event):
+        self._update(event.address, waiting=-1, checkout_failures=1)
+
+    def connection_checked_out(self, event):
+        waited = self._waited()
+        with self._lock:
+            pool = self._pool(event.address)
+            pool["waiting"] -= 1
+            pool["in_use"] += 1
+            pool["checkouts"] += 1
+            pool["wait_seconds_total"] += waited
+            pool["wait_seconds_max"] = max(pool["wait_seconds_max"], waited)
+
+    def connection_checked_in(self, event):
+        self._update(event.address, in_use=-1)
+
+    def info(self) -> dict:
+        with self._lock:
+            pools = {address: dict(pool) for address, pool in self.pools.items()}
+        totals = {
+            field: sum(pool[field] for pool in pools.values())
+            for field in ("open", "in_use", "waiting", "created", "closed", "checkouts", "checkout_failures")
+        }
+        return {**totals, "servers": pools}
+
+
+# Budget Mongo par requête : pymongo envoie le temps restant en maxTimeMS à chaque opération
+class MongoTimeoutMiddleware:
+    def __init__(self, app, read_timeout: float, write_timeout: float, exempt: Iterable[str] = ()):
+        self.app = app
+        self.read_timeout = read_timeout
+        self.write_timeout = write_timeout
+        # Préfixes sans budget : flux longs (import/export, SSE) et maintenance
+        self.exempt = tuple(exempt)
+
+    def budget(self, scope) -> Optional[float]:
+        if scope["path"].startswith(self.exempt):
+            return None
+        return self.read_timeout if scope["method"] in ("GET", "HEAD") else self.write_timeout
+
+    async def __call__(self, scope, receive, send):
+        budget = self.budget(scope) if scope["type"] == "http" else None
+        if not budget:
+            await self.app(scope, receive, send)
+            return
+        # Le contexte est copié dans les threads de Motor : le délai suit chaque opération
+        with pymongo.timeout(budget):
+            await self.app(scope, receive, send)
@@ -0,0 +1,281 @@
+import asyncio
+import itertools
+import logging
+import os
+import uuid
+from collections import deque
+from typing import AsyncIterator, Iterable, List, Optional
+
+import orjson
+from pymongo.errors import OperationFailure, PyMongoError
+
+try:
+    import redis.asyncio as aioredis
+except ImportError:  # redis est optionnel : événements limités au processus
+    aioredis = None
+
+logger = logging.getLogger(__name__)
+
+# Champs internes jamais annoncés aux clients
+HIDDEN_FIELDS = {"_id", "search_keys"}
+
+
+# Abonnement d'un client : file bornée, jamais de blocage côté émetteur
+class Subscription:
+    def __init__(self, collections: Optional[Iterable[str]], queue_size: int):
+        self.collections = set(collections) if collections else None
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.dropped = 0
+
+    def wants(self, event: dict) -> bool:
+        return self.collections is None or event.get("collection") is None or event["collection"] in self.collections
+
+    def offer(self, event: dict):
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            # Client trop lent : on vide sa file et on lui demande de tout recharger
+            self.dropped += self.queue.qsize()
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait({"type": "resync", "collection": None, "seq": event["seq"]})
+
+    async def get(self) -> dict:
+        return await self.queue.get()
+
+
+# Pub/sub en mémoire ; alimenté par les change streams Mongo ou, à défaut, par les handlers
+class EventBus:
+    def __init__(self, queue_size: int = 256, history: int = 1000, relay: Optional["RedisEventRelay"] = None):
+        self.queue_size = queue_size
+        # Relais Redis : les écritures d'un worker sont annoncées aux abonnés de tous les workers
+        self.relay = relay
+        self.subscriptions: List[Subscription] = []
+        # Derniers événements, rejoués à la reconnexion (Last-Event-ID)
+        self.history: deque = deque(maxlen=history)
+        self._seq = itertools.count(1)
+        # Préfixe des ids SSE : un Last-Event-ID d'un autre processus n'est jamais rejoué ici
+        self.epoch = uuid.uuid4().hex[:8]
+        self.source = "memory"
+        self.stats = {"published": 0, "dropped": 0}
+
+    def publish(self, event: dict):
+        event = {**event, "seq": next(self._seq)}
+        self.history.append(event)
+        self.stats["published"] += 1
+        for subscription in self.subscriptions:
+            if subscription.wants(event):
+                subscription.offer(event)
+
+    def publish_local(self, collection: Optional[str], op: str, ids: Iterable[Optional[str]] = (None,), fields: Optional[Iterable[str]] = None):
+        # Avec les change streams, Mongo annonce déjà chaque écriture (de tous les workers)
+        if self.source != "memory":
+            return
+        fields = sorted(set(fields) - HIDDEN_FIELDS) if fields is not None else None
+        if fields == []:
+            return
+        for item_id in ids:
+            self._emit({"type": "change", "collection": collection, "id": item_id, "op": op, "fields": fields})
+
+    def resync_local(self, collection: Optional[str] = None):
+        # Écritures en masse (import, réparation) : les clients rechargent au lieu de patcher
+        if self.source == "memory":
+            self._emit({"type": "resync", "collection": collection})
+
+    def _emit(self, event: dict):
+        if self.relay is not None:
+            # Revient par l'abonnement Redis, dans ce worker comme dans les autres
+            self.relay.send(event)
+        else:
+            self.publish(event)
+
+    def subscribe(self, collections: Optional[Iterable[str]] = None, last_event_id: Optional[str] = None) -> Subscription:
+        subscription = Subscription(collections, self.queue_size)
+        if last_event_id:
+            epoch, _, seq = last_event_id.partition(":")
+            latest = self.history[-1]["seq"] if self.history else 0
+            oldest = self.history[0]["seq"] if self.history else latest + 1
+            if epoch != self.epoch or not seq.isdigit() or not oldest - 1 <= int(seq) <= latest:
+                # Autre processus (redémarrage, autre worker) ou historique dépassé : rejeu impossible
+                subscription.offer({"type": "resync", "collection": None, "seq": latest})
+            else:
+                for event in self.history:
+                    if event["seq"] > int(seq) and subscription.wants(event):
+                        subscription.offer(event)
+        self.subscriptions.append(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        self.stats["dropped"] += subscription.dropped
+        self.subscriptions.remove(subscription)
+
+    def info(self) -> dict:
+        return {
+            "source": self.source,
+            "subscribers": len(self.subscriptions),
+            "queue_size": self.queue_size,
+            "dropped": self.stats["dropped"] + sum(subscription.dropped for subscription in self.subscriptions),
+            "published": self.stats["published"],
+            "relay": self.relay.info() if self.relay is not None else None,
+        }
+
+
+# Pub/sub Redis entre workers : chaque événement publié localement est diffusé sur un canal
+# et republié dans le bus de chaque processus abonné
+class RedisEventRelay:
+    def __init__(self, redis, channel: str = "moviehub:events", retry_delay: float = 1):
+        self.redis = redis
+        self.channel = channel
+        self.retry_delay = retry_delay
+        # File d'envoi unique : les événements partent dans l'ordre des écritures
+        self.outbox: asyncio.Queue = asyncio.Queue()
+        self.connected = asyncio.Event()
+        self.stats = {"sent": 0, "received": 0, "errors": 0}
+
+    def send(self, event: dict):
+        self.outbox.put_nowait(event)
+
+    async def _send_loop(self):
+        while True:
+            event = await self.outbox.get()
+            await self.redis.publish(self.channel, orjson.dumps(event))
+            self.stats["sent"] += 1
+
+    async def _receive_loop(self, bus: EventBus, pubsub):
+        async for message in pubsub.listen():
+            if message["type"] == "message":
+                self.stats["received"] += 1
+                bus.publish(orjson.loads(message["data"]))
+
+    async def run(self, bus: EventBus):
+        while True:
+            pubsub = self.redis.pubsub()
+            try:
+                await pubsub.subscribe(self.channel)
+                self.connected.set()
+                tasks = [asyncio.ensure_future(self._send_loop()), asyncio.ensure_future(self._receive_loop(bus, pubsub))]
+                try:
+                    done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_EXCEPTION)
+                    for task in done:
+                        task.result()
+                finally:
+                    for task in tasks:
+                        task.cancel()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.stats["errors"] += 1
+                logger.warning(f"Event relay interrupted: {e}")
+            finally:
+                self.connected.clear()
+                await pubsub.aclose()
+            # Des événements d'autres workers ont pu être perdus : les clients de ce worker rechargent
+            bus.publish({"type": "resync", "collection": None})
+            await asyncio.sleep(self.retry_delay)
+
+    def info(self) -> dict:
+        return {"channel": self.channel, "connected": self.connected.is_set(), "pending": self.outbox.qsize(), **self.stats}
+
+
+def create_event_relay() -> Optional[RedisEventRelay]:
+    # Indispensable dès que plusieurs workers servent /api/events sans change streams
+    redis_url = os.environ.get("EVENTS_REDIS_URL") or os.environ.get("CACHE_REDIS_URL")
+    if not redis_url:
+        return None
+    if aioredis is None:
+        raise RuntimeError("EVENTS_REDIS_URL is set but the redis package is not installed")
+    return RedisEventRelay(aioredis.from_url(redis_url))
+
+
+async def event_stream(bus: EventBus, subscription: Subscription, keepalive: float, retry_ms: int) -> AsyncIterator[bytes]:
+    # Format SSE ; l'id permet à EventSource de reprendre via Last-Event-ID
+    try:
+        yield f"retry: {retry_ms}\n\n".encode()
+        while True:
+            try:
+                event = await asyncio.wait_for(subscription.get(), keepalive)
+            except asyncio.TimeoutError:
+                # Commentaire SSE : garde la connexion ouverte à travers les proxies
+                yield b": keepalive\n\n"
+                continue
+            yield b"id: %s:%d\nevent: %s\ndata: %s\n\n" % (bus.epoch.encode(), event["seq"], event["type"].encode(), orjson.dumps(event))
+    finally:
+        bus.unsubscribe(subscription)
+
+
+def change_event(change: dict) -> Optional[dict]:
+    op = change["operationType"]
+    collection = change.get("ns", {}).get("coll")
+    if op in ("drop", "rename", "dropDatabase", "invalidate"):
+        return {"type": "resync", "collection": collection}
+    if op not in ("insert", "update", "replace", "delete"):
+        return None
+    document = change.get("fullDocument") or change.get("fullDocumentBeforeChange") or {}
+    fields = None
+    if op == "update":
+        description = change.get("updateDescription", {})
+        # "movies.3" (élément ajouté) -> "movies"
+        changed = {path.split(".")[0] for path in description.get("updatedFields", {})}
+        changed |= {path.split(".")[0] for path in description.get("removedFields", [])}
+        fields = sorted(changed - HIDDEN_FIELDS)
+        if not fields:
+            return None
+    return {
+        "type": "change",
+        "collection": collection,
+        # Sans pré-image (MongoDB < 6.0), l'id d'un document supprimé est inconnu : le client recharge
+        "id": document.get("id"),
+        "op": "update" if op == "replace" else op,
+        "fields": fields,
+    }
+
+
+async def watch_changes(database, bus: EventBus, collections: Iterable[str], retry_delay: float = 5):
+    collections = list(collections)
+    pipeline = [
+        {"$match": {"ns.coll": {"$in": collections}}},
+        # Seuls les ids et la liste des champs modifiés voyagent
+        {"$project": {
+            "operationType": 1, "ns": 1, "updateDescription.updatedFields": 1, "updateDescription.removedFields": 1,
+            "fullDocument.id": 1, "fullDocumentBeforeChange.id": 1
+        }},
+    ]
+    options = {"full_document": "updateLookup"}
+    resume_token = None
+    started = False
+    while True:
+        try:
+            if not started:
+                version = tuple((await database.client.server_info())["versionArray"][:2])
+                if version >= (6, 0):
+                    # Pré-images : l'id des documents supprimés est connu
+                    options["full_document_before_change"] = "whenAvailable"
+                    for collection in collections:
+                        try:
+                            await database.command("collMod", collection, changeStreamPreAndPostImages={"enabled": True})
+                        except OperationFailure as e:
+                            logger.warning(f"Pre-images unavailable for {collection}: {e}")
+            async with database.watch(pipeline, resume_after=resume_token, **options) as stream:
+                started = True
+                bus.source = "change_stream"
+                async for change in stream:
+                    resume_token = stream.resume_token
+                    event = change_event(change)
+                    if event is not None:
+                        bus.publish(event)
+        except asyncio.CancelledError:
+            raise
+        except (OperationFailure, NotImplementedError) as e:
+            if not started:
+                # Serveur standalone : pas de change streams, les handlers publient eux-mêmes
+                logger.info(f"Change streams unavailable, using in-process events: {e}")
+                return
+            logger.warning(f"Change stream interrupted: {e}")
+        except PyMongoError as e:
+            logger.warning(f"Change stream interrupted: {e}")
+        if bus.source != "memory":
+            # Interruption : les handlers de ce worker reprennent la main en attendant,
+            # les clients rechargent car des événements ont pu être perdus
+            bus.source = "memory"
+            bus.publish({"type": "resync", "collection": None})
+        await asyncio.sleep(retry_delay)
@@ -0,0 +1,35 @@
+# Mode production : gunicorn supervise plusieurs workers uvicorn
+#   gunicorn -c gunicorn.conf.py server:app
+# Chaque worker a son pool Mongo et ses coalescences de requêtes ; CACHE_REDIS_URL partage
+# le cache (et les versions d'ETag), la limitation de débit et le flux /api/events entre workers.
+import os
+
+bind = f"{os.environ.get('HOST', '0.0.0.0')}:{os.environ.get('PORT', '8001')}"
+# Un seul worker par défaut : cache, ETags et EventBus en mémoire sont propres au processus
+workers = int(os.environ.get("WEB_CONCURRENCY", "1"))
+worker_class = "uvicorn.workers.UvicornWorker"
+
+# Le client Motor n'est pas fork-safe : l'application est importée dans chaque worker
+preload_app = False
+
+timeout = int(os.environ.get("WORKER_TIMEOUT", "60"))
+graceful_timeout = int(os.environ.get("GRACEFUL_TIMEOUT", "30"))
+keepalive = int(os.environ.get("KEEPALIVE", "5"))
+
+# Recyclage périodique des workers, décalé pour ne pas les redémarrer tous ensemble
+max_requests = int(os.environ.get("MAX_REQUESTS", "10000"))
+max_requests_jitter = int(os.environ.get("MAX_REQUESTS_JITTER", "1000"))
+
+# uvicorn ne réécrit pas l'adresse du client : le rate limiting lit lui-même X-Forwarded-For,
+# uniquement depuis les proxies listés dans RATE_LIMIT_TRUSTED_PROXIES (adresses ou CIDR)
+forwarded_allow_ips = os.environ.get("FORWARDED_ALLOW_IPS", "")
+
+accesslog = os.environ.get("ACCESS_LOG", "-")
+loglevel = os.environ.get("LOG_LEVEL", "info")
+
+
+def on_starting(server):
+    # Vérifié après les options de ligne de commande (-w) : sans Redis, une écriture
+    # n'invaliderait que le cache et n'annoncerait qu'aux clients du worker qui la traite
+    if server.cfg.workers > 1 and not os.environ.get("CACHE_REDIS_URL"):
+        raise RuntimeError("Several workers require CACHE_REDIS_URL (shared cache, ETag versions and event bus)")
@@ -0,0 +1,270 @@
+import asyncio
+import hashlib
+import ipaddress
+import os
+import socket
+import threading
+from collections import OrderedDict
+from io import BytesIO
+from pathlib import Path
+from typing import Awaitable, Callable, Dict, List, Optional
+
+import httpx
+from PIL import Image, ImageOps
+
+DEFAULT_SETTINGS = {"scale": 100, "positionX": 50, "positionY": 50}
+# Proportions (hauteur / largeur) des cartes du frontend
+ASPECT_RATIOS = {"movies": 9 / 16, "actors": 4 / 3}
+WIDTHS = (160, 320, 640, 1280)
+FORMATS = {"webp": ("WEBP", "image/webp"), "jpeg": ("JPEG", "image/jpeg")}
+BACKGROUND = (55, 65, 81)  # bg-gray-700 derrière les cartes
+MAX_SOURCE_BYTES = 20 * 1024 * 1024
+MAX_REDIRECTS = 5
+# À incrémenter quand le rendu change, pour ne pas resservir d'anciennes vignettes
+RENDER_VERSION = 1
+
+
+class ImageError(Exception):
+    def __init__(self, status_code: int, detail: str):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+
+
+# Cache disque adressé par contenu, éviction LRU sur la taille totale
+class DiskLRUCache:
+    def __init__(self, root: Path, max_bytes: int):
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+        self._index: Optional["OrderedDict[str, int]"] = None
+        self._size = 0
+        # get/put tournent dans des threads (asyncio.to_thread)
+        self._mutex = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "evictions": 0}
+
+    def _path(self, key: str) -> Path:
+        return self.root / key[:2] / key
+
+    def _load(self):
+        if self._index is not None:
+            return
+        # Reconstruit l'ordre LRU à partir des dates de modification existantes
+        files = sorted(
+            (path for path in self.root.glob("*/*") if path.is_file() and not path.name.endswith(".tmp")),
+            key=lambda path: path.stat().st_mtime
+        )
+        self._index = OrderedDict((path.name, path.stat().st_size) for path in files)
+        self._size = sum(self._index.values())
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._mutex:
+            return self._get(key)
+
+    def _get(self, key: str) -> Optional[bytes]:
+        self._load()
+        if key not in self._index:
+            self.stats["misses"] += 1
+            return None
+        path = self._path(key)
+        try:
+            data = path.read_bytes()
+            os.utime(path)
+        except FileNotFoundError:
+            # Évincé par un autre worker qui partage le répertoire
+            self._size -= self._index.pop(key)
+            self.stats["misses"] += 1
+            return None
+        self._index.move_to_end(key)
+        self.stats["hits"] += 1
+        return data
+
+    def put(self, key: str, data: bytes):
+        with self._mutex:
+            self._put(key, data)
+
+    def _put(self, key: str, data: bytes):
+        self._load()
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(f"{key}.{os.getpid()}.tmp")
+        tmp.write_bytes(data)
+        os.replace(tmp, path)
+        if key in self._index:
+            self._size -= self._index.pop(key)
+        self._index[key] = len(data)
+        self._size += len(data)
+        while self._size > self.max_bytes and len(self._index) > 1:
+            oldest, size = self._index.popitem(last=False)
+            self._size -= size
+            self._path(oldest).unlink(missing_ok=True)
+            self.stats["evictions"] += 1
+
+    def info(self) -> dict:
+        with self._mutex:
+            self._load()
+        return {"entries": len(self._index), "bytes": self._size, "max_bytes": self.max_bytes, **self.stats}
+
+
+async def resolve_host(host: str) -> List[str]:
+    infos = await asyncio.get_running_loop().getaddrinfo(host, None, type=socket.SOCK_STREAM)
+    return [info[4][0] for info in infos]
+
+
+def is_ip_literal(host: str) -> bool:
+    try:
+        ipaddress.ip_address(host)
+    except ValueError:
+        return False
+    return True
+
+
+def is_public_address(address: str) -> bool:
+    # Refuse privé, boucle locale, lien local, réservé, multicast (IPv4 mappée en IPv6 comprise)
+    ip = ipaddress.ip_address(address)
+    if ip.version == 6 and ip.ipv4_mapped:
+        ip = ip.ipv4_mapped
+    return ip.is_global and not ip.is_multicast
+
+
+def normalize_settings(settings: Optional[dict]) -> dict:
+    normalized = {}
+    for name, default in DEFAULT_SETTINGS.items():
+        try:
+            normalized[name] = float((settings or {}).get(name, default))
+        except (TypeError, ValueError):
+            normalized[name] = float(default)
+    normalized["scale"] = max(normalized["scale"], 1.0)
+    return normalized
+
+
+def render_thumbnail(source: bytes, settings: dict, width: int, height: int, image_format: str) -> bytes:
+    # Reproduit le CSS des cartes : object-cover, puis
+    # transform: scale(scale/100) translate((positionX-50)*2%, (positionY-50)*2%)
+    with Image.open(BytesIO(source)) as opened:
+        image = ImageOps.exif_transpose(opened).convert("RGB")
+    source_width, source_height = image.size
+    zoom = settings["scale"] / 100
+    cover = max(width / source_width, height / source_height)
+    translate_x = (settings["positionX"] - 50) * 2 / 100 * width
+    translate_y = (settings["positionY"] - 50) * 2 / 100 * height
+
+    center_x = source_width / 2 - translate_x / cover
+    center_y = source_height / 2 - translate_y / cover
+    box_width = width / zoom / cover
+    box_height = height / zoom / cover
+    box = (center_x - box_width / 2, center_y - box_height / 2, center_x + box_width / 2, center_y + box_height / 2)
+
+    if box[0] >= 0 and box[1] >= 0 and box[2] <= source_width and box[3] <= source_height:
+        thumbnail = image.resize((width, height), Image.Resampling.LANCZOS, box=box, reducing_gap=3.0)
+    else:
+        # Zoom arrière ou déplacement hors de l'image : le fond de la carte apparaît
+        thumbnail = image.transform(
+            (width, height), Image.Transform.EXTENT, box, resample=Image.Resampling.BICUBIC, fillcolor=BACKGROUND
+        )
+
+    output = BytesIO()
+    pil_format, _ = FORMATS[image_format]
+    thumbnail.save(output, pil_format, quality=82, **({"method": 4} if pil_format == "WEBP" else {"optimize": True}))
+    return output.getvalue()
+
+
+class ImageProxy:
+    def __init__(
+        self,
+        cache: DiskLRUCache,
+        client: Optional[httpx.AsyncClient] = None,
+        timeout: float = 10,
+        resolver: Callable[[str], Awaitable[List[str]]] = resolve_host,
+    ):
+        self.cache = cache
+        # Redirections suivies à la main : chaque saut est vérifié par check_origin
+        self.client = client or httpx.AsyncClient(timeout=timeout)
+        self.resolver = resolver
+        self._locks: Dict[str, asyncio.Lock] = {}
+
+    def variant_key(self, source_url: str, settings: dict, width: int, image_format: str) -> str:
+        raw = f"{RENDER_VERSION}|{source_url}|{settings['scale']}|{settings['positionX']}|{settings['positionY']}|{width}|{image_format}"
+        return hashlib.sha256(raw.encode()).hexdigest()
+
+    def _lock(self, key: str) -> asyncio.Lock:
+        lock = self._locks.get(key)
+        if lock is None:
+            lock = self._locks[key] = asyncio.Lock()
+        return lock
+
+    async def fetch_source(self, url: str) -> bytes:
+        key = hashlib.sha256(f"source|{url}".encode()).hexdigest()
+        data = await asyncio.to_thread(self.cache.get, key)
+        if data is not None:
+            return data
+        # Une seule requête vers l'origine par image, même sous requêtes concurrentes
+        async with self._lock(key):
+            try:
+                data = await asyncio.to_thread(self.cache.get, key)
+                if data is not None:
+                    return data
+                data = await self._download(url)
+                await asyncio.to_thread(self.cache.put, key, data)
+                return data
+            finally:
+                self._locks.pop(key, None)
+
+    async def check_origin(self, url: httpx.URL):
+        # Les URL d'image viennent des utilisateurs : pas de requête vers le réseau interne
+        if url.scheme not in ("http", "https") or not url.host:
+            raise ImageError(400, "Unsupported image URL")
+        try:
+            addresses = [url.host] if is_ip_literal(url.host) else await self.resolver(url.host)
+        except OSError as e:
+            raise ImageError(502, f"Origin fetch failed: {e}")
+        if not addresses or not all(is_public_address(address) for address in addresses):
+            raise ImageError(400, "Image URL does not resolve to a public address")
+
+    async def _download(self, url: str) -> bytes:
+        try:
+            request_url = httpx.URL(url)
+        except httpx.InvalidURL:
+            raise ImageError(400, "Unsupported image URL")
+        try:
+            for _ in range(MAX_REDIRECTS + 1):
+                await self.check_origin(request_url)
+                async with self.client.stream("GET", request_url, follow_redirects=False) as response:
+                    if response.is_redirect and response.next_request is not None:
+                        request_url = response.next_request.url
+                        continue
+                    if response.status_code != 200:
+                        raise ImageError(502, f"Origin returned {response.status_code}")
+                    if not response.headers.get("content-type", "").startswith("image/"):
+                        raise ImageError(502, "Origin did not return an image")
+                    chunks, size = [], 0
+                    async for chunk in response.aiter_bytes():
+                        size += len(chunk)
+                        if size > MAX_SOURCE_BYTES:
+                            raise ImageError(502, "Origin image too large")
+                        chunks.append(chunk)
+                    return b"".join(chunks)
+        except httpx.HTTPError as e:
+            raise ImageError(502, f"Origin fetch failed: {e}")
+        raise ImageError(502, "Origin redirected too many times")
+
+    async def thumbnail(self, key: str, source_url: str, settings: dict, width: int, height: int, image_format: str) -> bytes:
+        body = await asyncio.to_thread(self.cache.get, key)
+        if body is not None:
+            return body
+        async with self._lock(key):
+            try:
+                body = await asyncio.to_thread(self.cache.get, key)
+                if body is not None:
+                    return body
+                source = await self.fetch_source(source_url)
+                try:
+                    body = await asyncio.to_thread(render_thumbnail, source, settings, width, height, image_format)
+                except (OSError, ValueError, Image.DecompressionBombError):
+                    raise ImageError(502, "Origin image could not be decoded")
+                await asyncio.to_thread(self.cache.put, key, body)
+                return body
+            finally:
+                self._locks.pop(key, None)
+
+    async def close(self):
+        await self.client.aclose()
@@ -0,0 +1,160 @@
+import argparse
+import asyncio
+import json
+import sys
+import time
+
+from server import (
+    CODECS,
+    backfill_search_keys,
+    client,
+    compact_references,
+    db,
+    ensure_indexes,
+    export_catalog,
+    import_catalog,
+    index_report,
+    iter_lines,
+    parse_collections,
+    related,
+    repair_counters,
+)
+from storage import migrate_storage
+
+
+async def indexes_command(args):
+    if args.ensure:
+        created = await ensure_indexes(db)
+        print(json.dumps({"created": created}, indent=2))
+
+    report = await index_report(db)
+    print(json.dumps(report, indent=2, default=str))
+
+    collscans = [query for query in report["queries"] if query["collscan"]]
+    for query in collscans:
+        print(f"COLLSCAN: {query['collection']} {query['filter']}", file=sys.stderr)
+    return 1 if collscans else 0
+
+
+async def search_index_command(args):
+    updated = await backfill_search_keys(db, rebuild=args.rebuild, batch_size=args.batch_size)
+    print(json.dumps({"updated": updated}, indent=2))
+    return 0
+
+
+async def compact_references_command(args):
+    status = await compact_references(db, batch_size=args.batch_size)
+    print(json.dumps(status, indent=2))
+    return 0
+
+
+async def counters_command(args):
+    report = await repair_counters(db)
+    print(json.dumps(report, indent=2))
+    return 0
+
+
+async def related_command(args):
+    report = await related.rebuild(db, block_size=args.block_size)
+    # Latence de lecture mesurée sur l'index construit, telle que servie par l'API
+    for collection, index in related.indexes.items():
+        ids = list(index.features)
+        started = time.perf_counter()
+        for item_id in ids:
+            index.related(item_id, related.top_k)
+        elapsed = time.perf_counter() - started
+        report["indexes"][collection]["lookup_microseconds"] = round(elapsed / len(ids) * 1e6, 1) if ids else None
+    print(json.dumps(report, indent=2))
+    return 0
+
+
+async def storage_command(args):
+    codecs = {name: CODECS[name] for name in parse_collections(args.collections)}
+    report = await migrate_storage(db, codecs, batch_size=args.batch_size, dates_only=args.dates_only)
+    for stats in report.values():
+        stats["bytes_saved"] = stats["bytes_before"] - stats["bytes_after"]
+    print(json.dumps(report, indent=2))
+    return 0
+
+
+async def read_chunks(path, size=1024 * 1024):
+    source = sys.stdin.buffer if path == "-" else open(path, "rb")
+    try:
+        while True:
+            chunk = source.read(size)
+            if not chunk:
+                break
+            yield chunk
+    finally:
+        if source is not sys.stdin.buffer:
+            source.close()
+
+
+async def import_command(args):
+    await ensure_indexes(db)
+    report = await import_catalog(db, iter_lines(read_chunks(args.path)), batch_size=args.batch_size, upsert=args.upsert)
+    print(json.dumps(report, indent=2))
+    return 1 if report["error_count"] else 0
+
+
+async def export_command(args):
+    target = sys.stdout.buffer if args.output == "-" else open(args.output, "wb")
+    try:
+        async for chunk in export_catalog(db, parse_collections(args.collections)):
+            target.write(chunk)
+    finally:
+        if target is not sys.stdout.buffer:
+            target.close()
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="MovieHub maintenance commands")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    indexes_parser = subparsers.add_parser("indexes", help="Show index usage and check hot queries for COLLSCAN")
+    indexes_parser.add_argument("--ensure", action="store_true", help="Create missing indexes first")
+    indexes_parser.set_defaults(handler=indexes_command)
+
+    search_parser = subparsers.add_parser("search-index", help="Compute search keys for documents missing them")
+    search_parser.add_argument("--rebuild", action="store_true", help="Recompute the keys of every document")
+    search_parser.add_argument("--batch-size", type=int, default=1000)
+    search_parser.set_defaults(handler=search_index_command)
+
+    compact_parser = subparsers.add_parser("compact-references", help="Remove dangling actor/movie/genre IDs")
+    compact_parser.add_argument("--batch-size", type=int, default=1000)
+    compact_parser.set_defaults(handler=compact_references_command)
+
+    counters_parser = subparsers.add_parser("counters", help="Recompute denormalized counters and catalog stats")
+    counters_parser.set_defaults(handler=counters_command)
+
+    related_parser = subparsers.add_parser("related", help="Build the related movies / co-stars index and report its size and timings")
+    related_parser.add_argument("--block-size", type=int, default=1024, help="Rows per sparse product block (bounds memory)")
+    related_parser.set_defaults(handler=related_command)
+
+    storage_parser = subparsers.add_parser("storage", help="Convert documents to the storage format (BSON dates, defaults omitted)")
+    storage_parser.add_argument("--batch-size", type=int, default=1000)
+    storage_parser.add_argument("--collections", help="Comma-separated subset of genres,actors,movies")
+    storage_parser.add_argument("--dates-only", action="store_true", help="Only convert ISO string dates (what startup does)")
+    storage_parser.set_defaults(handler=storage_command)
+
+    import_parser = subparsers.add_parser("import", help="Import an NDJSON catalog file ('-' for stdin)")
+    import_parser.add_argument("path")
+    import_parser.add_argument("--batch-size", type=int, default=1000)
+    import_parser.add_argument("--upsert", action="store_true", help="Replace documents whose id already exists")
+    import_parser.set_defaults(handler=import_command)
+
+    export_parser = subparsers.add_parser("export", help="Export the catalog as NDJSON")
+    export_parser.add_argument("-o", "--output", default="-")
+    export_parser.add_argument("--collections", help="Comma-separated subset of genres,actors,movies")
+    export_parser.set_defaults(handler=export_command)
+
+    args = parser.parse_args()
+    try:
+        return asyncio.run(args.handler(args))
+    finally:
+        client.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
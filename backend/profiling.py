@@ -0,0 +1,318 @@
+import functools
+import inspect
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+
+from fastapi.routing import APIRoute
+from pymongo import monitoring
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.requests import Request
+from starlette.responses import Response
+
+try:
+    from pyinstrument import Profiler
+except ImportError:  # pyinstrument est optionnel : pas de profilage à la demande
+    Profiler = None
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SEGMENTS = ("validation", "serialization")
+PROFILE_HEADER = "x-profile"
+
+
+# Temps d'une requête : Mongo (via le CommandListener) et segments mesurés explicitement
+class RequestTimings:
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.db = 0.0
+        self.db_queries = 0
+        self.segments: Dict[str, float] = {}
+        # Temps propre des fonctions de route (hors Mongo et segments), pour isoler la validation
+        self.endpoint = 0.0
+        # Les commandes Mongo se terminent dans les threads de Motor
+        self._lock = threading.Lock()
+
+    def add_db(self, seconds: float):
+        with self._lock:
+            self.db += seconds
+            self.db_queries += 1
+
+    def add(self, segment: str, seconds: float):
+        with self._lock:
+            self.segments[segment] = self.segments.get(segment, 0.0) + seconds
+
+    def add_endpoint(self, seconds: float):
+        with self._lock:
+            self.endpoint += seconds
+
+    def accounted(self) -> float:
+        with self._lock:
+            return self.db + sum(self.segments.values())
+
+    def server_timing(self, total: float) -> str:
+        # Le reste (handler, dépendances, cache) est compté dans « app » ; les requêtes Mongo
+        # concurrentes d'un même handler peuvent dépasser le total, d'où le plancher à 0
+        app = max(total - self.db - sum(self.segments.values()), 0.0)
+        parts = [f'db;dur={self.db * 1000:.2f};desc="{self.db_queries} queries"']
+        parts += [f"{segment};dur={self.segments.get(segment, 0.0) * 1000:.2f}" for segment in SEGMENTS]
+        parts += [f"app;dur={app * 1000:.2f}", f"total;dur={total * 1000:.2f}"]
+        return ", ".join(parts)
+
+
+_current: ContextVar[Optional[RequestTimings]] = ContextVar("request_timings", default=None)
+
+
+@contextmanager
+def timed(segment: str):
+    timings = _current.get()
+    if timings is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings.add(segment, time.perf_counter() - start)
+
+
+@contextmanager
+def own_time(timings: RequestTimings, record: Callable[[float], None]):
+    # Durée du bloc, hors temps Mongo et segments déjà comptés pendant ce bloc
+    start, accounted = time.perf_counter(), timings.accounted()
+    try:
+        yield
+    finally:
+        record(time.perf_counter() - start - (timings.accounted() - accounted))
+
+
+def timed_endpoint(func):
+    # include_router recrée les routes avec la fonction déjà enveloppée
+    if getattr(func, "__timed_endpoint__", False):
+        return func
+
+    # functools.wraps conserve la signature lue par FastAPI (__wrapped__ / __signature__)
+    if inspect.iscoroutinefunction(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            timings = _current.get()
+            if timings is None:
+                return await func(*args, **kwargs)
+            with own_time(timings, timings.add_endpoint):
+                return await func(*args, **kwargs)
+    else:
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            timings = _current.get()
+            if timings is None:
+                return func(*args, **kwargs)
+            with own_time(timings, timings.add_endpoint):
+                return func(*args, **kwargs)
+    wrapper.__timed_endpoint__ = True
+    return wrapper
+
+
+# Classe de route : la validation FastAPI (paramètres, corps, dépendances, response_model)
+# est le temps propre du handler de la route moins celui de la fonction de la route
+class TimedRoute(APIRoute):
+    def __init__(self, path: str, endpoint: Callable, **kwargs):
+        super().__init__(path, timed_endpoint(endpoint), **kwargs)
+
+    def get_route_handler(self) -> Callable:
+        handler = super().get_route_handler()
+
+        async def timed_handler(request: Request) -> Response:
+            timings = _current.get()
+            if timings is None:
+                return await handler(request)
+            endpoint = timings.endpoint
+
+            def record(seconds: float):
+                timings.add("validation", max(seconds - (timings.endpoint - endpoint), 0.0))
+
+            with own_time(timings, record):
+                return await handler(request)
+        return timed_handler
+
+
+# Agrégats exposés au format Prometheus
+class Metrics:
+    def __init__(self, buckets: Tuple[float, ...] = DURATION_BUCKETS):
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        self.requests: Dict[tuple, int] = {}
+        self.durations: Dict[str, list] = {}
+        self.segments: Dict[tuple, float] = {}
+        self.db_queries: Dict[str, int] = {}
+        self.commands: Dict[str, list] = {}
+
+    def observe_request(self, method: str, route: str, status: int, timings: RequestTimings, total: float):
+        with self._lock:
+            key = (method, route, status)
+            self.requests[key] = self.requests.get(key, 0) + 1
+            histogram = self.durations.setdefault(route, [[0] * len(self.buckets), 0.0, 0])
+            for index, bound in enumerate(self.buckets):
+                if total <= bound:
+                    histogram[0][index] += 1
+            histogram[1] += total
+            histogram[2] += 1
+            self.segments[(route, "db")] = self.segments.get((route, "db"), 0.0) + timings.db
+            for segment in SEGMENTS:
+                self.segments[(route, segment)] = self.segments.get((route, segment), 0.0) + timings.segments.get(segment, 0.0)
+            self.db_queries[route] = self.db_queries.get(route, 0) + timings.db_queries
+
+    def observe_command(self, command: str, seconds: float, failed: bool):
+        with self._lock:
+            stats = self.commands.setdefault(command, [0, 0.0, 0])
+            stats[0] += 1
+            stats[1] += seconds
+            stats[2] += failed
+
+    def render(self, extra: Optional[Dict[str, float]] = None) -> str:
+        with self._lock:
+            lines = [
+                "# HELP http_requests_total HTTP requests by route and status.",
+                "# TYPE http_requests_total counter",
+            ]
+            for (method, route, status), count in sorted(self.requests.items()):
+                lines.append(f'http_requests_total{{method="{method}",route="{route}",status="{status}"}} {count}')
+
+            lines += [
+                "# HELP http_request_duration_seconds Request latency by route.",
+                "# TYPE http_request_duration_seconds histogram",
+            ]
+            for route, (counts, total, count) in sorted(self.durations.items()):
+                for bound, bucket in zip(self.buckets, counts):
+                    lines.append(f'http_request_duration_seconds_bucket{{route="{route}",le="{bound}"}} {bucket}')
+                lines.append(f'http_request_duration_seconds_bucket{{route="{route}",le="+Inf"}} {count}')
+                lines.append(f'http_request_duration_seconds_sum{{route="{route}"}} {total:.6f}')
+                lines.append(f'http_request_duration_seconds_count{{route="{route}"}} {count}')
+
+            lines += [
+                "# HELP http_request_segment_seconds_total Time spent in Mongo, validation and serialization by route.",
+                "# TYPE http_request_segment_seconds_total counter",
+            ]
+            for (route, segment), seconds in sorted(self.segments.items()):
+                lines.append(f'http_request_segment_seconds_total{{route="{route}",segment="{segment}"}} {seconds:.6f}')
+
+            lines += [
+                "# HELP http_request_db_queries_total Mongo commands issued by route.",
+                "# TYPE http_request_db_queries_total counter",
+            ]
+            for route, count in sorted(self.db_queries.items()):
+                lines.append(f'http_request_db_queries_total{{route="{route}"}} {count}')
+
+            lines += [
+                "# HELP mongo_commands_total Mongo commands by name.",
+                "# TYPE mongo_commands_total counter",
+            ]
+            for command, (count, _, _) in sorted(self.commands.items()):
+                lines.append(f'mongo_commands_total{{command="{command}"}} {count}')
+            lines += ["# TYPE mongo_command_seconds_total counter"]
+            for command, (_, seconds, _) in sorted(self.commands.items()):
+                lines.append(f'mongo_command_seconds_total{{command="{command}"}} {seconds:.6f}')
+            lines += ["# TYPE mongo_command_failures_total counter"]
+            for command, (_, _, failures) in sorted(self.commands.items()):
+                lines.append(f'mongo_command_failures_total{{command="{command}"}} {failures}')
+
+        for name, value in (extra or {}).items():
+            if value is not None:
+                lines += [f"# TYPE {name} untyped", f"{name} {float(value)}"]
+        return "\n".join(lines) + "\n"
+
+
+class MongoCommandListener(monitoring.CommandListener):
+    def __init__(self, metrics: Metrics):
+        self.metrics = metrics
+
+    def started(self, event):
+        pass
+
+    def succeeded(self, event):
+        self._record(event, failed=False)
+
+    def failed(self, event):
+        self._record(event, failed=True)
+
+    def _record(self, event, failed: bool):
+        # Motor copie le contexte dans ses threads : la requête en cours est visible ici
+        seconds = event.duration_micros / 1_000_000
+        self.metrics.observe_command(event.command_name, seconds, failed)
+        timings = _current.get()
+        if timings is not None:
+            timings.add_db(seconds)
+
+
+# Middleware ASGI : en-tête Server-Timing, métriques par route et profilage à la demande
+class ProfilingMiddleware:
+    def __init__(self, app, metrics: Metrics, authorize: Optional[Callable[[Headers], Awaitable[bool]]] = None):
+        self.app = app
+        self.metrics = metrics
+        self.authorize = authorize
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        timings = RequestTimings()
+        token = _current.set(timings)
+        status_code = 500
+        try:
+            profile = await self._profile_format(scope)
+            if profile:
+                status_code = await self._profile(scope, receive, send, timings, profile)
+                return
+
+            async def send_with_timing(message):
+                nonlocal status_code
+                if message["type"] == "http.response.start":
+                    status_code = message["status"]
+                    headers = MutableHeaders(scope=message)
+                    headers.append("Server-Timing", timings.server_timing(time.perf_counter() - timings.start))
+                await send(message)
+
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _current.reset(token)
+            route = scope.get("route")
+            self.metrics.observe_request(
+                scope["method"], getattr(route, "path", "unmatched"), status_code, timings, time.perf_counter() - timings.start
+            )
+
+    async def _profile_format(self, scope) -> Optional[str]:
+        headers = Headers(scope=scope)
+        requested = headers.get(PROFILE_HEADER)
+        if not requested or Profiler is None or self.authorize is None:
+            return None
+        if not await self.authorize(headers):
+            return None
+        return "text" if requested.lower() == "text" else "html"
+
+    async def _profile(self, scope, receive, send, timings: RequestTimings, output: str) -> int:
+        # La réponse de la route est remplacée par le rapport pyinstrument
+        status_code = 500
+
+        async def discard(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+
+        profiler = Profiler(interval=0.001, async_mode="enabled")
+        profiler.start()
+        try:
+            await self.app(scope, receive, discard)
+        finally:
+            profiler.stop()
+
+        headers = {
+            "Server-Timing": timings.server_timing(time.perf_counter() - timings.start),
+            "X-Profiled-Status": str(status_code),
+        }
+        if output == "text":
+            response = Response(profiler.output_text(unicode=True, color=False), media_type="text/plain", headers=headers)
+        else:
+            response = Response(profiler.output_html(), media_type="text/html", headers=headers)
+        await response(scope, receive, send)
+        return status_code
@@ -0,0 +1,195 @@
+import ipaddress
+import math
+import os
+import time
+from collections import OrderedDict
+from typing import Dict, Iterable, Optional, Tuple
+
+from starlette.datastructures import MutableHeaders
+
+from responses import FastJSONResponse
+
+try:
+    import redis.asyncio as aioredis
+    from redis.exceptions import RedisError
+except ImportError:  # redis est optionnel : seaux locaux à chaque worker
+    aioredis = None
+    RedisError = OSError
+
+# Seau à jetons atomique côté Redis ; l'horloge du serveur Redis sert de référence à tous les workers
+TOKEN_BUCKET_SCRIPT = """
+local rate = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local cost = tonumber(ARGV[3])
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or burst
+local ts = tonumber(state[2]) or now
+tokens = math.min(burst, tokens + math.max(0, now - ts) * rate)
+local allowed = 0
+if tokens >= cost then
+    tokens = tokens - cost
+    allowed = 1
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', tostring(now))
+redis.call('PEXPIRE', KEYS[1], math.ceil(burst / rate * 1000))
+return {allowed, tostring(tokens)}
+"""
+
+
+# Seaux locaux au processus, bornés en nombre de clients (LRU)
+class MemoryBucketStore:
+    def __init__(self, max_keys: int = 10000):
+        self.max_keys = max_keys
+        self._buckets: "OrderedDict[str, list]" = OrderedDict()
+
+    async def take(self, key: str, rate: float, burst: float, cost: float = 1) -> Tuple[bool, float]:
+        now = time.monotonic()
+        bucket = self._buckets.pop(key, None) or [burst, now]
+        tokens = min(burst, bucket[0] + (now - bucket[1]) * rate)
+        allowed = tokens >= cost
+        if allowed:
+            tokens -= cost
+        self._buckets[key] = [tokens, now]
+        while len(self._buckets) > self.max_keys:
+            self._buckets.popitem(last=False)
+        return allowed, tokens
+
+    def info(self) -> dict:
+        return {"backend": "memory", "clients": len(self._buckets)}
+
+
+# Seaux partagés entre workers et instances via Redis
+class RedisBucketStore:
+    def __init__(self, redis, prefix: str = "moviehub:ratelimit"):
+        self.redis = redis
+        self.prefix = prefix
+        self.script = redis.register_script(TOKEN_BUCKET_SCRIPT)
+        self.errors = 0
+
+    async def take(self, key: str, rate: float, burst: float, cost: float = 1) -> Tuple[bool, float]:
+        try:
+            allowed, tokens = await self.script(keys=[f"{self.prefix}:{key}"], args=[rate, burst, cost])
+        except (RedisError, OSError):
+            # Redis indisponible : on laisse passer plutôt que de bloquer l'API
+            self.errors += 1
+            return True, burst
+        return bool(allowed), float(tokens)
+
+    def info(self) -> dict:
+        return {"backend": "redis", "errors": self.errors}
+
+
+def parse_networks(value: str) -> list:
+    # "10.0.0.1, 172.16.0.0/12" -> réseaux ; une adresse seule devient un /32 (ou /128)
+    return [ipaddress.ip_network(part.strip(), strict=False) for part in value.split(",") if part.strip()]
+
+
+class RateLimiter:
+    def __init__(self, store, rules: Dict[str, Tuple[float, float]], enabled: bool = True, trusted_proxies: Iterable = ()):
+        self.store = store
+        # Règle -> (jetons par seconde, capacité du seau)
+        self.rules = rules
+        self.enabled = enabled
+        # Seuls ces pairs peuvent désigner le client via X-Forwarded-For
+        self.trusted_proxies = list(trusted_proxies)
+        self.stats = {"allowed": 0, "limited": 0}
+
+    def _trusted(self, host: str) -> bool:
+        try:
+            address = ipaddress.ip_address(host)
+        except ValueError:
+            return False
+        return any(address in network for network in self.trusted_proxies)
+
+    def client_key(self, scope) -> str:
+        peer = scope["client"][0] if scope.get("client") else "unknown"
+        if not self._trusted(peer):
+            # En-tête ignoré : n'importe quel client pourrait choisir sa clé
+            return peer
+        forwarded = [
+            value.decode("latin-1") for name, value in scope.get("headers", ()) if name == b"x-forwarded-for"
+        ]
+        hops = [hop.strip() for hop in ",".join(forwarded).split(",") if hop.strip()]
+        # De droite à gauche : le premier saut non fiable est le client vu par nos proxies,
+        # les entrées plus à gauche sont fournies par le client lui-même
+        for hop in reversed(hops):
+            if not self._trusted(hop):
+                return hop
+        return hops[0] if hops else peer
+
+    def rule(self, method: str, path: str) -> Optional[str]:
+        if path == "/api/search":
+            return "search" if method in ("GET", "HEAD") else None
+        if method in ("GET", "HEAD", "OPTIONS") or not path.startswith("/api/"):
+            return None
+        # Flux SSE et sondes ne sont pas des écritures
+        if path.startswith(("/api/health/", "/api/events")):
+            return None
+        return "write"
+
+    async def check(self, rule: str, client: str) -> Tuple[bool, float, int]:
+        rate, burst = self.rules[rule]
+        allowed, tokens = await self.store.take(f"{rule}:{client}", rate, burst)
+        self.stats["allowed" if allowed else "limited"] += 1
+        retry_after = 0 if allowed else max(1, math.ceil((1 - tokens) / rate))
+        return allowed, tokens, retry_after
+
+    def info(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "trusted_proxies": [str(network) for network in self.trusted_proxies],
+            "rules": {rule: {"rate": rate, "burst": burst} for rule, (rate, burst) in self.rules.items()},
+            **self.store.info(),
+            **self.stats,
+        }
+
+
+# Middleware ASGI : 429 + Retry-After au-delà du débit autorisé par client
+class RateLimitMiddleware:
+    def __init__(self, app, limiter: RateLimiter):
+        self.app = app
+        self.limiter = limiter
+
+    async def __call__(self, scope, receive, send):
+        rule = self.limiter.rule(scope["method"], scope["path"]) if scope["type"] == "http" and self.limiter.enabled else None
+        if rule is None:
+            await self.app(scope, receive, send)
+            return
+
+        allowed, tokens, retry_after = await self.limiter.check(rule, self.limiter.client_key(scope))
+        remaining = str(max(0, math.floor(tokens)))
+        if not allowed:
+            response = FastJSONResponse(
+                {"detail": "Too many requests"},
+                status_code=429,
+                headers={"Retry-After": str(retry_after), "X-RateLimit-Remaining": remaining}
+            )
+            await response(scope, receive, send)
+            return
+
+        async def send_with_remaining(message):
+            if message["type"] == "http.response.start":
+                MutableHeaders(scope=message).append("X-RateLimit-Remaining", remaining)
+            await send(message)
+
+        await self.app(scope, receive, send_with_remaining)
+
+
+def create_rate_limiter() -> RateLimiter:
+    rules = {
+        "write": (float(os.environ.get("RATE_LIMIT_WRITE_RATE", "5")), float(os.environ.get("RATE_LIMIT_WRITE_BURST", "20"))),
+        "search": (float(os.environ.get("RATE_LIMIT_SEARCH_RATE", "10")), float(os.environ.get("RATE_LIMIT_SEARCH_BURST", "30"))),
+    }
+    # Désactivé par défaut : sans RATE_LIMIT_TRUSTED_PROXIES, tous les clients derrière un
+    # proxy partageraient le seau de son adresse
+    enabled = os.environ.get("RATE_LIMIT_ENABLED", "false").lower() == "true"
+    trusted_proxies = parse_networks(os.environ.get("RATE_LIMIT_TRUSTED_PROXIES", ""))
+    # Sans Redis, chaque worker applique la limite de son côté (débit effectif × nombre de workers)
+    redis_url = os.environ.get("RATE_LIMIT_REDIS_URL") or os.environ.get("CACHE_REDIS_URL")
+    if redis_url:
+        if aioredis is None:
+            raise RuntimeError("RATE_LIMIT_REDIS_URL is set but the redis package is not installed")
+        return RateLimiter(RedisBucketStore(aioredis.from_url(redis_url)), rules, enabled, trusted_proxies)
+    return RateLimiter(MemoryBucketStore(), rules, enabled, trusted_proxies)
@@ -0,0 +1,329 @@
+import asyncio
+import heapq
+import logging
+import time
+from collections import defaultdict
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+from scipy import sparse
+
+logger = logging.getLogger(__name__)
+
+# (score, id voisin, références partagées par type)
+Neighbor = Tuple[float, str, Dict[str, int]]
+
+
+def _rank(entry: Tuple[str, Tuple[float, Dict[str, int]]]):
+    # Score décroissant puis id : même ordre en reconstruction complète et en incrémental
+    return -entry[1][0], entry[0]
+
+
+# Jaccard pondéré sur des ensembles de références (acteurs, genres, films) :
+# somme des poids partagés / somme des poids de l'union
+class SimilarityIndex:
+    def __init__(self, weights: Dict[str, float], top_k: int = 20, require: Optional[str] = None):
+        self.weights = weights
+        self.top_k = top_k
+        # Type de référence obligatoirement partagé (un film commun pour les partenaires)
+        self.require = require
+        self.features: Dict[str, Dict[str, frozenset]] = {}
+        self.postings: Dict[str, Dict[str, set]] = {kind: defaultdict(set) for kind in weights}
+        self.sizes: Dict[str, float] = {}
+        self.summaries: Dict[str, dict] = {}
+        self.neighbors: Dict[str, List[Neighbor]] = {}
+        # Qui m'a dans son top-K : à revoir quand mes références changent
+        self.referrers: Dict[str, set] = defaultdict(set)
+
+    def __contains__(self, item_id: str) -> bool:
+        return item_id in self.features
+
+    def __len__(self) -> int:
+        return len(self.features)
+
+    def related(self, item_id: str, limit: int) -> List[dict]:
+        return [
+            {**self.summaries[other], "score": round(score, 4), "shared": shared}
+            for score, other, shared in self.neighbors.get(item_id, [])[:limit]
+        ]
+
+    def _add(self, item_id: str, features: Dict[str, Iterable[str]], summary: dict):
+        self.features[item_id] = {kind: frozenset(features.get(kind) or ()) for kind in self.weights}
+        for kind, values in self.features[item_id].items():
+            for value in values:
+                self.postings[kind][value].add(item_id)
+        self.sizes[item_id] = sum(self.weights[kind] * len(values) for kind, values in self.features[item_id].items())
+        self.summaries[item_id] = summary
+
+    def _discard(self, item_id: str):
+        for kind, values in self.features.pop(item_id, {}).items():
+            for value in values:
+                postings = self.postings[kind][value]
+                postings.discard(item_id)
+                if not postings:
+                    del self.postings[kind][value]
+        self.sizes.pop(item_id, None)
+        self.summaries.pop(item_id, None)
+
+    def _scores(self, item_id: str) -> Dict[str, Tuple[float, Dict[str, int]]]:
+        shared: Dict[str, Dict[str, int]] = defaultdict(dict)
+        for kind, values in self.features[item_id].items():
+            for value in values:
+                for other in self.postings[kind][value]:
+                    if other != item_id:
+                        shared[other][kind] = shared[other].get(kind, 0) + 1
+        size = self.sizes[item_id]
+        scores = {}
+        for other, counts in shared.items():
+            if self.require and not counts.get(self.require):
+                continue
+            intersection = sum(self.weights[kind] * count for kind, count in counts.items())
+            scores[other] = (intersection / (size + self.sizes[other] - intersection), counts)
+        return scores
+
+    def _top(self, scores: Dict[str, Tuple[float, Dict[str, int]]]) -> List[Neighbor]:
+        return [(score, other, shared) for other, (score, shared) in heapq.nsmallest(self.top_k, scores.items(), key=_rank)]
+
+    def _set_neighbors(self, item_id: str, neighbors: List[Neighbor]):
+        for _, other, _ in self.neighbors.get(item_id, []):
+            self.referrers[other].discard(item_id)
+        self.neighbors[item_id] = neighbors
+        for _, other, _ in neighbors:
+            self.referrers[other].add(item_id)
+
+    def _recompute(self, item_id: str):
+        self._set_neighbors(item_id, self._top(self._scores(item_id)))
+
+    def update(self, item_id: str, features: Dict[str, Iterable[str]], summary: dict):
+        self._discard(item_id)
+        self._add(item_id, features, summary)
+        scores = self._scores(item_id)
+        self._recompute(item_id)
+
+        # Listes qui contenaient déjà cet élément : un score en baisse peut faire entrer quelqu'un d'autre
+        listed = set(self.referrers.get(item_id, ()))
+        for other in listed:
+            entries = self.neighbors[other]
+            position = next(index for index, entry in enumerate(entries) if entry[1] == item_id)
+            if other in scores and scores[other][0] >= entries[position][0]:
+                entries[position] = (scores[other][0], item_id, scores[other][1])
+                entries.sort(key=lambda entry: (-entry[0], entry[1]))
+            else:
+                self._recompute(other)
+
+        # Les autres listes ne changent que si le nouveau score y entre
+        for other, (score, shared) in scores.items():
+            if other in listed:
+                continue
+            entries = self.neighbors[other]
+            if len(entries) >= self.top_k and (-score, item_id) >= (-entries[-1][0], entries[-1][1]):
+                continue
+            entries.append((score, item_id, shared))
+            entries.sort(key=lambda entry: (-entry[0], entry[1]))
+            self.referrers[item_id].add(other)
+            if len(entries) > self.top_k:
+                self.referrers[entries.pop()[1]].discard(other)
+
+    def remove(self, item_id: str):
+        if item_id not in self.features:
+            return
+        listed = self.referrers.pop(item_id, set())
+        self._set_neighbors(item_id, [])
+        del self.neighbors[item_id]
+        self._discard(item_id)
+        for other in listed:
+            self._recompute(other)
+        self.referrers.pop(item_id, None)
+
+    def rebuild(self, items: List[Tuple[str, Dict[str, Iterable[str]], dict]], block_size: int = 1024):
+        # Reconstruction complète : produits de matrices creuses, par blocs de lignes pour borner la mémoire
+        self.features, self.sizes, self.summaries, self.neighbors = {}, {}, {}, {}
+        self.postings = {kind: defaultdict(set) for kind in self.weights}
+        self.referrers = defaultdict(set)
+        for item_id, features, summary in items:
+            self._add(item_id, features, summary)
+        ids = list(self.features)
+        count = len(ids)
+        if not count:
+            return
+
+        matrices = {}
+        for kind in self.weights:
+            vocabulary: Dict[str, int] = {}
+            rows, columns = [], []
+            for row, item_id in enumerate(ids):
+                for value in self.features[item_id][kind]:
+                    rows.append(row)
+                    columns.append(vocabulary.setdefault(value, len(vocabulary)))
+            matrices[kind] = sparse.csr_matrix(
+                (np.ones(len(rows)), (rows, columns)), shape=(count, max(len(vocabulary), 1))
+            )
+        sizes = np.array([self.sizes[item_id] for item_id in ids])
+        id_ranks = np.empty(count, dtype=np.int64)
+        id_ranks[np.argsort(np.array(ids))] = np.arange(count)
+
+        for start in range(0, count, block_size):
+            stop = min(start + block_size, count)
+            shared = {}
+            for kind, matrix in matrices.items():
+                shared[kind] = (matrix[start:stop] @ matrix.T).tocsr()
+                shared[kind].sort_indices()
+            intersection = sum(self.weights[kind] * shared[kind] for kind in self.weights)
+            if self.require:
+                intersection = intersection.multiply(shared[self.require] > 0)
+            intersection = sparse.csr_matrix(intersection)
+            intersection.sort_indices()
+
+            for offset in range(stop - start):
+                row = start + offset
+                low, high = intersection.indptr[offset], intersection.indptr[offset + 1]
+                columns = intersection.indices[low:high]
+                values = intersection.data[low:high]
+                keep = (columns != row) & (values > 0)
+                columns, values = columns[keep], values[keep]
+                if not len(columns):
+                    self.neighbors[ids[row]] = []
+                    continue
+                scores = values / (sizes[row] + sizes[columns] - values)
+                if len(scores) > self.top_k:
+                    # Candidats au-dessus du K-ième score, ex æquo départagés par id comme en incrémental
+                    threshold = np.partition(scores, len(scores) - self.top_k)[len(scores) - self.top_k]
+                    selected = np.nonzero(scores >= threshold)[0]
+                    columns, scores = columns[selected], scores[selected]
+                    selected = np.lexsort((id_ranks[columns], -scores))[:self.top_k]
+                    columns, scores = columns[selected], scores[selected]
+                # Nombre de références partagées par type, pour les seuls voisins retenus
+                kind_counts = {}
+                for kind, matrix in shared.items():
+                    kind_low, kind_high = matrix.indptr[offset], matrix.indptr[offset + 1]
+                    if kind_low == kind_high:
+                        continue
+                    positions = np.minimum(np.searchsorted(matrix.indices[kind_low:kind_high], columns), kind_high - kind_low - 1)
+                    found = matrix.indices[kind_low:kind_high][positions] == columns
+                    kind_counts[kind] = np.where(found, matrix.data[kind_low:kind_high][positions], 0).astype(int).tolist()
+                candidates = {}
+                for position, (column, score) in enumerate(zip(columns.tolist(), scores.tolist())):
+                    counts = {kind: values[position] for kind, values in kind_counts.items() if values[position]}
+                    candidates[ids[column]] = (score, counts)
+                self.neighbors[ids[row]] = self._top(candidates)
+
+        for item_id, neighbors in self.neighbors.items():
+            for _, other, _ in neighbors:
+                self.referrers[other].add(item_id)
+
+    def info(self) -> dict:
+        return {
+            "items": len(self.features),
+            "pairs": sum(len(neighbors) for neighbors in self.neighbors.values()),
+            "top_k": self.top_k,
+            "weights": self.weights,
+        }
+
+
+# Index par collection, alimentés par le flux de changements (/api/events)
+class RelatedIndexes:
+    def __init__(self, specs: Dict[str, dict], top_k: int = 20, decode: Optional[Callable[[str, dict], dict]] = None):
+        # collection -> {"weights": ..., "require": ..., "summary": [...]}
+        self.specs = specs
+        self.top_k = top_k
+        # Restitue les champs omis au stockage (valeurs par défaut) avant de construire les résumés
+        self.decode = decode
+        self.indexes = {
+            collection: SimilarityIndex(spec["weights"], top_k, spec.get("require"))
+            for collection, spec in specs.items()
+        }
+        self.ready = False
+        self.stats = {"rebuilds": 0, "rebuild_seconds": None, "updates": 0}
+        self._rebuilding = False
+        # Ids modifiés pendant une reconstruction, réappliqués après l'échange
+        self._dirty: Dict[str, set] = {collection: set() for collection in specs}
+        self._lock = asyncio.Lock()
+
+    def projection(self, collection: str) -> dict:
+        fields = list(self.specs[collection]["weights"]) + self.specs[collection]["summary"]
+        return {"_id": 0, "id": 1, **{field: 1 for field in fields}}
+
+    def relevant_fields(self, collection: str) -> set:
+        return set(self.specs[collection]["weights"]) | set(self.specs[collection]["summary"])
+
+    def entry(self, collection: str, doc: dict) -> tuple:
+        spec = self.specs[collection]
+        if self.decode is not None:
+            doc = self.decode(collection, doc)
+        features = {kind: doc.get(kind) or [] for kind in spec["weights"]}
+        summary = {"id": doc["id"], **{field: doc.get(field) for field in spec["summary"]}}
+        return doc["id"], features, summary
+
+    async def rebuild(self, database, block_size: int = 1024) -> dict:
+        async with self._lock:
+            started = time.perf_counter()
+            self._rebuilding = True
+            try:
+                rebuilt = {}
+                for collection, index in self.indexes.items():
+                    docs = await database[collection].find({}, self.projection(collection)).to_list(None)
+                    fresh = SimilarityIndex(index.weights, self.top_k, index.require)
+                    # Calcul hors de la boucle d'événements ; l'index en service reste lisible
+                    await asyncio.to_thread(fresh.rebuild, [self.entry(collection, doc) for doc in docs], block_size)
+                    rebuilt[collection] = fresh
+                self.indexes.update(rebuilt)
+                self.ready = True
+            finally:
+                self._rebuilding = False
+            for collection, ids in self._dirty.items():
+                if ids:
+                    pending, self._dirty[collection] = ids, set()
+                    await self.refresh(database, collection, pending)
+            self.stats["rebuilds"] += 1
+            self.stats["rebuild_seconds"] = round(time.perf_counter() - started, 3)
+            return self.info()
+
+    async def refresh(self, database, collection: str, ids: Iterable[str]):
+        ids = set(ids)
+        if self._rebuilding:
+            self._dirty[collection] |= ids
+        docs = await database[collection].find({"id": {"$in": list(ids)}}, self.projection(collection)).to_list(None)
+        index = self.indexes[collection]
+        for doc in docs:
+            index.update(*self.entry(collection, doc))
+        for missing in ids - {doc["id"] for doc in docs}:
+            index.remove(missing)
+        self.stats["updates"] += len(ids)
+
+    async def follow(self, bus, database):
+        # Abonné avant la construction initiale : les écritures pendant le calcul sont rattrapées
+        # ensuite ; avec les change streams, celles des autres workers aussi
+        subscription = bus.subscribe(list(self.indexes))
+        try:
+            try:
+                await self.rebuild(database)
+            except Exception as e:
+                logger.error(f"Related index build failed: {e}")
+            while True:
+                batch = [await subscription.get()]
+                while not subscription.queue.empty():
+                    batch.append(subscription.queue.get_nowait())
+                rebuild = False
+                changed: Dict[str, set] = defaultdict(set)
+                for event in batch:
+                    if event["type"] == "resync" or event.get("id") is None:
+                        rebuild = True
+                    elif event["op"] == "delete" or event["fields"] is None or set(event["fields"]) & self.relevant_fields(event["collection"]):
+                        changed[event["collection"]].add(event["id"])
+                try:
+                    if rebuild:
+                        await self.rebuild(database)
+                        continue
+                    for collection, ids in changed.items():
+                        await self.refresh(database, collection, ids)
+                except Exception as e:
+                    logger.error(f"Related index update failed: {e}")
+        finally:
+            bus.unsubscribe(subscription)
+
+    def info(self) -> dict:
+        return {
+            "ready": self.ready,
+            **self.stats,
+            "indexes": {collection: index.info() for collection, index in self.indexes.items()},
+        }
@@ -1,25 +1,109 @@
-from fastapi import FastAPI, APIRouter, HTTPException, Depends, status
+from fastapi import FastAPI, APIRouter, HTTPException, Depends, Query, Request, status
+from fastapi.responses import PlainTextResponse, Response, StreamingResponse
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import ASCENDING, DESCENDING, IndexModel, ReadPreference, ReplaceOne, ReturnDocument, UpdateMany, UpdateOne
+from pymongo.errors import BulkWriteError, OperationFailure, PyMongoError
+import pymongo
 import os
 import logging
 from pathlib import Path
 from pydantic import BaseModel, Field
-from typing import List, Optional
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Iterable, List, Optional
+from contextlib import asynccontextmanager
 import uuid
 from datetime import datetime, timezone, timedelta
 import jwt
 import hashlib
+import re
+import unicodedata
+import base64
+import json
+import asyncio
+import time
+import orjson
+
+from cache import MISS, AuthCache, create_cache, etag_matches
+from database import MongoTimeoutMiddleware, PoolMonitor, mongo_options, read_preference, warm_pool
+from ratelimit import RateLimitMiddleware, create_rate_limiter
+from profiling import Metrics, MongoCommandListener, ProfilingMiddleware, TimedRoute, timed
+from events import EventBus, create_event_relay, event_stream, watch_changes
+from images import ASPECT_RATIOS, FORMATS, WIDTHS, DiskLRUCache, ImageError, ImageProxy, normalize_settings
+from related import RelatedIndexes
+from responses import FastJSONResponse
+from storage import StorageCodec, migrate_storage
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
 
-# MongoDB connection
+# Métriques par route ; le listener attribue le temps Mongo à la requête en cours
+metrics = Metrics()
+
+# MongoDB connection (pool, timeouts et compression configurables, voir database.py)
+pool_monitor = PoolMonitor()
+MONGO_OPTIONS = mongo_options()
+# Lectures des routes GET : MONGO_READ_PREFERENCE=secondaryPreferred les envoie vers les
+# secondaires (lectures éventuellement en retard sur les écritures) ; écritures et auth sur le primaire
+READ_PREFERENCE = read_preference(os.environ.get('MONGO_READ_PREFERENCE', 'primary'))
+# Budget Mongo par requête (maxTimeMS), en secondes
+MONGO_READ_TIMEOUT = float(os.environ.get('MONGO_READ_TIMEOUT', '5'))
+MONGO_WRITE_TIMEOUT = float(os.environ.get('MONGO_WRITE_TIMEOUT', '15'))
+HEALTH_TIMEOUT = 1.0
+
+def connect(url: str) -> AsyncIOMotorClient:
+    # Motor ne se connecte qu'à la première opération ; le pool est préchauffé au démarrage
+    return AsyncIOMotorClient(url, event_listeners=[MongoCommandListener(metrics), pool_monitor], **MONGO_OPTIONS)
+
+def use_database(database):
+    global db, read_db
+    db = database
+    read_db = database if READ_PREFERENCE == ReadPreference.PRIMARY else database.with_options(read_preference=READ_PREFERENCE)
+
 mongo_url = os.environ['MONGO_URL']
-client = AsyncIOMotorClient(mongo_url)
-db = client[os.environ['DB_NAME']]
+client = connect(mongo_url)
+db = read_db = None
+use_database(client[os.environ['DB_NAME']])
+_started = False
+# Transactions multi-documents si le déploiement les supporte (replica set / mongos)
+USE_TRANSACTIONS = os.environ.get('MONGO_USE_TRANSACTIONS', 'true').lower() == 'true'
+
+# Chemin de lecture rapide : documents Mongo renvoyés tels quels (sans reconstruire les modèles)
+FAST_RESPONSES = os.environ.get('FAST_RESPONSES', 'false').lower() == 'true'
+
+# Read cache (mémoire par défaut, Redis si CACHE_REDIS_URL est défini) ;
+# les requêtes identiques simultanées partagent une seule requête Mongo (COALESCE_REQUESTS)
+cache = create_cache()
+
+# Débit des écritures et de la recherche par client, partagé entre workers si Redis est configuré
+rate_limiter = create_rate_limiter()
+
+# Proxy d'images : vignettes générées côté serveur, cache disque LRU
+IMAGE_CACHE_DIR = Path(os.environ.get('IMAGE_CACHE_DIR', ROOT_DIR / 'image_cache'))
+IMAGE_CACHE_MAX_BYTES = int(os.environ.get('IMAGE_CACHE_MAX_BYTES', 512 * 1024 * 1024))
+IMAGE_MAX_AGE = int(os.environ.get('IMAGE_MAX_AGE', 86400))
+image_proxy = ImageProxy(DiskLRUCache(IMAGE_CACHE_DIR, IMAGE_CACHE_MAX_BYTES))
+
+# Flux de changements (/api/events) : change streams Mongo si disponibles, sinon publication par les handlers,
+# relayée entre workers par Redis si EVENTS_REDIS_URL (ou CACHE_REDIS_URL) est défini
+events = EventBus(
+    queue_size=int(os.environ.get('EVENTS_QUEUE_SIZE', '256')),
+    history=int(os.environ.get('EVENTS_HISTORY', '1000')),
+    relay=create_event_relay()
+)
+EVENTS_KEEPALIVE = float(os.environ.get('EVENTS_KEEPALIVE', '15'))
+EVENTS_RETRY_MS = 3000
+_events_task: Optional[asyncio.Task] = None
+_relay_task: Optional[asyncio.Task] = None
+
+# Films similaires et partenaires : Jaccard pondéré sur les liens, index en mémoire
+# tenu à jour par le flux de changements
+related = RelatedIndexes({
+    "movies": {"weights": {"actors": 1.0, "genres": 0.5}, "summary": ["title", "image", "image_settings"]},
+    "actors": {"weights": {"movies": 1.0, "genres": 0.5}, "require": "movies", "summary": ["name", "image", "image_settings"]},
+}, top_k=int(os.environ.get('RELATED_TOP_K', '20')), decode=lambda collection, doc: CODECS[collection].decode(doc))
+_related_task: Optional[asyncio.Task] = None
 
 # Security
 SECRET_KEY = "votre_secret_key_tres_securise_pour_jwt"
@@ -28,15 +112,49 @@ ACCESS_TOKEN_EXPIRE_MINUTES = 30
 
 security = HTTPBearer()
 
+# Jetons vérifiés et utilisateurs gardés en mémoire : l'authentification évite Mongo
+auth_cache = AuthCache(
+    max_tokens=int(os.environ.get('AUTH_CACHE_MAX_TOKENS', '4096')),
+    user_ttl=float(os.environ.get('AUTH_USER_TTL', '60'))
+)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    global _started, _events_task, _relay_task, _related_task
+    await warm_pool(client, MONGO_OPTIONS["minPoolSize"])
+    await ensure_indexes(db)
+    # Dates encore stockées en chaînes ISO : converties avant de servir la pagination
+    await migrate_storage(db, CODECS, dates_only=True)
+    await backfill_search_keys(db)
+    await ensure_counters(db)
+    _events_task = asyncio.create_task(watch_changes(db, events, CATALOG_MODELS))
+    if events.relay is not None:
+        _relay_task = asyncio.create_task(events.relay.run(events))
+    # Construction initiale en tâche de fond : /related répond 503 d'ici là
+    _related_task = asyncio.create_task(related.follow(events, db))
+    _started = True
+    yield
+    _started = False
+    for task in (_events_task, _relay_task, _related_task):
+        if task is not None:
+            task.cancel()
+    await image_proxy.close()
+    client.close()
+
 # Create the main app
-app = FastAPI(title="MovieHub API")
-api_router = APIRouter(prefix="/api")
+app = FastAPI(title="MovieHub API", default_response_class=FastJSONResponse, lifespan=lifespan)
+# Routes instrumentées : temps de validation FastAPI dans Server-Timing et /metrics
+api_router = APIRouter(prefix="/api", route_class=TimedRoute)
 
 # Pydantic Models
 class Genre(BaseModel):
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
     name: str
     type: str  # "movie" or "actor"
+    # Compteurs dénormalisés, maintenus par les handlers d'écriture
+    movie_count: int = 0
+    actor_count: int = 0
+    total_runtime: int = 0  # en minutes
     created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
 
 class Movie(BaseModel):
@@ -49,6 +167,7 @@ class Movie(BaseModel):
     description: Optional[str] = None
     genres: List[str] = []  # IDs des genres
     duration: Optional[int] = None  # en minutes
+    actor_count: int = 0
     is_favorite: bool = False
     created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
 
@@ -61,6 +180,7 @@ class Actor(BaseModel):
     movies: List[str] = []  # IDs des films
     description: Optional[str] = None
     genres: List[str] = []  # IDs des genres (ex: "comique", "action")
+    movie_count: int = 0
     is_favorite: bool = False
     created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
 
@@ -93,6 +213,14 @@ class GenreCreate(BaseModel):
     name: str
     type: str
 
+class FavoriteState(BaseModel):
+    id: str
+    is_favorite: bool
+
+class FavoritesUpdate(BaseModel):
+    movies: List[FavoriteState] = []
+    actors: List[FavoriteState] = []
+
 class UserLogin(BaseModel):
     username: str
     password: str
@@ -116,27 +244,682 @@ def create_access_token(data: dict):
     return encoded_jwt
 
 async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)):
+    return await authenticate(credentials.credentials)
+
+async def authenticate(token: str) -> User:
+    started = time.perf_counter()
     try:
-        payload = jwt.decode(credentials.credentials, SECRET_KEY, algorithms=[ALGORITHM])
-        username: str = payload.get("sub")
+        username = auth_cache.get_token(token)
         if username is None:
-            raise HTTPException(status_code=401, detail="Invalid token")
-    except jwt.PyJWTError:
-        raise HTTPException(status_code=401, detail="Invalid token")
-    
-    user = await db.users.find_one({"username": username})
-    if user is None:
-        raise HTTPException(status_code=401, detail="User not found")
-    return User(**user)
+            try:
+                payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+                username = payload.get("sub")
+                if username is None:
+                    raise HTTPException(status_code=401, detail="Invalid token")
+            except jwt.PyJWTError:
+                raise HTTPException(status_code=401, detail="Invalid token")
+            auth_cache.set_token(token, username, payload.get("exp", time.time() + ACCESS_TOKEN_EXPIRE_MINUTES * 60))
+
+        user = auth_cache.get_user(username)
+        if user is MISS:
+            user = await db.users.find_one({"username": username})
+            if user is not None:
+                user = User(**user)
+            # Les absences sont aussi mises en cache (TTL court) pour ne pas marteler Mongo
+            auth_cache.set_user(username, user)
+        if user is None:
+            raise HTTPException(status_code=401, detail="User not found")
+        return user
+    finally:
+        auth_cache.observe(time.perf_counter() - started)
 
 # Helper functions
-def prepare_for_mongo(data):
-    if isinstance(data, dict):
-        for key, value in data.items():
-            if isinstance(value, datetime):
-                data[key] = value.isoformat()
+# Format de stockage : dates BSON natives (tri et bornes sur created_at), valeurs par défaut omises
+CODECS = {"genres": StorageCodec(Genre), "actors": StorageCodec(Actor), "movies": StorageCodec(Movie)}
+MODEL_CODECS = {codec.model: codec for codec in CODECS.values()}
+
+# Champs internes jamais renvoyés aux clients
+PUBLIC_PROJECTION = {"_id": 0, "search_keys": 0}
+
+def public_docs(docs: List[dict], model) -> list:
+    if not FAST_RESPONSES:
+        with timed("validation"):
+            return [model(**doc) for doc in docs]
+    # Les documents sont écrits via les modèles : on complète seulement les valeurs par défaut
+    defaults = MODEL_CODECS[model].defaults
+    for doc in docs:
+        for field in PUBLIC_PROJECTION:
+            doc.pop(field, None)
+    return [{**defaults, **doc} for doc in docs]
+
+def public_doc(doc: dict, model):
+    return public_docs([doc], model)[0]
+
+# Indexes
+FAVORITE_FILTER = {"is_favorite": True}
+
+INDEXES = {
+    "movies": [
+        IndexModel([("id", ASCENDING)], unique=True, name="id_unique"),
+        IndexModel([("genres", ASCENDING), ("created_at", DESCENDING), ("id", DESCENDING)], name="genres_created_at_id"),
+        IndexModel([("actors", ASCENDING), ("created_at", DESCENDING), ("id", DESCENDING)], name="actors_created_at_id"),
+        IndexModel(
+            [("is_favorite", ASCENDING), ("created_at", DESCENDING), ("id", DESCENDING)],
+            partialFilterExpression=FAVORITE_FILTER,
+            name="is_favorite_true_created_at_id"
+        ),
+        IndexModel([("created_at", DESCENDING), ("id", DESCENDING)], name="created_at_id_desc"),
+        IndexModel([("search_keys", ASCENDING)], name="search_keys"),
+    ],
+    "actors": [
+        IndexModel([("id", ASCENDING)], unique=True, name="id_unique"),
+        IndexModel([("movies", ASCENDING), ("created_at", DESCENDING), ("id", DESCENDING)], name="movies_created_at_id"),
+        IndexModel([("genres", ASCENDING), ("created_at", DESCENDING), ("id", DESCENDING)], name="genres_created_at_id"),
+        IndexModel(
+            [("is_favorite", ASCENDING), ("created_at", DESCENDING), ("id", DESCENDING)],
+            partialFilterExpression=FAVORITE_FILTER,
+            name="is_favorite_true_created_at_id"
+        ),
+        IndexModel([("created_at", DESCENDING), ("id", DESCENDING)], name="created_at_id_desc"),
+        IndexModel([("search_keys", ASCENDING)], name="search_keys"),
+    ],
+    "genres": [
+        IndexModel([("id", ASCENDING)], unique=True, name="id_unique"),
+        IndexModel([("type", ASCENDING)], name="type"),
+    ],
+    "users": [
+        IndexModel([("username", ASCENDING)], unique=True, name="username_unique"),
+    ],
+}
+
+# Requêtes chaudes des handlers : (collection, filtre, tri)
+HOT_QUERIES = [
+    ("movies", {"id": ""}, None),
+    ("movies", {}, [("created_at", DESCENDING), ("id", DESCENDING)]),
+    ("movies", {"genres": ""}, [("created_at", DESCENDING), ("id", DESCENDING)]),
+    ("actors", {}, [("created_at", DESCENDING), ("id", DESCENDING)]),
+    ("movies", {"is_favorite": True}, None),
+    ("movies", {"is_favorite": True}, [("created_at", DESCENDING), ("id", DESCENDING)]),
+    ("movies", {"genres": ""}, None),
+    ("movies", {"actors": ""}, None),
+    ("movies", {"search_keys": ""}, None),
+    ("actors", {"id": ""}, None),
+    ("actors", {"is_favorite": True}, None),
+    ("actors", {"movies": ""}, None),
+    ("actors", {"search_keys": ""}, None),
+    ("genres", {"id": ""}, None),
+    ("genres", {"type": "movie"}, None),
+    ("users", {"username": ""}, None),
+]
+
+async def ensure_indexes(database) -> Dict[str, List[str]]:
+    created = {}
+    for collection, indexes in INDEXES.items():
+        try:
+            created[collection] = await database[collection].create_indexes(indexes)
+        except OperationFailure as e:
+            logger.error(f"Index creation failed on {collection}: {e}")
+            created[collection] = []
+    return created
+
+def plan_stages(plan: dict) -> List[str]:
+    stages = []
+    if "stage" in plan:
+        stages.append(plan["stage"])
+    for key in ("inputStage", "queryPlan"):
+        if key in plan:
+            stages.extend(plan_stages(plan[key]))
+    for child in plan.get("inputStages", []):
+        stages.extend(plan_stages(child))
+    return stages
+
+async def index_report(database) -> dict:
+    report = {"indexes": {}, "queries": []}
+    for collection in INDEXES:
+        stats = await database[collection].aggregate([{"$indexStats": {}}]).to_list(None)
+        report["indexes"][collection] = [
+            {"name": stat["name"], "key": stat["key"], "ops": stat["accesses"]["ops"], "since": stat["accesses"]["since"]}
+            for stat in stats
+        ]
+    for collection, query, sort in HOT_QUERIES:
+        command = {"find": collection, "filter": query}
+        if sort:
+            command["sort"] = dict(sort)
+        explain = await database.command("explain", command, verbosity="queryPlanner")
+        stages = plan_stages(explain["queryPlanner"]["winningPlan"])
+        report["queries"].append({
+            "collection": collection,
+            "filter": query,
+            "sort": command.get("sort"),
+            "stages": stages,
+            "collscan": "COLLSCAN" in stages
+        })
+    return report
+
+# Link maintenance
+_transactions_supported: Optional[bool] = None
+
+async def supports_transactions() -> bool:
+    global _transactions_supported
+    if _transactions_supported is None:
+        hello = await client.admin.command("hello")
+        _transactions_supported = "setName" in hello or hello.get("msg") == "isdbgrid"
+    return _transactions_supported
+
+async def run_in_transaction(callback: Callable[[Any], Awaitable[Any]]) -> Any:
+    # with_transaction relance callback(session) sur TransientTransactionError (WriteConflict
+    # entre écritures concurrentes des mêmes compteurs) et le commit sur UnknownTransactionCommitResult :
+    # callback doit donc pouvoir être rejoué et ne rien publier lui-même
+    if USE_TRANSACTIONS and await supports_transactions():
+        async with await client.start_session() as session:
+            return await session.with_transaction(callback)
+    return await callback(None)
+
+async def sync_links(collection: str, field: str, owner_id: str, old_ids: Iterable[str], new_ids: Iterable[str], session=None) -> List[str]:
+    # Un seul bulk_write pour tout le diff, quel que soit le nombre de liens ; le filtre sur le
+    # champ garantit que le $inc du compteur ne s'applique que si le tableau change vraiment
+    old_ids, new_ids = set(old_ids), set(new_ids)
+    counter = LINK_COUNTERS[field]
+    operations = []
+    if old_ids - new_ids:
+        operations.append(UpdateMany(
+            {"id": {"$in": sorted(old_ids - new_ids)}, field: owner_id},
+            {"$pull": {field: owner_id}, "$inc": {counter: -1}}
+        ))
+    if new_ids - old_ids:
+        operations.append(UpdateMany(
+            {"id": {"$in": sorted(new_ids - old_ids)}, field: {"$ne": owner_id}},
+            {"$addToSet": {field: owner_id}, "$inc": {counter: 1}}
+        ))
+    if operations:
+        await db[collection].bulk_write(operations, ordered=False, session=session)
+    return sorted(old_ids ^ new_ids)
+
+# Denormalized counters
+# Compteur tenu à jour pour chaque tableau de liens
+LINK_COUNTERS = {"actors": "actor_count", "movies": "movie_count"}
+# Compteur des genres pour chaque collection qui les référence
+GENRE_COUNTERS = {"movies": "movie_count", "actors": "actor_count"}
+STATS_ID = "catalog"
+STATS_DEFAULTS = {"movie_count": 0, "actor_count": 0, "genre_count": 0, "total_runtime": 0}
+
+async def update_genre_counters(collection: str, old: Optional[dict], new: Optional[dict], session=None) -> List[str]:
+    # Diff des genres (et de la durée des films) entre l'ancienne et la nouvelle version
+    counter = GENRE_COUNTERS[collection]
+    old_genres = set((old or {}).get("genres") or [])
+    new_genres = set((new or {}).get("genres") or [])
+    old_runtime = (old or {}).get("duration") or 0
+    new_runtime = (new or {}).get("duration") or 0
+    operations, changed = [], []
+    for genre_id in sorted(old_genres | new_genres):
+        inc = {}
+        if (genre_id in new_genres) != (genre_id in old_genres):
+            inc[counter] = 1 if genre_id in new_genres else -1
+        if collection == "movies":
+            runtime = (new_runtime if genre_id in new_genres else 0) - (old_runtime if genre_id in old_genres else 0)
+            if runtime:
+                inc["total_runtime"] = runtime
+        if inc:
+            operations.append(UpdateOne({"id": genre_id}, {"$inc": inc}))
+            changed.append(genre_id)
+    if operations:
+        await db.genres.bulk_write(operations, ordered=False, session=session)
+    return changed
+
+async def update_stats(session=None, **inc: int):
+    inc = {field: value for field, value in inc.items() if value}
+    if inc:
+        await db.stats.update_one({"id": STATS_ID}, {"$inc": inc}, upsert=True, session=session)
+
+async def repair_counters(database) -> dict:
+    started = time.perf_counter()
+    # Longueur des tableaux de liens, calculée côté serveur
+    for collection, field in (("movies", "actors"), ("actors", "movies")):
+        await database[collection].update_many(
+            {}, [{"$set": {LINK_COUNTERS[field]: {"$let": {
+                "vars": {"size": {"$size": {"$ifNull": [f"${field}", []]}}},
+                "in": {"$cond": [{"$gt": ["$$size", 0]}, "$$size", "$$REMOVE"]}
+            }}}}]
+        )
+
+    # Compteurs des genres : une agrégation par collection référente
+    genre_counts: Dict[str, dict] = {}
+    for collection, counter in GENRE_COUNTERS.items():
+        group = {"_id": "$genres", counter: {"$sum": 1}}
+        if collection == "movies":
+            group["total_runtime"] = {"$sum": {"$ifNull": ["$duration", 0]}}
+        async for row in database[collection].aggregate([{"$unwind": "$genres"}, {"$group": group}]):
+            genre_counts.setdefault(row.pop("_id"), {}).update(row)
+    operations = [
+        UpdateOne({"_id": genre["_id"]}, CODECS["genres"].update({
+            "movie_count": 0, "actor_count": 0, "total_runtime": 0, **genre_counts.get(genre["id"], {})
+        }))
+        async for genre in database.genres.find({}, {"id": 1})
+    ]
+    if operations:
+        await database.genres.bulk_write(operations, ordered=False)
+
+    # Totaux du catalogue
+    runtime = await database.movies.aggregate([
+        {"$group": {"_id": None, "total": {"$sum": {"$ifNull": ["$duration", 0]}}}}
+    ]).to_list(1)
+    stats = {
+        "movie_count": await database.movies.count_documents({}),
+        "actor_count": await database.actors.count_documents({}),
+        "genre_count": await database.genres.count_documents({}),
+        "total_runtime": runtime[0]["total"] if runtime else 0,
+    }
+    await database.stats.replace_one({"id": STATS_ID}, {"id": STATS_ID, **stats}, upsert=True)
+    await cache.invalidate("movies", "actors", "genres")
+    events.resync_local()
+    return {**stats, "genres_updated": len(operations), "seconds": round(time.perf_counter() - started, 3)}
+
+async def ensure_counters(database):
+    # Premier démarrage après l'ajout des compteurs : tout recalculer une fois
+    if await database.stats.find_one({"id": STATS_ID}) is None:
+        await repair_counters(database)
+
+# Change feed
+# Publication depuis les handlers, utilisée seulement sans change streams (EventBus.publish_local)
+def changed_fields(old: dict, new: dict) -> List[str]:
+    return [field for field, value in new.items() if old.get(field) != value]
+
+def notify_links(collection: str, field: str, ids: List[str]):
+    if ids:
+        events.publish_local(collection, "update", ids, [field, LINK_COUNTERS[field]])
+
+def notify_genres(ids: List[str]):
+    if ids:
+        events.publish_local("genres", "update", ids, ["movie_count", "actor_count", "total_runtime"])
+
+# Reference compaction
+# Champs contenant des IDs : (collection, champ, collection référencée)
+REFERENCE_FIELDS = [
+    ("movies", "actors", "actors"),
+    ("movies", "genres", "genres"),
+    ("actors", "movies", "movies"),
+    ("actors", "genres", "genres"),
+]
+
+compaction_status = {"running": False, "started_at": None, "finished_at": None, "error": None, "fields": {}}
+_compaction_task: Optional[asyncio.Task] = None
+
+async def compact_references(database, batch_size: int = 1000) -> dict:
+    compaction_status.update({
+        "running": True,
+        "started_at": datetime.now(timezone.utc).isoformat(),
+        "finished_at": None,
+        "error": None,
+        "fields": {}
+    })
+    try:
+        for collection, field, target in REFERENCE_FIELDS:
+            counters = {"scanned": 0, "updated": 0, "removed": 0}
+            compaction_status["fields"][f"{collection}.{field}"] = counters
+            last_id = None
+            while True:
+                query = {field: {"$exists": True, "$ne": []}}
+                if last_id is not None:
+                    query["_id"] = {"$gt": last_id}
+                docs = await database[collection].find(query, {field: 1}).sort("_id", ASCENDING).limit(batch_size).to_list(batch_size)
+                if not docs:
+                    break
+                last_id = docs[-1]["_id"]
+                counters["scanned"] += len(docs)
+
+                # Une requête $in par lot pour savoir quelles références existent encore
+                referenced = {ref for doc in docs for ref in doc.get(field, [])}
+                existing = set(await database[target].distinct("id", {"id": {"$in": list(referenced)}}))
+                operations = []
+                for doc in docs:
+                    dead = [ref for ref in doc.get(field, []) if ref not in existing]
+                    if dead:
+                        update = {"$pull": {field: {"$in": dead}}}
+                        if field in LINK_COUNTERS:
+                            update["$inc"] = {LINK_COUNTERS[field]: -len(dead)}
+                        operations.append(UpdateOne({"_id": doc["_id"]}, update))
+                        counters["removed"] += len(dead)
+                if operations:
+                    await database[collection].bulk_write(operations, ordered=False)
+                    counters["updated"] += len(operations)
+        await cache.invalidate("movies", "actors")
+        events.resync_local()
+    except Exception as e:
+        logger.error(f"Reference compaction failed: {e}")
+        compaction_status["error"] = str(e)
+        raise
+    finally:
+        compaction_status["running"] = False
+        compaction_status["finished_at"] = datetime.now(timezone.utc).isoformat()
+    return compaction_status
+
+# Favorites
+# Inversion atomique côté serveur : pas de lecture préalable, pas de toggle perdu ;
+# « non favori » est la valeur par défaut, donc le champ est retiré plutôt que mis à false
+FAVORITE_TOGGLE = [{"$set": {"is_favorite": {"$cond": [{"$ifNull": ["$is_favorite", False]}, "$$REMOVE", True]}}}]
+
+async def toggle_favorite(collection, item_id: str) -> Optional[bool]:
+    item = await collection.find_one_and_update(
+        {"id": item_id}, FAVORITE_TOGGLE, projection={"is_favorite": 1}, return_document=ReturnDocument.AFTER
+    )
+    return None if item is None else item.get("is_favorite", False)
+
+async def set_favorites(collection, states: List[FavoriteState]) -> dict:
+    # Un id répété garde son dernier état ; au plus deux UpdateMany en un seul aller-retour
+    desired = {state.id: state.is_favorite for state in states}
+    requests = []
+    for value in (True, False):
+        ids = [item_id for item_id, state in desired.items() if state is value]
+        if ids:
+            requests.append(UpdateMany({"id": {"$in": ids}}, CODECS[collection.name].update({"is_favorite": value})))
+    if not requests:
+        return {"matched": 0, "modified": 0}
+    result = await collection.bulk_write(requests, ordered=False)
+    return {"matched": result.matched_count, "modified": result.modified_count}
+
+# Related items
+def related_items(collection: str, item_id: str, limit: int, not_found: str) -> list:
+    if not related.ready:
+        raise HTTPException(status_code=503, detail="Related index is building")
+    index = related.indexes[collection]
+    if item_id not in index:
+        raise HTTPException(status_code=404, detail=not_found)
+    return index.related(item_id, max(1, min(limit, related.top_k)))
+
+# Keyset pagination
+MAX_PAGE_SIZE = 500
+PAGE_SORT = [("created_at", DESCENDING), ("id", DESCENDING)]
+
+def encode_cursor(doc: dict) -> str:
+    raw = json.dumps([doc["created_at"].isoformat(), doc["id"]]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_cursor(cursor: str) -> tuple:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        created_at, last_id = json.loads(raw)
+        # created_at est une date BSON : la borne doit être une date, pas une chaîne
+        created_at = datetime.fromisoformat(created_at)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return created_at, last_id
+
+def parse_fields(fields: Optional[str], model, required: Iterable[str] = ()) -> Optional[dict]:
+    if not fields:
+        return None
+    requested = {field.strip() for field in fields.split(",") if field.strip()}
+    unknown = requested - set(model.__fields__)
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(sorted(unknown))}")
+    # id et created_at sont toujours nécessaires pour construire le curseur
+    return {"_id": 0, "id": 1, "created_at": 1, **{field: 1 for field in requested | set(required)}}
+
+async def paginate(
+    collection,
+    query: dict,
+    model,
+    limit: int,
+    cursor: Optional[str],
+    fields: Optional[str],
+    expand: Optional[str] = None
+) -> dict:
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    expand_fields = parse_expand(collection.name, expand)
+    projection = parse_fields(fields, model, required=expand_fields)
+    if cursor:
+        created_at, last_id = decode_cursor(cursor)
+        query = {"$and": [query, {"$or": [
+            {"created_at": {"$lt": created_at}},
+            {"created_at": created_at, "id": {"$lt": last_id}}
+        ]}]}
+
+    docs = await collection.find(query, projection or PUBLIC_PROJECTION).sort(PAGE_SORT).limit(limit + 1).to_list(limit + 1)
+    next_cursor = encode_cursor(docs[limit - 1]) if len(docs) > limit else None
+    docs = docs[:limit]
+    items = [CODECS[collection.name].decode(doc, projection) for doc in docs] if projection else public_docs(docs, model)
+    items = await expand_references(items, expand_fields)
+    return {"items": items, "next_cursor": next_cursor}
+
+# Reference expansion
+# Champs expansibles par collection ; le nom du champ est aussi la collection référencée
+EXPANDABLE_FIELDS = {
+    "movies": ("actors", "genres"),
+    "actors": ("movies", "genres"),
+    "search": ("actors", "movies", "genres"),
+}
+SUMMARY_PROJECTIONS = {
+    # duration : affichée dans la filmographie d'un acteur
+    "movies": {"_id": 0, "id": 1, "title": 1, "image": 1, "duration": 1},
+    "actors": {"_id": 0, "id": 1, "name": 1, "image": 1},
+    "genres": {"_id": 0, "id": 1, "name": 1},
+}
+
+def parse_expand(collection: str, expand: Optional[str]) -> List[str]:
+    if not expand:
+        return []
+    requested = [field.strip() for field in expand.split(",") if field.strip()]
+    unknown = set(requested) - set(EXPANDABLE_FIELDS[collection])
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Cannot expand: {', '.join(sorted(unknown))}")
+    return list(dict.fromkeys(requested))
+
+async def fetch_summaries(field: str, ids: set) -> Dict[str, dict]:
+    if not ids:
+        return {}
+    summaries = await read_db[field].find({"id": {"$in": list(ids)}}, SUMMARY_PROJECTIONS[field]).to_list(None)
+    return {summary["id"]: CODECS[field].decode(summary, SUMMARY_PROJECTIONS[field]) for summary in summaries}
+
+async def expand_references(items: list, expand_fields: List[str]) -> list:
+    if not expand_fields:
+        return items
+    docs = [item.dict() if isinstance(item, BaseModel) else item for item in items]
+    # Une requête $in par collection référencée, lancées en parallèle
+    lookups = await asyncio.gather(*[
+        fetch_summaries(field, {ref for doc in docs for ref in doc.get(field) or []})
+        for field in expand_fields
+    ])
+    for field, by_id in zip(expand_fields, lookups):
+        for doc in docs:
+            doc[field] = [by_id[ref] for ref in doc.get(field) or [] if ref in by_id]
+    return docs
+
+# Search index
+# Champs indexés par collection : (champ principal, description)
+SEARCH_FIELDS = {
+    "movies": ("title", "description"),
+    "actors": ("name", "description"),
+}
+SEARCH_PREFIX_MAX = 15
+SEARCH_PRIMARY_WEIGHT = 10
+DESCRIPTION_KEY_PREFIX = "d:"
+
+def fold_text(text: Optional[str]) -> List[str]:
+    # Minuscules sans accents : "Comédie" -> ["comedie"]
+    normalized = unicodedata.normalize("NFKD", text or "")
+    stripped = "".join(c for c in normalized if not unicodedata.combining(c)).lower()
+    return re.findall(r"[^\W_]+", stripped)
+
+def build_search_keys(primary: Optional[str], description: Optional[str]) -> List[str]:
+    keys = set()
+    # Préfixes des mots du titre/nom pour la recherche au fil de la frappe
+    for word in fold_text(primary):
+        for end in range(1, min(len(word), SEARCH_PREFIX_MAX) + 1):
+            keys.add(word[:end])
+    # Mots complets de la description, moins pondérés
+    for word in fold_text(description):
+        keys.add(DESCRIPTION_KEY_PREFIX + word)
+    return sorted(keys)
+
+def add_search_keys(collection: str, data: dict) -> dict:
+    primary, description = SEARCH_FIELDS[collection]
+    data["search_keys"] = build_search_keys(data.get(primary), data.get(description))
     return data
 
+def search_pipeline(q: str, limit: int) -> Optional[List[dict]]:
+    tokens = sorted({token[:SEARCH_PREFIX_MAX] for token in fold_text(q)})
+    if not tokens:
+        return None
+    description_tokens = [DESCRIPTION_KEY_PREFIX + token for token in tokens]
+
+    def matched(keys: List[str]) -> dict:
+        # search_keys est sans doublon : équivaut à $size de $setIntersection, aussi évalué par mongomock
+        return {"$size": {"$filter": {"input": "$search_keys", "cond": {"$in": ["$$this", keys]}}}}
+
+    score = {"$add": [{"$multiply": [SEARCH_PRIMARY_WEIGHT, matched(tokens)]}, matched(description_tokens)]}
+    return [
+        {"$match": {"$and": [
+            {"search_keys": {"$in": [token, DESCRIPTION_KEY_PREFIX + token]}} for token in tokens
+        ]}},
+        {"$set": {"score": score}},
+        {"$sort": {"score": -1, "created_at": -1}},
+        {"$limit": limit},
+        {"$project": {**PUBLIC_PROJECTION, "score": 0}}
+    ]
+
+async def backfill_search_keys(database, rebuild: bool = False, batch_size: int = 1000) -> Dict[str, int]:
+    updated = {}
+    for collection, fields in SEARCH_FIELDS.items():
+        query = {} if rebuild else {"search_keys": {"$exists": False}}
+        projection = {"_id": 1, **{field: 1 for field in fields}}
+        updated[collection] = 0
+        batch = []
+        async for doc in database[collection].find(query, projection):
+            keys = add_search_keys(collection, doc)["search_keys"]
+            batch.append(UpdateOne({"_id": doc["_id"]}, {"$set": {"search_keys": keys}}))
+            if len(batch) >= batch_size:
+                await database[collection].bulk_write(batch, ordered=False)
+                updated[collection] += len(batch)
+                batch = []
+        if batch:
+            await database[collection].bulk_write(batch, ordered=False)
+            updated[collection] += len(batch)
+    return updated
+
+# Bulk import/export
+# Ordre d'export : genres et acteurs avant les films qui les référencent
+CATALOG_MODELS = {"genres": Genre, "actors": Actor, "movies": Movie}
+# Liens réciproques reconstruits après un import : (source, champ, cible, champ inverse)
+RECIPROCAL_LINKS = [
+    ("movies", "actors", "actors", "movies"),
+    ("actors", "movies", "movies", "actors"),
+]
+MAX_IMPORT_LINE = 1024 * 1024
+MAX_REPORTED_ERRORS = 100
+EXPORT_CHUNK_SIZE = 64 * 1024
+
+async def iter_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+    # Mémoire bornée : au plus un morceau reçu plus une ligne incomplète
+    buffer = b""
+    async for chunk in chunks:
+        *lines, buffer = (buffer + chunk).split(b"\n")
+        # Lignes complètes comme ligne en cours : un morceau peut contenir une ligne entière trop longue
+        if max(map(len, lines), default=0) > MAX_IMPORT_LINE or len(buffer) > MAX_IMPORT_LINE:
+            raise ValueError(f"Import line longer than {MAX_IMPORT_LINE} bytes")
+        for line in lines:
+            if line.strip():
+                yield line
+    if buffer.strip():
+        yield buffer
+
+def parse_catalog_line(line: bytes) -> tuple:
+    record = orjson.loads(line)
+    collection = record.get("collection")
+    if collection not in CATALOG_MODELS:
+        raise ValueError(f"Unknown collection: {collection}")
+    doc = CODECS[collection].encode(CATALOG_MODELS[collection](**record["document"]).dict())
+    if collection in SEARCH_FIELDS:
+        add_search_keys(collection, doc)
+    return collection, doc
+
+def record_import_error(report: dict, line: Optional[int], message: str):
+    report["error_count"] += 1
+    if len(report["errors"]) < MAX_REPORTED_ERRORS:
+        report["errors"].append({"line": line, "error": message})
+
+async def flush_import_batch(database, collection: str, docs: List[dict], upsert: bool, report: dict):
+    try:
+        if upsert:
+            result = await database[collection].bulk_write(
+                [ReplaceOne({"id": doc["id"]}, doc, upsert=True) for doc in docs],
+                ordered=False
+            )
+            report["imported"][collection] += result.upserted_count + result.matched_count
+        else:
+            result = await database[collection].insert_many(docs, ordered=False)
+            report["imported"][collection] += len(result.inserted_ids)
+    except BulkWriteError as e:
+        details = e.details
+        report["imported"][collection] += details.get("nInserted", 0) + details.get("nUpserted", 0) + details.get("nMatched", 0)
+        for error in details.get("writeErrors", []):
+            record_import_error(report, None, f"{collection} {docs[error['index']]['id']}: {error['errmsg']}")
+
+async def relink_catalog(database, batch_size: int = 1000):
+    # Second passage : chaque lien movie.actors / actor.movies est recopié de l'autre côté.
+    # Liens regroupés par cible côté serveur, puis un $addToSet par cible en bulk_write comme
+    # sync_links ; une cible absente n'est pas créée (pas d'upsert)
+    for source, field, target, reverse in RECIPROCAL_LINKS:
+        batch = []
+        async for row in database[source].aggregate([
+            {"$match": {field: {"$exists": True, "$ne": []}}},
+            {"$unwind": f"${field}"},
+            {"$group": {"_id": f"${field}", "linked": {"$addToSet": "$id"}}}
+        ]):
+            batch.append(UpdateOne({"id": row["_id"]}, {"$addToSet": {reverse: {"$each": sorted(row["linked"])}}}))
+            if len(batch) >= batch_size:
+                await database[target].bulk_write(batch, ordered=False)
+                batch = []
+        if batch:
+            await database[target].bulk_write(batch, ordered=False)
+
+async def import_catalog(database, lines: AsyncIterator[bytes], batch_size: int = 1000, upsert: bool = False) -> dict:
+    started = time.perf_counter()
+    report = {"lines": 0, "imported": {collection: 0 for collection in CATALOG_MODELS}, "error_count": 0, "errors": []}
+    batches = {collection: [] for collection in CATALOG_MODELS}
+    async for line in lines:
+        report["lines"] += 1
+        try:
+            collection, doc = parse_catalog_line(line)
+        except (ValueError, TypeError, KeyError) as e:
+            record_import_error(report, report["lines"], str(e))
+            continue
+        batches[collection].append(doc)
+        if len(batches[collection]) >= batch_size:
+            await flush_import_batch(database, collection, batches[collection], upsert, report)
+            batches[collection] = []
+    for collection, docs in batches.items():
+        if docs:
+            await flush_import_batch(database, collection, docs, upsert, report)
+
+    await relink_catalog(database, batch_size)
+    await repair_counters(database)
+    await cache.invalidate(*CATALOG_MODELS)
+    elapsed = time.perf_counter() - started
+    imported = sum(report["imported"].values())
+    report["seconds"] = round(elapsed, 3)
+    report["documents_per_second"] = round(imported / elapsed, 1) if elapsed else None
+    return report
+
+def parse_collections(collections: Optional[str]) -> List[str]:
+    if not collections:
+        return list(CATALOG_MODELS)
+    requested = [collection.strip() for collection in collections.split(",") if collection.strip()]
+    unknown = set(requested) - set(CATALOG_MODELS)
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown collections: {', '.join(sorted(unknown))}")
+    return requested
+
+async def export_catalog(database, collections: List[str]) -> AsyncIterator[bytes]:
+    chunk = bytearray()
+    for collection in collections:
+        async for doc in database[collection].find({}, PUBLIC_PROJECTION, batch_size=1000):
+            # Documents complets à l'export : le fichier ne dépend pas du format de stockage
+            chunk += orjson.dumps({"collection": collection, "document": CODECS[collection].decode(doc)}) + b"\n"
+            if len(chunk) >= EXPORT_CHUNK_SIZE:
+                yield bytes(chunk)
+                chunk.clear()
+    if chunk:
+        yield bytes(chunk)
+
 # Auth endpoints
 @api_router.get("/")
 async def root():
@@ -148,6 +931,7 @@ async def login(user_data: UserLogin):
     if not user or not verify_password(user_data.password, user["password_hash"]):
         raise HTTPException(status_code=401, detail="Invalid credentials")
     
+    auth_cache.set_user(user["username"], User(**user))
     access_token = create_access_token(data={"sub": user["username"]})
     return {"access_token": access_token, "token_type": "bearer"}
 
@@ -156,242 +940,577 @@ async def get_me(current_user: User = Depends(get_current_user)):
     return current_user
 
 # Movies endpoints
-@api_router.get("/movies", response_model=List[Movie])
-async def get_movies(skip: int = 0, limit: int = 100):
-    movies = await db.movies.find().skip(skip).limit(limit).to_list(limit)
-    return [Movie(**movie) for movie in movies]
+@api_router.get("/movies")
+@cache.conditional("movies", tags=("movies", "actors", "genres"))
+@cache.coalesced("movies", tags=("movies", "actors", "genres"))
+async def get_movies(
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+    genre: Optional[str] = None,
+    actor: Optional[str] = None,
+    favorite: Optional[bool] = None,
+    expand: Optional[str] = None
+):
+    query = {}
+    if genre:
+        query["genres"] = genre
+    if actor:
+        query["actors"] = actor
+    if favorite is not None:
+        query["is_favorite"] = True if favorite else {"$ne": True}
+    return await paginate(read_db.movies, query, Movie, limit, cursor, fields, expand)
 
 @api_router.get("/movies/featured")
+@cache.conditional("movies/featured", tags=("movies",))
+@cache.cached("movies/featured", tags=("movies",))
 async def get_featured_movie():
-    movie = await db.movies.find_one({}, sort=[("created_at", -1)])
+    movie = await read_db.movies.find_one({}, PUBLIC_PROJECTION, sort=[("created_at", -1)])
     if movie:
-        return Movie(**movie)
+        return public_doc(movie, Movie)
     return None
 
 @api_router.get("/movies/recent", response_model=List[Movie])
+@cache.conditional("movies/recent", tags=("movies",))
+@cache.cached("movies/recent", tags=("movies",))
 async def get_recent_movies(limit: int = 6):
-    movies = await db.movies.find().sort("created_at", -1).limit(limit).to_list(limit)
-    return [Movie(**movie) for movie in movies]
+    movies = await read_db.movies.find({}, PUBLIC_PROJECTION).sort("created_at", -1).limit(limit).to_list(limit)
+    return public_docs(movies, Movie)
 
 @api_router.get("/movies/favorites", response_model=List[Movie])
+@cache.conditional("movies/favorites", tags=("movies",))
+@cache.cached("movies/favorites", tags=("movies",))
 async def get_favorite_movies(limit: int = 6):
-    movies = await db.movies.find({"is_favorite": True}).limit(limit).to_list(limit)
-    return [Movie(**movie) for movie in movies]
+    movies = await read_db.movies.find({"is_favorite": True}, PUBLIC_PROJECTION).limit(limit).to_list(limit)
+    return public_docs(movies, Movie)
 
 @api_router.get("/movies/by-genre/{genre_id}", response_model=List[Movie])
+@cache.conditional("movies/by-genre", tags=("movies",))
+@cache.cached("movies/by-genre", tags=("movies",))
 async def get_movies_by_genre(genre_id: str, limit: int = 6):
-    movies = await db.movies.find({"genres": genre_id}).limit(limit).to_list(limit)
-    return [Movie(**movie) for movie in movies]
+    movies = await read_db.movies.find({"genres": genre_id}, PUBLIC_PROJECTION).limit(limit).to_list(limit)
+    return public_docs(movies, Movie)
+
+@api_router.get("/movies/{movie_id}")
+@cache.conditional("movie", tags=("movies", "actors", "genres"))
+@cache.coalesced("movie", tags=("movies", "actors", "genres"))
+async def get_movie(movie_id: str, expand: Optional[str] = None):
+    expand_fields = parse_expand("movies", expand)
+    movie = await read_db.movies.find_one({"id": movie_id}, PUBLIC_PROJECTION)
+    if not movie:
+        raise HTTPException(status_code=404, detail="Movie not found")
+    return (await expand_references([public_doc(movie, Movie)], expand_fields))[0]
+
+@api_router.get("/movies/{movie_id}/related")
+async def get_related_movies(movie_id: str, limit: int = 10):
+    return related_items("movies", movie_id, limit, "Movie not found")
 
 @api_router.post("/movies", response_model=Movie)
 async def create_movie(movie: MovieCreate, current_user: User = Depends(get_current_user)):
     movie_dict = movie.dict()
-    movie_obj = Movie(**movie_dict)
-    movie_data = prepare_for_mongo(movie_obj.dict())
-    await db.movies.insert_one(movie_data)
+    movie_obj = Movie(**movie_dict, actor_count=len(movie.actors))
+    movie_data = add_search_keys("movies", CODECS["movies"].encode(movie_obj.dict()))
     
-    # Liaison bidirectionnelle avec les acteurs
-    for actor_id in movie_obj.actors:
-        actor = await db.actors.find_one({"id": actor_id})
-        if actor and movie_obj.id not in actor.get("movies", []):
-            await db.actors.update_one(
-                {"id": actor_id}, 
-                {"$addToSet": {"movies": movie_obj.id}}
-            )
+    # Liaison bidirectionnelle avec les acteurs, compteurs des acteurs, genres et du catalogue
+    async def apply(session):
+        await db.movies.insert_one(movie_data, session=session)
+        linked = await sync_links("actors", "movies", movie_obj.id, [], movie_obj.actors, session=session)
+        genres = await update_genre_counters("movies", None, movie_data, session=session)
+        await update_stats(session, movie_count=1, total_runtime=movie_obj.duration or 0)
+        return linked, genres
+
+    linked, genres = await run_in_transaction(apply)
+    await cache.invalidate("movies", "actors", "genres")
+    events.publish_local("movies", "insert", [movie_obj.id])
+    notify_links("actors", "movies", linked)
+    notify_genres(genres)
     
     return movie_obj
 
 @api_router.put("/movies/{movie_id}", response_model=Movie)
 async def update_movie(movie_id: str, movie: MovieCreate, current_user: User = Depends(get_current_user)):
-    # Récupérer l'ancien film pour gérer les liaisons
-    old_movie = await db.movies.find_one({"id": movie_id})
-    if not old_movie:
-        raise HTTPException(status_code=404, detail="Movie not found")
+    movie_data = add_search_keys("movies", {**movie.dict(), "actor_count": len(movie.actors)})
     
-    movie_data = prepare_for_mongo(movie.dict())
-    await db.movies.update_one({"id": movie_id}, {"$set": movie_data})
-    
-    # Gérer les liaisons bidirectionnelles
-    old_actors = set(old_movie.get("actors", []))
-    new_actors = set(movie.actors)
-    
-    # Retirer le film des acteurs qui ne sont plus liés
-    for actor_id in old_actors - new_actors:
-        await db.actors.update_one(
-            {"id": actor_id}, 
-            {"$pull": {"movies": movie_id}}
-        )
-    
-    # Ajouter le film aux nouveaux acteurs
-    for actor_id in new_actors - old_actors:
-        await db.actors.update_one(
-            {"id": actor_id}, 
-            {"$addToSet": {"movies": movie_id}}
+    async def apply(session):
+        # Récupérer l'ancien film (pour le diff des liaisons) en appliquant la mise à jour
+        old_movie = await db.movies.find_one_and_update(
+            {"id": movie_id},
+            CODECS["movies"].update(movie_data),
+            return_document=ReturnDocument.BEFORE,
+            session=session
         )
+        if not old_movie:
+            raise HTTPException(status_code=404, detail="Movie not found")
+        
+        # Gérer les liaisons bidirectionnelles
+        linked = await sync_links("actors", "movies", movie_id, old_movie.get("actors", []), movie.actors, session=session)
+        genres = await update_genre_counters("movies", old_movie, movie_data, session=session)
+        await update_stats(session, total_runtime=(movie.duration or 0) - (old_movie.get("duration") or 0))
+        return old_movie, linked, genres
+
+    old_movie, linked, genres = await run_in_transaction(apply)
+    await cache.invalidate("movies", "actors", "genres")
+    events.publish_local("movies", "update", [movie_id], changed_fields(CODECS["movies"].decode(old_movie), movie_data))
+    notify_links("actors", "movies", linked)
+    notify_genres(genres)
     
-    updated_movie = await db.movies.find_one({"id": movie_id})
-    if updated_movie:
-        return Movie(**updated_movie)
-    raise HTTPException(status_code=404, detail="Movie not found")
+    return Movie(**{**old_movie, **movie_data})
 
 @api_router.delete("/movies/{movie_id}")
 async def delete_movie(movie_id: str, current_user: User = Depends(get_current_user)):
-    result = await db.movies.delete_one({"id": movie_id})
-    if result.deleted_count == 0:
-        raise HTTPException(status_code=404, detail="Movie not found")
+    async def apply(session):
+        old_movie = await db.movies.find_one_and_delete(
+            {"id": movie_id}, projection={"genres": 1, "duration": 1, "actors": 1}, session=session
+        )
+        if not old_movie:
+            raise HTTPException(status_code=404, detail="Movie not found")
+        # Retirer le film des acteurs liés
+        await db.actors.update_many(
+            {"movies": movie_id}, {"$pull": {"movies": movie_id}, "$inc": {"movie_count": -1}}, session=session
+        )
+        genres = await update_genre_counters("movies", old_movie, None, session=session)
+        await update_stats(session, movie_count=-1, total_runtime=-(old_movie.get("duration") or 0))
+        return old_movie, genres
+
+    old_movie, genres = await run_in_transaction(apply)
+    await cache.invalidate("movies", "actors", "genres")
+    events.publish_local("movies", "delete", [movie_id])
+    notify_links("actors", "movies", old_movie.get("actors", []))
+    notify_genres(genres)
     return {"message": "Movie deleted"}
 
 @api_router.patch("/movies/{movie_id}/favorite")
 async def toggle_movie_favorite(movie_id: str):
-    movie = await db.movies.find_one({"id": movie_id})
-    if not movie:
+    is_favorite = await toggle_favorite(db.movies, movie_id)
+    if is_favorite is None:
         raise HTTPException(status_code=404, detail="Movie not found")
-    
-    new_favorite_status = not movie.get("is_favorite", False)
-    await db.movies.update_one({"id": movie_id}, {"$set": {"is_favorite": new_favorite_status}})
-    return {"is_favorite": new_favorite_status}
+    await cache.invalidate("movies")
+    events.publish_local("movies", "update", [movie_id], ["is_favorite"])
+    return {"is_favorite": is_favorite}
 
 # Actors endpoints
-@api_router.get("/actors", response_model=List[Actor])
-async def get_actors(skip: int = 0, limit: int = 100):
-    actors = await db.actors.find().skip(skip).limit(limit).to_list(limit)
-    return [Actor(**actor) for actor in actors]
+@api_router.get("/actors")
+@cache.conditional("actors", tags=("actors", "movies", "genres"))
+@cache.coalesced("actors", tags=("actors", "movies", "genres"))
+async def get_actors(
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+    genre: Optional[str] = None,
+    movie: Optional[str] = None,
+    favorite: Optional[bool] = None,
+    expand: Optional[str] = None
+):
+    query = {}
+    if genre:
+        query["genres"] = genre
+    if movie:
+        query["movies"] = movie
+    if favorite is not None:
+        query["is_favorite"] = True if favorite else {"$ne": True}
+    return await paginate(read_db.actors, query, Actor, limit, cursor, fields, expand)
+
+@api_router.get("/actors/{actor_id}")
+@cache.conditional("actor", tags=("actors", "movies", "genres"))
+@cache.coalesced("actor", tags=("actors", "movies", "genres"))
+async def get_actor(actor_id: str, expand: Optional[str] = None):
+    expand_fields = parse_expand("actors", expand)
+    actor = await read_db.actors.find_one({"id": actor_id}, PUBLIC_PROJECTION)
+    if not actor:
+        raise HTTPException(status_code=404, detail="Actor not found")
+    return (await expand_references([public_doc(actor, Actor)], expand_fields))[0]
+
+@api_router.get("/actors/{actor_id}/costars")
+async def get_actor_costars(actor_id: str, limit: int = 10):
+    return related_items("actors", actor_id, limit, "Actor not found")
 
 @api_router.post("/actors", response_model=Actor)
 async def create_actor(actor: ActorCreate, current_user: User = Depends(get_current_user)):
     actor_dict = actor.dict()
-    actor_obj = Actor(**actor_dict)
-    actor_data = prepare_for_mongo(actor_obj.dict())
-    await db.actors.insert_one(actor_data)
+    actor_obj = Actor(**actor_dict, movie_count=len(actor.movies))
+    actor_data = add_search_keys("actors", CODECS["actors"].encode(actor_obj.dict()))
     
-    # Liaison bidirectionnelle avec les films
-    for movie_id in actor_obj.movies:
-        movie = await db.movies.find_one({"id": movie_id})
-        if movie and actor_obj.id not in movie.get("actors", []):
-            await db.movies.update_one(
-                {"id": movie_id}, 
-                {"$addToSet": {"actors": actor_obj.id}}
-            )
+    # Liaison bidirectionnelle avec les films, compteurs des films, genres et du catalogue
+    async def apply(session):
+        await db.actors.insert_one(actor_data, session=session)
+        linked = await sync_links("movies", "actors", actor_obj.id, [], actor_obj.movies, session=session)
+        genres = await update_genre_counters("actors", None, actor_data, session=session)
+        await update_stats(session, actor_count=1)
+        return linked, genres
+
+    linked, genres = await run_in_transaction(apply)
+    await cache.invalidate("actors", "movies", "genres")
+    events.publish_local("actors", "insert", [actor_obj.id])
+    notify_links("movies", "actors", linked)
+    notify_genres(genres)
     
     return actor_obj
 
 @api_router.put("/actors/{actor_id}", response_model=Actor)
 async def update_actor(actor_id: str, actor: ActorCreate, current_user: User = Depends(get_current_user)):
-    # Récupérer l'ancien acteur pour gérer les liaisons
-    old_actor = await db.actors.find_one({"id": actor_id})
-    if not old_actor:
-        raise HTTPException(status_code=404, detail="Actor not found")
-    
-    actor_data = prepare_for_mongo(actor.dict())
-    await db.actors.update_one({"id": actor_id}, {"$set": actor_data})
+    actor_data = add_search_keys("actors", {**actor.dict(), "movie_count": len(actor.movies)})
     
-    # Gérer les liaisons bidirectionnelles
-    old_movies = set(old_actor.get("movies", []))
-    new_movies = set(actor.movies)
-    
-    # Retirer l'acteur des films qui ne sont plus liés
-    for movie_id in old_movies - new_movies:
-        await db.movies.update_one(
-            {"id": movie_id}, 
-            {"$pull": {"actors": actor_id}}
-        )
-    
-    # Ajouter l'acteur aux nouveaux films
-    for movie_id in new_movies - old_movies:
-        await db.movies.update_one(
-            {"id": movie_id}, 
-            {"$addToSet": {"actors": actor_id}}
+    async def apply(session):
+        # Récupérer l'ancien acteur (pour le diff des liaisons) en appliquant la mise à jour
+        old_actor = await db.actors.find_one_and_update(
+            {"id": actor_id},
+            CODECS["actors"].update(actor_data),
+            return_document=ReturnDocument.BEFORE,
+            session=session
         )
+        if not old_actor:
+            raise HTTPException(status_code=404, detail="Actor not found")
+        
+        # Gérer les liaisons bidirectionnelles
+        linked = await sync_links("movies", "actors", actor_id, old_actor.get("movies", []), actor.movies, session=session)
+        genres = await update_genre_counters("actors", old_actor, actor_data, session=session)
+        return old_actor, linked, genres
+
+    old_actor, linked, genres = await run_in_transaction(apply)
+    await cache.invalidate("actors", "movies", "genres")
+    events.publish_local("actors", "update", [actor_id], changed_fields(CODECS["actors"].decode(old_actor), actor_data))
+    notify_links("movies", "actors", linked)
+    notify_genres(genres)
     
-    updated_actor = await db.actors.find_one({"id": actor_id})
-    if updated_actor:
-        return Actor(**updated_actor)
-    raise HTTPException(status_code=404, detail="Actor not found")
+    return Actor(**{**old_actor, **actor_data})
 
 @api_router.delete("/actors/{actor_id}")
 async def delete_actor(actor_id: str, current_user: User = Depends(get_current_user)):
-    result = await db.actors.delete_one({"id": actor_id})
-    if result.deleted_count == 0:
-        raise HTTPException(status_code=404, detail="Actor not found")
+    async def apply(session):
+        old_actor = await db.actors.find_one_and_delete({"id": actor_id}, projection={"genres": 1, "movies": 1}, session=session)
+        if not old_actor:
+            raise HTTPException(status_code=404, detail="Actor not found")
+        # Retirer l'acteur des films liés
+        await db.movies.update_many(
+            {"actors": actor_id}, {"$pull": {"actors": actor_id}, "$inc": {"actor_count": -1}}, session=session
+        )
+        genres = await update_genre_counters("actors", old_actor, None, session=session)
+        await update_stats(session, actor_count=-1)
+        return old_actor, genres
+
+    old_actor, genres = await run_in_transaction(apply)
+    await cache.invalidate("actors", "movies", "genres")
+    events.publish_local("actors", "delete", [actor_id])
+    notify_links("movies", "actors", old_actor.get("movies", []))
+    notify_genres(genres)
     return {"message": "Actor deleted"}
 
 @api_router.patch("/actors/{actor_id}/favorite")
 async def toggle_actor_favorite(actor_id: str):
-    actor = await db.actors.find_one({"id": actor_id})
-    if not actor:
+    is_favorite = await toggle_favorite(db.actors, actor_id)
+    if is_favorite is None:
         raise HTTPException(status_code=404, detail="Actor not found")
-    
-    new_favorite_status = not actor.get("is_favorite", False)
-    await db.actors.update_one({"id": actor_id}, {"$set": {"is_favorite": new_favorite_status}})
-    return {"is_favorite": new_favorite_status}
+    await cache.invalidate("actors")
+    events.publish_local("actors", "update", [actor_id], ["is_favorite"])
+    return {"is_favorite": is_favorite}
 
 # Genres endpoints
 @api_router.get("/genres", response_model=List[Genre])
+@cache.conditional("genres", tags=("genres",))
+@cache.cached("genres", tags=("genres",))
 async def get_genres(type: Optional[str] = None):
     query = {"type": type} if type else {}
-    genres = await db.genres.find(query).to_list(100)
-    return [Genre(**genre) for genre in genres]
+    genres = await read_db.genres.find(query, PUBLIC_PROJECTION).to_list(100)
+    return public_docs(genres, Genre)
 
 @api_router.post("/genres", response_model=Genre)
 async def create_genre(genre: GenreCreate, current_user: User = Depends(get_current_user)):
     genre_obj = Genre(**genre.dict())
-    genre_data = prepare_for_mongo(genre_obj.dict())
+    genre_data = CODECS["genres"].encode(genre_obj.dict())
     await db.genres.insert_one(genre_data)
+    await update_stats(genre_count=1)
+    await cache.invalidate("genres")
+    events.publish_local("genres", "insert", [genre_obj.id])
     return genre_obj
 
 @api_router.delete("/genres/{genre_id}")
 async def delete_genre(genre_id: str, current_user: User = Depends(get_current_user)):
-    result = await db.genres.delete_one({"id": genre_id})
-    if result.deleted_count == 0:
-        raise HTTPException(status_code=404, detail="Genre not found")
+    async def apply(session):
+        result = await db.genres.delete_one({"id": genre_id}, session=session)
+        if result.deleted_count == 0:
+            raise HTTPException(status_code=404, detail="Genre not found")
+        # Retirer le genre des films et acteurs qui le référencent
+        await db.movies.update_many({"genres": genre_id}, {"$pull": {"genres": genre_id}}, session=session)
+        await db.actors.update_many({"genres": genre_id}, {"$pull": {"genres": genre_id}}, session=session)
+        await update_stats(session, genre_count=-1)
+
+    await run_in_transaction(apply)
+    await cache.invalidate("genres", "movies", "actors")
+    events.publish_local("genres", "delete", [genre_id])
+    # Films et acteurs concernés inconnus : id absent, les clients rechargent la collection
+    events.publish_local("movies", "update", fields=["genres"])
+    events.publish_local("actors", "update", fields=["genres"])
     return {"message": "Genre deleted"}
 
 # Favorites endpoints
 @api_router.get("/favorites")
+@cache.conditional("favorites", tags=("movies", "actors"))
+@cache.cached("favorites", tags=("movies", "actors"))
 async def get_favorites():
     favorites = {"movies": [], "actors": []}
     
-    favorite_movies = await db.movies.find({"is_favorite": True}).to_list(100)
-    favorites["movies"] = [Movie(**movie) for movie in favorite_movies]
+    favorite_movies = await read_db.movies.find({"is_favorite": True}, PUBLIC_PROJECTION).to_list(100)
+    favorites["movies"] = public_docs(favorite_movies, Movie)
     
-    favorite_actors = await db.actors.find({"is_favorite": True}).to_list(100)
-    favorites["actors"] = [Actor(**actor) for actor in favorite_actors]
+    favorite_actors = await read_db.actors.find({"is_favorite": True}, PUBLIC_PROJECTION).to_list(100)
+    favorites["actors"] = public_docs(favorite_actors, Actor)
     
     return favorites
 
+@api_router.patch("/favorites")
+async def update_favorites(update: FavoritesUpdate):
+    result = {}
+    for name, states in (("movies", update.movies), ("actors", update.actors)):
+        result[name] = await set_favorites(db[name], states)
+        if result[name]["modified"]:
+            await cache.invalidate(name)
+            events.publish_local(name, "update", sorted({state.id for state in states}), ["is_favorite"])
+    return result
+
+# Stats endpoint
+@api_router.get("/stats")
+@cache.conditional("stats", tags=("movies", "actors", "genres"))
+@cache.cached("stats", tags=("movies", "actors", "genres"))
+async def get_stats():
+    # Lecture des compteurs dénormalisés : aucun comptage à la volée
+    stats = await read_db.stats.find_one({"id": STATS_ID}, {"_id": 0, "id": 0}) or {}
+    projection = {"_id": 0, "id": 1, "name": 1, "type": 1, "movie_count": 1, "actor_count": 1, "total_runtime": 1}
+    genres = await read_db.genres.find({}, projection).to_list(1000)
+    return {**STATS_DEFAULTS, **stats, "genres": [CODECS["genres"].decode(genre, projection) for genre in genres]}
+
+# Home endpoint
+@api_router.get("/home")
+@cache.conditional("home", tags=("movies", "genres", "actors"))
+@cache.cached("home", tags=("movies", "genres", "actors"))
+async def get_home(
+    recent_limit: int = Query(8, ge=1, le=50),
+    favorites_limit: int = Query(6, ge=1, le=50),
+    genre_count: int = Query(3, ge=1, le=20),
+    per_genre: int = Query(6, ge=1, le=50)
+):
+    # Requêtes indexées lancées en parallèle (created_at_id_desc, is_favorite_true_created_at_id,
+    # genres_created_at_id) ; les genres les plus fournis viennent des compteurs dénormalisés
+    recent, favorites, genre_docs = await asyncio.gather(
+        read_db.movies.find({}, PUBLIC_PROJECTION).sort(PAGE_SORT).limit(recent_limit).to_list(recent_limit),
+        read_db.movies.find(FAVORITE_FILTER, PUBLIC_PROJECTION).sort(PAGE_SORT).limit(favorites_limit).to_list(favorites_limit),
+        read_db.genres.find({"type": "movie"}, PUBLIC_PROJECTION).to_list(None)
+    )
+    top_genres = sorted(
+        (genre for genre in genre_docs if genre.get("movie_count")),
+        key=lambda genre: (-genre["movie_count"], genre["id"])
+    )[:genre_count]
+    genre_movies = await asyncio.gather(*[
+        read_db.movies.find({"genres": genre["id"]}, PUBLIC_PROJECTION).sort(PAGE_SORT).limit(per_genre).to_list(per_genre)
+        for genre in top_genres
+    ])
+
+    # Résumés des acteurs des films affichés, en une seule requête $in
+    shown = recent + favorites + [movie for movies in genre_movies for movie in movies]
+    actors = await fetch_summaries("actors", {actor_id for movie in shown for actor_id in movie.get("actors") or []})
+
+    genres = public_docs(genre_docs, Genre)
+    genres_by_id = {doc["id"]: genre for doc, genre in zip(genre_docs, genres)}
+    return {
+        "featured": public_doc(recent[0], Movie) if recent else None,
+        "recent": public_docs(recent, Movie),
+        "favorites": public_docs(favorites, Movie),
+        "by_genre": [
+            {"genre": genres_by_id[genre["id"]], "movies": public_docs(movies, Movie)}
+            for genre, movies in zip(top_genres, genre_movies)
+        ],
+        "genres": genres,
+        "actors": list(actors.values())
+    }
+
+# Import/export endpoints
+@api_router.post("/import")
+async def import_data(request: Request, batch_size: int = 1000, upsert: bool = False, current_user: User = Depends(get_current_user)):
+    try:
+        return await import_catalog(db, iter_lines(request.stream()), max(1, batch_size), upsert)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@api_router.get("/export")
+async def export_data(collections: Optional[str] = None, current_user: User = Depends(get_current_user)):
+    return StreamingResponse(
+        export_catalog(read_db, parse_collections(collections)),
+        media_type="application/x-ndjson",
+        headers={"Content-Disposition": 'attachment; filename="moviehub.ndjson"'}
+    )
+
+# Admin endpoints
+@api_router.get("/admin/indexes")
+async def get_index_report(current_user: User = Depends(get_current_user)):
+    return await index_report(db)
+
+@api_router.post("/admin/compact-references", status_code=status.HTTP_202_ACCEPTED)
+async def start_reference_compaction(batch_size: int = 1000, current_user: User = Depends(get_current_user)):
+    global _compaction_task
+    if compaction_status["running"]:
+        raise HTTPException(status_code=409, detail="Compaction already running")
+    _compaction_task = asyncio.create_task(compact_references(db, batch_size))
+    return {"message": "Compaction started"}
+
+@api_router.get("/admin/compact-references")
+async def get_reference_compaction(current_user: User = Depends(get_current_user)):
+    return compaction_status
+
+@api_router.post("/admin/counters")
+async def repair_catalog_counters(current_user: User = Depends(get_current_user)):
+    return await repair_counters(db)
+
+@api_router.get("/admin/related")
+async def get_related_stats(current_user: User = Depends(get_current_user)):
+    return related.info()
+
+@api_router.post("/admin/related")
+async def rebuild_related(block_size: int = 1024, current_user: User = Depends(get_current_user)):
+    return await related.rebuild(db, max(1, block_size))
+
+@api_router.get("/admin/pool")
+async def get_pool_stats(current_user: User = Depends(get_current_user)):
+    options = {name: value for name, value in MONGO_OPTIONS.items() if name != "appname"}
+    return {**pool_monitor.info(), "options": options, "read_preference": READ_PREFERENCE.name}
+
+@api_router.get("/admin/cache")
+async def get_cache_stats(current_user: User = Depends(get_current_user)):
+    return cache.info()
+
+@api_router.get("/admin/rate-limit")
+async def get_rate_limit_stats(current_user: User = Depends(get_current_user)):
+    return rate_limiter.info()
+
+@api_router.get("/admin/images")
+async def get_image_cache_stats(current_user: User = Depends(get_current_user)):
+    return await asyncio.to_thread(image_proxy.cache.info)
+
+@api_router.get("/admin/auth")
+async def get_auth_cache_stats(current_user: User = Depends(get_current_user)):
+    return auth_cache.info()
+
+@api_router.get("/admin/events")
+async def get_event_stats(current_user: User = Depends(get_current_user)):
+    return events.info()
+
+@api_router.delete("/admin/cache")
+async def clear_cache(current_user: User = Depends(get_current_user)):
+    await cache.clear()
+    return {"message": "Cache cleared"}
+
+# Change feed endpoint
+@api_router.get("/events")
+async def stream_events(request: Request, collections: Optional[str] = None):
+    # EventSource renvoie Last-Event-ID à la reconnexion : les événements manqués sont rejoués
+    subscription = events.subscribe(parse_collections(collections), request.headers.get("last-event-id"))
+    return StreamingResponse(
+        event_stream(events, subscription, EVENTS_KEEPALIVE, EVENTS_RETRY_MS),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+# Health endpoint
+@api_router.get("/health/ready")
+async def readiness():
+    status_code, state, error = 200, "ready", None
+    try:
+        with pymongo.timeout(HEALTH_TIMEOUT):
+            await client.admin.command("ping")
+    except PyMongoError as e:
+        status_code, state, error = 503, "unavailable", str(e)
+    if status_code == 200 and not _started:
+        status_code, state = 503, "starting"
+    return FastJSONResponse({
+        "status": state,
+        "error": error,
+        "pool": pool_monitor.info(),
+        "related_ready": related.ready,
+        "events": events.source,
+    }, status_code=status_code)
+
+# Metrics endpoint
+@api_router.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics():
+    extra = {}
+    for prefix, stats in (
+        ("moviehub_cache", cache.info()), ("moviehub_auth", auth_cache.info()),
+        ("moviehub_events", events.info()), ("moviehub_mongo_pool", pool_monitor.info()),
+        ("moviehub_flights", cache.flights.info()), ("moviehub_rate_limit", rate_limiter.info())
+    ):
+        extra.update({
+            f"{prefix}_{name}": value for name, value in stats.items()
+            if isinstance(value, (int, float)) and not isinstance(value, bool)
+        })
+    return PlainTextResponse(metrics.render(extra), media_type="text/plain; version=0.0.4")
+
 # Image settings endpoints
 @api_router.patch("/movies/{movie_id}/image-settings")
 async def update_movie_image_settings(movie_id: str, settings: dict, current_user: User = Depends(get_current_user)):
-    await db.movies.update_one({"id": movie_id}, {"$set": {"image_settings": settings}})
+    await db.movies.update_one({"id": movie_id}, CODECS["movies"].update({"image_settings": settings}))
+    await cache.invalidate("movies")
+    events.publish_local("movies", "update", [movie_id], ["image_settings"])
     return {"message": "Image settings updated"}
 
 @api_router.patch("/actors/{actor_id}/image-settings")
 async def update_actor_image_settings(actor_id: str, settings: dict, current_user: User = Depends(get_current_user)):
-    await db.actors.update_one({"id": actor_id}, {"$set": {"image_settings": settings}})
+    await db.actors.update_one({"id": actor_id}, CODECS["actors"].update({"image_settings": settings}))
+    await cache.invalidate("actors")
+    events.publish_local("actors", "update", [actor_id], ["image_settings"])
     return {"message": "Image settings updated"}
 
+# Image proxy endpoint
+@api_router.get("/images/{kind}/{item_id}")
+async def get_thumbnail(
+    kind: str, item_id: str, request: Request, width: int = 320, format: str = "webp", v: Optional[str] = None
+):
+    if kind not in ASPECT_RATIOS:
+        raise HTTPException(status_code=404, detail="Image not found")
+    if width not in WIDTHS:
+        raise HTTPException(status_code=400, detail=f"width must be one of {', '.join(map(str, WIDTHS))}")
+    if format not in FORMATS:
+        raise HTTPException(status_code=400, detail=f"format must be one of {', '.join(FORMATS)}")
+
+    item = await read_db[kind].find_one({"id": item_id}, {"_id": 0, "image": 1, "image_settings": 1})
+    if not item or not item.get("image"):
+        raise HTTPException(status_code=404, detail="Image not found")
+
+    settings = normalize_settings(item.get("image_settings"))
+    key = image_proxy.variant_key(item["image"], settings, width, format)
+    # Avec ?v= (empreinte des réglages côté client) l'URL change à chaque modification
+    cache_control = "public, max-age=31536000, immutable" if v else f"public, max-age={IMAGE_MAX_AGE}"
+    headers = {"ETag": f'"{key[:32]}"', "Cache-Control": cache_control}
+    if etag_matches(request.headers.get("if-none-match"), headers["ETag"]):
+        return Response(status_code=304, headers=headers)
+
+    height = round(width * ASPECT_RATIOS[kind])
+    try:
+        body = await image_proxy.thumbnail(key, item["image"], settings, width, height, format)
+    except ImageError as e:
+        raise HTTPException(status_code=e.status_code, detail=e.detail)
+    return Response(content=body, media_type=FORMATS[format][1], headers=headers)
+
 # Search endpoint
 @api_router.get("/search")
-async def search(q: str, type: Optional[str] = None):
+@cache.conditional("search", tags=("movies", "actors", "genres"))
+@cache.coalesced("search", tags=("movies", "actors", "genres"))
+async def search(q: str, type: Optional[str] = None, limit: int = Query(20, ge=1, le=100), expand: Optional[str] = None):
     results = {"movies": [], "actors": []}
+    pipeline = search_pipeline(q, limit)
+    if pipeline is None:
+        return results
+    # expand porte sur les deux collections : chacune garde les champs qui la concernent
+    requested = parse_expand("search", expand)
+    expand_fields = {
+        collection: [field for field in requested if field in EXPANDABLE_FIELDS[collection]]
+        for collection in ("movies", "actors")
+    }
     
     if not type or type == "movies":
-        movies = await db.movies.find({
-            "$or": [
-                {"title": {"$regex": q, "$options": "i"}},
-                {"description": {"$regex": q, "$options": "i"}}
-            ]
-        }).to_list(20)
-        results["movies"] = [Movie(**movie) for movie in movies]
+        movies = await read_db.movies.aggregate(pipeline).to_list(limit)
+        results["movies"] = await expand_references(public_docs(movies, Movie), expand_fields["movies"])
     
     if not type or type == "actors":
-        actors = await db.actors.find({
-            "$or": [
-                {"name": {"$regex": q, "$options": "i"}},
-                {"description": {"$regex": q, "$options": "i"}}
-            ]
-        }).to_list(20)
-        results["actors"] = [Actor(**actor) for actor in actors]
+        actors = await read_db.actors.aggregate(pipeline).to_list(limit)
+        results["actors"] = await expand_references(public_docs(actors, Actor), expand_fields["actors"])
     
     return results
 
@@ -412,6 +1531,7 @@ async def init_sample_data():
         "created_at": datetime.now(timezone.utc).isoformat()
     }
     await db.users.insert_one(admin_user)
+    auth_cache.invalidate_user(admin_user["username"])
     
     # Create sample genres
     movie_genres = [
@@ -428,7 +1548,7 @@ async def init_sample_data():
         {"id": str(uuid.uuid4()), "name": "Drame", "type": "actor", "created_at": datetime.now(timezone.utc).isoformat()}
     ]
     
-    await db.genres.insert_many(movie_genres + actor_genres)
+    await db.genres.insert_many([CODECS["genres"].encode(genre) for genre in movie_genres + actor_genres])
     
     # Create sample actors
     actors = [
@@ -467,7 +1587,9 @@ async def init_sample_data():
         }
     ]
     
-    inserted_actors = await db.actors.insert_many(actors)
+    for actor in actors:
+        add_search_keys("actors", actor)
+    inserted_actors = await db.actors.insert_many([CODECS["actors"].encode(actor) for actor in actors])
     actor_ids = [str(actor["id"]) for actor in actors]
     
     # Create sample movies
@@ -534,13 +1656,47 @@ async def init_sample_data():
         }
     ]
     
-    await db.movies.insert_many(movies)
+    for movie in movies:
+        add_search_keys("movies", movie)
+    await db.movies.insert_many([CODECS["movies"].encode(movie) for movie in movies])
+    await repair_counters(db)
+    await cache.invalidate("genres", "movies", "actors")
     
     return {"message": "Sample data created successfully"}
 
 # Include router
 app.include_router(api_router)
 
+# Server-Timing, métriques par route ; profilage pyinstrument via X-Profile pour les admins
+async def can_profile(headers) -> bool:
+    scheme, _, token = headers.get("authorization", "").partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return False
+    try:
+        user = await authenticate(token)
+    except HTTPException:
+        return False
+    return user.is_admin
+
+# Avant le profilage : les réponses 429 apparaissent dans les métriques
+app.add_middleware(RateLimitMiddleware, limiter=rate_limiter)
+
+app.add_middleware(ProfilingMiddleware, metrics=metrics, authorize=can_profile)
+
+# Délai Mongo par requête ; import/export, flux SSE, maintenance et health check gèrent le leur
+app.add_middleware(
+    MongoTimeoutMiddleware,
+    read_timeout=MONGO_READ_TIMEOUT,
+    write_timeout=MONGO_WRITE_TIMEOUT,
+    exempt=("/api/import", "/api/export", "/api/events", "/api/admin/", "/api/init-data", "/api/health/")
+)
+
+@app.exception_handler(PyMongoError)
+async def mongo_error_handler(request: Request, exc: PyMongoError):
+    if exc.timeout:
+        return FastJSONResponse({"detail": "Database operation timed out"}, status_code=504)
+    raise exc
+
 # CORS Middleware
 app.add_middleware(
     CORSMiddleware,
@@ -556,7 +1712,3 @@ logging.basicConfig(
     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
 )
 logger = logging.getLogger(__name__)
-
-@app.on_event("shutdown")
-async def shutdown_db_client():
-    client.close()
\ No newline at end of file
@@ -0,0 +1,91 @@
+from datetime import datetime
+from typing import Dict, Iterable, Optional
+
+import bson
+from pymongo import UpdateOne
+
+
+# Format de stockage d'un modèle : dates BSON natives, valeurs par défaut omises et
+# restituées à la lecture. Les tableaux (liens, genres) restent toujours stockés :
+# $addToSet/$pull, $size et les index multikey les manipulent tels quels.
+class StorageCodec:
+    def __init__(self, model):
+        self.model = model
+        self.dates = {name for name, field in model.__fields__.items() if field.type_ is datetime}
+        # Valeurs restituées à la lecture ; seules les valeurs scalaires sont omises à l'écriture
+        self.defaults = {
+            name: field.get_default()
+            for name, field in model.__fields__.items()
+            if not field.required and field.default_factory is None
+        }
+        self.omitted = {name: value for name, value in self.defaults.items() if not isinstance(value, list)}
+
+    def encode(self, doc: dict) -> dict:
+        encoded = {}
+        for field, value in doc.items():
+            if field in self.dates and isinstance(value, str):
+                # Ancien format : chaîne ISO 8601 (une valeur illisible est laissée telle quelle)
+                try:
+                    value = datetime.fromisoformat(value)
+                except ValueError:
+                    pass
+            if field in self.omitted and value == self.omitted[field]:
+                continue
+            encoded[field] = value
+        return encoded
+
+    def update(self, doc: dict) -> dict:
+        # Mise à jour partielle : un champ revenu à sa valeur par défaut est retiré du document
+        encoded = self.encode(doc)
+        update = {}
+        if encoded:
+            update["$set"] = encoded
+        removed = {field: "" for field in doc if field not in encoded}
+        if removed:
+            update["$unset"] = removed
+        return update
+
+    def decode(self, doc: dict, fields: Optional[Iterable[str]] = None) -> dict:
+        # fields : champs projetés, seuls ceux-là sont complétés
+        defaults = self.defaults if fields is None else {
+            field: self.defaults[field] for field in fields if field in self.defaults
+        }
+        return {**defaults, **doc}
+
+
+async def migrate_collection(collection, codec: StorageCodec, batch_size: int = 1000, dates_only: bool = False) -> dict:
+    # Réécrit chaque document au format du codec ; seuls les documents modifiés sont mis à jour
+    report = {"scanned": 0, "updated": 0, "bytes_before": 0, "bytes_after": 0}
+    # Dates seules (démarrage) : filtre servi par l'index created_at, quasi gratuit une fois migré
+    query = {"$or": [{field: {"$type": "string"}} for field in sorted(codec.dates)]} if dates_only else {}
+    batch = []
+    async for doc in collection.find(query, batch_size=batch_size):
+        report["scanned"] += 1
+        fields = {field: doc[field] for field in codec.dates | set(codec.omitted) if field in doc}
+        if dates_only:
+            fields = {field: value for field, value in fields.items() if field in codec.dates}
+        encoded = codec.encode(fields)
+        if encoded == fields:
+            continue
+        update = {"$set": encoded} if dates_only else codec.update(fields)
+        migrated = {**doc, **encoded}
+        for field in update.get("$unset", {}):
+            migrated.pop(field, None)
+        report["bytes_before"] += len(bson.encode(doc))
+        report["bytes_after"] += len(bson.encode(migrated))
+        batch.append(UpdateOne({"_id": doc["_id"]}, update))
+        if len(batch) >= batch_size:
+            await collection.bulk_write(batch, ordered=False)
+            report["updated"] += len(batch)
+            batch = []
+    if batch:
+        await collection.bulk_write(batch, ordered=False)
+        report["updated"] += len(batch)
+    return report
+
+
+async def migrate_storage(database, codecs: Dict[str, StorageCodec], batch_size: int = 1000, dates_only: bool = False) -> Dict[str, dict]:
+    return {
+        name: await migrate_collection(database[name], codec, batch_size, dates_only)
+        for name, codec in codecs.items()
+    }
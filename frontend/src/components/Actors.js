@@ -9,14 +9,21 @@ import { Dialog, DialogContent, DialogHeader, DialogTitle } from './ui/dialog';
 import { Label } from './ui/label';
 import { Textarea } from './ui/textarea';
 import axios from 'axios';
+import { applyChange, fetchAllPages, fetchItem, patchItem, refreshReferencing, removeItems, thumbnailUrl, upsertItem } from '../lib/api';
+import { localWrite, useChangeFeed } from '../hooks/use-change-feed';
 import { toast } from 'sonner';
 
 const BACKEND_URL = process.env.REACT_APP_BACKEND_URL;
 const API = `${BACKEND_URL}/api`;
 
+// Movies and genres come embedded as { id, title, image, duration } / { id, name }
+// summaries: no need to download the whole movies collection to display titles
+const ACTOR_EXPAND = { expand: 'movies,genres' };
+
 const Actors = ({ isAdmin }) => {
   const [actors, setActors] = useState([]);
-  const [movies, setMovies] = useState([]);
+  // Full movie list for the admin form only, loaded when the form opens
+  const [movieOptions, setMovieOptions] = useState([]);
   const [genres, setGenres] = useState([]);
   const [filteredActors, setFilteredActors] = useState([]);
   const [loading, setLoading] = useState(true);
@@ -46,17 +53,19 @@ const Actors = ({ isAdmin }) => {
     filterActors();
   }, [actors, searchQuery, selectedAgeRange, selectedMovieCount]);
 
+  useEffect(() => {
+    if (showAddDialog) loadMovieOptions();
+  }, [showAddDialog]);
+
   const loadData = async () => {
     try {
       setLoading(true);
-      const [actorsRes, moviesRes, genresRes] = await Promise.all([
-        axios.get(`${API}/actors`),
-        axios.get(`${API}/movies`),
+      const [actorsData, genresRes] = await Promise.all([
+        fetchAllPages(`${API}/actors`, ACTOR_EXPAND),
         axios.get(`${API}/genres?type=actor`)
       ]);
       
-      setActors(actorsRes.data);
-      setMovies(moviesRes.data);
+      setActors(actorsData);
       setGenres(genresRes.data);
     } catch (error) {
       console.error('Error loading data:', error);
@@ -66,6 +75,43 @@ const Actors = ({ isAdmin }) => {
     }
   };
 
+  const loadMovieOptions = async () => {
+    try {
+      setMovieOptions(await fetchAllPages(`${API}/movies`, { fields: 'title' }));
+    } catch (error) {
+      console.error('Error loading movies:', error);
+    }
+  };
+
+  // Changes made by other clients arrive through the change feed
+  useChangeFeed(['actors', 'movies', 'genres'], async (event) => {
+    try {
+      if (event.collection === 'genres') {
+        const response = await axios.get(`${API}/genres?type=actor`);
+        setGenres(response.data);
+        // A renamed genre is embedded in the actors that use it
+        if (event.op === 'update' && (!event.fields || event.fields.includes('name'))) {
+          if (event.id) await refreshReferencing(setActors, 'actors', { ...ACTOR_EXPAND, genre: event.id });
+          else loadData();
+        }
+        return;
+      }
+      if (event.collection === 'movies') {
+        // Link changes and deletes also announce the actors themselves
+        if (event.type === 'change' && event.op === 'delete') return;
+        if (event.type === 'change' && event.fields && !event.fields.some(field => ['title', 'image', 'duration'].includes(field))) return;
+        if (event.id) await refreshReferencing(setActors, 'actors', { ...ACTOR_EXPAND, movie: event.id });
+        else loadData();
+        return;
+      }
+      if (!(await applyChange(setActors, 'actors', event, ACTOR_EXPAND))) {
+        loadData();
+      }
+    } catch (error) {
+      console.error('Error applying change:', error);
+    }
+  });
+
   const filterActors = () => {
     let filtered = actors;
 
@@ -74,10 +120,7 @@ const Actors = ({ isAdmin }) => {
       filtered = filtered.filter(actor => 
         actor.name.toLowerCase().includes(searchQuery.toLowerCase()) ||
         actor.description?.toLowerCase().includes(searchQuery.toLowerCase()) ||
-        actor.movies.some(movieId => {
-          const movie = movies.find(m => m.id === movieId);
-          return movie?.title.toLowerCase().includes(searchQuery.toLowerCase());
-        })
+        actor.movies.some(movie => movie.title?.toLowerCase().includes(searchQuery.toLowerCase()))
       );
     }
 
@@ -97,7 +140,7 @@ const Actors = ({ isAdmin }) => {
     // Movie count filter
     if (selectedMovieCount && selectedMovieCount !== 'all') {
       filtered = filtered.filter(actor => {
-        const movieCount = actor.movies?.length || 0;
+        const movieCount = actor.movie_count ?? actor.movies?.length ?? 0;
         switch (selectedMovieCount) {
           case 'few': return movieCount <= 2;
           case 'moderate': return movieCount > 2 && movieCount <= 5;
@@ -125,21 +168,23 @@ const Actors = ({ isAdmin }) => {
       };
       
       if (editingActor) {
-        await axios.put(`${API}/actors/${editingActor.id}`, actorData, {
+        await localWrite({ actors: [editingActor.id] }, () => axios.put(`${API}/actors/${editingActor.id}`, actorData, {
           headers: { Authorization: `Bearer ${token}` }
-        });
+        }));
+        // The write response carries ids; the list holds expanded summaries
+        upsertItem(setActors, await fetchItem('actors', editingActor.id, ACTOR_EXPAND));
         toast.success('Acteur modifié avec succès');
       } else {
-        await axios.post(`${API}/actors`, actorData, {
+        const response = await axios.post(`${API}/actors`, actorData, {
           headers: { Authorization: `Bearer ${token}` }
         });
+        upsertItem(setActors, await fetchItem('actors', response.data.id, ACTOR_EXPAND));
         toast.success('Acteur ajouté avec succès');
       }
       
       setShowAddDialog(false);
       setEditingActor(null);
       resetForm();
-      loadData();
     } catch (error) {
       console.error('Error saving actor:', error);
       toast.error('Erreur lors de la sauvegarde');
@@ -153,11 +198,11 @@ const Actors = ({ isAdmin }) => {
 
     try {
       const token = localStorage.getItem('token');
-      await axios.delete(`${API}/actors/${actorId}`, {
+      await localWrite({ actors: [actorId] }, () => axios.delete(`${API}/actors/${actorId}`, {
         headers: { Authorization: `Bearer ${token}` }
-      });
+      }));
+      removeItems(setActors, [actorId]);
       toast.success('Acteur supprimé avec succès');
-      loadData();
     } catch (error) {
       console.error('Error deleting actor:', error);
       toast.error('Erreur lors de la suppression');
@@ -166,9 +211,10 @@ const Actors = ({ isAdmin }) => {
 
   const toggleFavorite = async (actorId, currentStatus) => {
     try {
-      await axios.patch(`${API}/actors/${actorId}/favorite`);
-      toast.success(currentStatus ? 'Retiré des favoris' : 'Ajouté aux favoris');
-      loadData();
+      const response = await localWrite({ actors: [actorId] }, () => axios.patch(`${API}/actors/${actorId}/favorite`));
+      patchItem(setActors, actorId, response.data);
+      setSelectedActor(prev => prev?.id === actorId ? { ...prev, ...response.data } : prev);
+      toast.success(response.data.is_favorite ? 'Ajouté aux favoris' : 'Retiré des favoris');
     } catch (error) {
       console.error('Error toggling favorite:', error);
       toast.error('Erreur lors de la modification des favoris');
@@ -192,23 +238,19 @@ const Actors = ({ isAdmin }) => {
       name: actor.name,
       age: actor.age ? actor.age.toString() : '',
       image: actor.image || '',
-      movies: actor.movies || [],
+      movies: (actor.movies || []).map(movie => movie.id),
       description: actor.description || '',
-      genres: actor.genres || []
+      genres: (actor.genres || []).map(genre => genre.id)
     });
     setShowAddDialog(true);
   };
 
+  // Titles for the form chips: full list once loaded, else the edited actor's summaries
   const getMovieTitle = (movieId) => {
-    const movie = movies.find(m => m.id === movieId);
+    const movie = movieOptions.find(m => m.id === movieId) || editingActor?.movies.find(m => m.id === movieId);
     return movie?.title || 'Film inconnu';
   };
 
-  const getGenreName = (genreId) => {
-    const genre = genres.find(g => g.id === genreId);
-    return genre?.name || 'Genre inconnu';
-  };
-
   const clearFilters = () => {
     setSearchQuery('');
     setSelectedAgeRange('all');
@@ -225,9 +267,9 @@ const Actors = ({ isAdmin }) => {
     
     try {
       const token = localStorage.getItem('token');
-      await axios.patch(`${API}/actors/${actorId}/image-settings`, newSettings, {
+      await localWrite({ actors: [actorId] }, () => axios.patch(`${API}/actors/${actorId}/image-settings`, newSettings, {
         headers: { Authorization: `Bearer ${token}` }
-      });
+      }));
       
       // Update local state
       setActors(prev => prev.map(actor => 
@@ -395,12 +437,9 @@ const Actors = ({ isAdmin }) => {
                       {actor.image ? (
                         <>
                           <img 
-                            src={actor.image} 
+                            src={thumbnailUrl('actors', actor, 320)} 
                             alt={actor.name}
-                            className="w-full h-full object-cover transition-transform duration-300"
-                            style={{
-                              transform: `scale(${settings.scale / 100}) translate(${(settings.positionX - 50) * 2}%, ${(settings.positionY - 50) * 2}%)`
-                            }}
+                            className="w-full h-full object-cover"
                             onLoad={(e) => {
                               e.target.style.display = 'block';
                               e.target.nextSibling.style.display = 'none';
@@ -688,19 +727,16 @@ const Actors = ({ isAdmin }) => {
                 <div className="space-y-2 mt-2">
                   {newActor.movies.length > 0 && (
                     <div className="flex flex-wrap gap-2">
-                      {newActor.movies.map((movieId) => {
-                        const movie = movies.find(m => m.id === movieId);
-                        return movie ? (
-                          <Badge 
-                            key={movieId} 
-                            variant="secondary" 
-                            className="bg-blue-600/20 text-blue-300 cursor-pointer hover:bg-red-500/20 hover:text-red-300"
-                            onClick={() => setNewActor({...newActor, movies: newActor.movies.filter(m => m !== movieId)})}
-                          >
-                            {movie.title} ×
-                          </Badge>
-                        ) : null;
-                      })}
+                      {newActor.movies.map((movieId) => (
+                        <Badge 
+                          key={movieId} 
+                          variant="secondary" 
+                          className="bg-blue-600/20 text-blue-300 cursor-pointer hover:bg-red-500/20 hover:text-red-300"
+                          onClick={() => setNewActor({...newActor, movies: newActor.movies.filter(m => m !== movieId)})}
+                        >
+                          {getMovieTitle(movieId)} ×
+                        </Badge>
+                      ))}
                     </div>
                   )}
                   <Select 
@@ -715,7 +751,7 @@ const Actors = ({ isAdmin }) => {
                       <SelectValue placeholder="Sélectionner un film" />
                     </SelectTrigger>
                     <SelectContent className="bg-gray-800 border-gray-600">
-                      {movies.filter(movie => !newActor.movies.includes(movie.id)).map((movie) => (
+                      {movieOptions.filter(movie => !newActor.movies.includes(movie.id)).map((movie) => (
                         <SelectItem key={movie.id} value={movie.id} className="text-white hover:bg-gray-700">
                           {movie.title}
                         </SelectItem>
@@ -785,9 +821,9 @@ const Actors = ({ isAdmin }) => {
                       <div>
                         <h4 className="font-semibold text-white mb-1">Genres</h4>
                         <div className="flex flex-wrap gap-1">
-                          {selectedActor.genres.map((genreId) => (
-                            <Badge key={genreId} variant="secondary" className="bg-violet-600/20 text-violet-300">
-                              {getGenreName(genreId)}
+                          {selectedActor.genres.map((genre) => (
+                            <Badge key={genre.id} variant="secondary" className="bg-violet-600/20 text-violet-300">
+                              {genre.name}
                             </Badge>
                           ))}
                         </div>
@@ -799,26 +835,23 @@ const Actors = ({ isAdmin }) => {
                     <div>
                       <h4 className="font-semibold text-white mb-2">Filmographie</h4>
                       <div className="grid grid-cols-1 gap-2">
-                        {selectedActor.movies.map((movieId) => {
-                          const movie = movies.find(m => m.id === movieId);
-                          return movie ? (
-                            <div key={movieId} className="flex items-center gap-3 p-2 bg-gray-700/30 rounded">
-                              {movie.image && (
-                                <img 
-                                  src={movie.image} 
-                                  alt={movie.title}
-                                  className="w-10 h-15 object-cover rounded"
-                                />
+                        {selectedActor.movies.map((movie) => (
+                          <div key={movie.id} className="flex items-center gap-3 p-2 bg-gray-700/30 rounded">
+                            {movie.image && (
+                              <img 
+                                src={movie.image} 
+                                alt={movie.title}
+                                className="w-10 h-15 object-cover rounded"
+                              />
+                            )}
+                            <div className="flex-1">
+                              <span className="text-gray-200 font-medium">{movie.title}</span>
+                              {movie.duration && (
+                                <p className="text-sm text-gray-400">{Math.floor(movie.duration / 60)}h {movie.duration % 60}m</p>
                               )}
-                              <div className="flex-1">
-                                <span className="text-gray-200 font-medium">{movie.title}</span>
-                                {movie.duration && (
-                                  <p className="text-sm text-gray-400">{Math.floor(movie.duration / 60)}h {movie.duration % 60}m</p>
-                                )}
-                              </div>
                             </div>
-                          ) : null;
-                        })}
+                          </div>
+                        ))}
                       </div>
                     </div>
                   )}
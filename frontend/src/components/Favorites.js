@@ -5,7 +5,9 @@ import { Card, CardContent } from './ui/card';
 import { Badge } from './ui/badge';
 import { Tabs, TabsContent, TabsList, TabsTrigger } from './ui/tabs';
 import { Dialog, DialogContent, DialogHeader, DialogTitle } from './ui/dialog';
+import { Checkbox } from './ui/checkbox';
 import axios from 'axios';
+import { localWrite, useChangeFeed } from '../hooks/use-change-feed';
 import { toast } from 'sonner';
 
 const BACKEND_URL = process.env.REACT_APP_BACKEND_URL;
@@ -18,14 +20,16 @@ const Favorites = ({ isAdmin }) => {
   const [activeTab, setActiveTab] = useState('movies');
   const [selectedMovie, setSelectedMovie] = useState(null);
   const [selectedActor, setSelectedActor] = useState(null);
+  const [selection, setSelection] = useState({ movies: [], actors: [] });
+  const selectionCount = selection.movies.length + selection.actors.length;
 
   useEffect(() => {
     loadFavorites();
   }, []);
 
-  const loadFavorites = async () => {
+  const loadFavorites = async (showLoading = true) => {
     try {
-      setLoading(true);
+      setLoading(showLoading);
       const response = await axios.get(`${API}/favorites`);
       setFavorites(response.data);
     } catch (error) {
@@ -36,11 +40,36 @@ const Favorites = ({ isAdmin }) => {
     }
   };
 
+  // Refresh in the background when another client toggles a favorite or changes a listed item
+  useChangeFeed(['movies', 'actors'], (event) => {
+    const listed = (favorites[event.collection] || []).some(item => item.id === event.id);
+    if (event.type === 'resync' || !event.id || listed || event.fields?.includes('is_favorite')) {
+      loadFavorites(false);
+    }
+  });
+
+  // Apply this tab's own writes from their response
+  const removeFavorites = (ids) => {
+    setFavorites(prev => ({
+      movies: prev.movies.filter(movie => !ids.movies?.includes(movie.id)),
+      actors: prev.actors.filter(actor => !ids.actors?.includes(actor.id))
+    }));
+  };
+
+  const toggleFavorite = async (kind, id) => {
+    const response = await localWrite({ [kind]: [id] }, () => axios.patch(`${API}/${kind}/${id}/favorite`));
+    if (response.data.is_favorite) {
+      // The list was stale: the item was not a favorite any more
+      loadFavorites(false);
+    } else {
+      removeFavorites({ [kind]: [id] });
+    }
+  };
+
   const toggleMovieFavorite = async (movieId, currentStatus) => {
     try {
-      await axios.patch(`${API}/movies/${movieId}/favorite`);
+      await toggleFavorite('movies', movieId);
       toast.success('Film retiré des favoris');
-      loadFavorites();
     } catch (error) {
       console.error('Error toggling movie favorite:', error);
       toast.error('Erreur lors de la modification des favoris');
@@ -49,15 +78,37 @@ const Favorites = ({ isAdmin }) => {
 
   const toggleActorFavorite = async (actorId, currentStatus) => {
     try {
-      await axios.patch(`${API}/actors/${actorId}/favorite`);
+      await toggleFavorite('actors', actorId);
       toast.success('Acteur retiré des favoris');
-      loadFavorites();
     } catch (error) {
       console.error('Error toggling actor favorite:', error);
       toast.error('Erreur lors de la modification des favoris');
     }
   };
 
+  const toggleSelection = (kind, id) => {
+    setSelection(prev => ({
+      ...prev,
+      [kind]: prev[kind].includes(id) ? prev[kind].filter(itemId => itemId !== id) : [...prev[kind], id]
+    }));
+  };
+
+  // Une seule requête pour toute la sélection
+  const removeSelectedFavorites = async () => {
+    try {
+      await localWrite(selection, () => axios.patch(`${API}/favorites`, {
+        movies: selection.movies.map(id => ({ id, is_favorite: false })),
+        actors: selection.actors.map(id => ({ id, is_favorite: false }))
+      }));
+      removeFavorites(selection);
+      toast.success(`${selectionCount} favori${selectionCount !== 1 ? 's' : ''} retiré${selectionCount !== 1 ? 's' : ''}`);
+      setSelection({ movies: [], actors: [] });
+    } catch (error) {
+      console.error('Error updating favorites:', error);
+      toast.error('Erreur lors de la modification des favoris');
+    }
+  };
+
   const formatDuration = (minutes) => {
     if (!minutes) return 'N/A';
     const hours = Math.floor(minutes / 60);
@@ -89,6 +140,31 @@ const Favorites = ({ isAdmin }) => {
           </div>
         </div>
 
+        {/* Selection */}
+        {selectionCount > 0 && (
+          <div className="flex items-center justify-between mb-6 p-4 bg-gray-800/60 border border-gray-700 rounded-lg">
+            <span className="text-gray-300">
+              {selectionCount} élément{selectionCount !== 1 ? 's' : ''} sélectionné{selectionCount !== 1 ? 's' : ''}
+            </span>
+            <div className="flex items-center gap-2">
+              <Button 
+                variant="outline"
+                className="border-gray-600 text-gray-300 hover:bg-gray-700"
+                onClick={() => setSelection({ movies: [], actors: [] })}
+              >
+                Annuler
+              </Button>
+              <Button 
+                className="bg-red-600 hover:bg-red-700"
+                onClick={removeSelectedFavorites}
+              >
+                <Heart className="w-4 h-4 mr-2" />
+                Retirer des favoris
+              </Button>
+            </div>
+          </div>
+        )}
+
         {/* Tabs */}
         <Tabs value={activeTab} onValueChange={setActiveTab} className="w-full">
           <TabsList className="grid w-full grid-cols-2 mb-8 bg-gray-800 border-gray-700">
@@ -178,6 +254,14 @@ const Favorites = ({ isAdmin }) => {
                           </div>
                         </div>
                         
+                        <div className="absolute top-2 left-2 z-10" onClick={(e) => e.stopPropagation()}>
+                          <Checkbox 
+                            checked={selection.movies.includes(movie.id)}
+                            onCheckedChange={() => toggleSelection('movies', movie.id)}
+                            className="bg-gray-900/70 border-white/70"
+                          />
+                        </div>
+                        
                         <div className="absolute top-2 right-2">
                           <Heart className="w-5 h-5 text-red-500 fill-current" />
                         </div>
@@ -265,6 +349,14 @@ const Favorites = ({ isAdmin }) => {
                           </Button>
                         </div>
                         
+                        <div className="absolute top-2 left-2 z-10" onClick={(e) => e.stopPropagation()}>
+                          <Checkbox 
+                            checked={selection.actors.includes(actor.id)}
+                            onCheckedChange={() => toggleSelection('actors', actor.id)}
+                            className="bg-gray-900/70 border-white/70"
+                          />
+                        </div>
+                        
                         <div className="absolute top-2 right-2">
                           <Heart className="w-5 h-5 text-red-500 fill-current" />
                         </div>
@@ -278,7 +370,7 @@ const Favorites = ({ isAdmin }) => {
                         )}
                         
                         <p className="text-xs text-gray-500">
-                          {actor.movies?.length || 0} film{(actor.movies?.length || 0) !== 1 ? 's' : ''}
+                          {actor.movie_count || 0} film{(actor.movie_count || 0) !== 1 ? 's' : ''}
                         </p>
                       </div>
                     </CardContent>
@@ -395,7 +487,7 @@ const Favorites = ({ isAdmin }) => {
                   <div className="space-y-2">
                     <h4 className="text-white font-semibold">Filmographie</h4>
                     <p className="text-gray-400">
-                      {selectedActor.movies?.length || 0} film{(selectedActor.movies?.length || 0) !== 1 ? 's' : ''}
+                      {selectedActor.movie_count || 0} film{(selectedActor.movie_count || 0) !== 1 ? 's' : ''}
                     </p>
                     {selectedActor.movies && selectedActor.movies.length > 0 && (
                       <div className="grid grid-cols-2 gap-2 mt-2">
@@ -211,7 +211,10 @@ const Genres = ({ isAdmin }) => {
                           </div>
                           <div>
                             <h3 className="font-semibold text-white">{genre.name}</h3>
-                            <p className="text-sm text-gray-400">Genre de film</p>
+                            <p className="text-sm text-gray-400">
+                              {genre.movie_count || 0} film{(genre.movie_count || 0) !== 1 ? 's' : ''}
+                              {genre.total_runtime > 0 && ` · ${Math.floor(genre.total_runtime / 60)}h ${genre.total_runtime % 60}m`}
+                            </p>
                           </div>
                         </div>
                         
@@ -275,7 +278,9 @@ const Genres = ({ isAdmin }) => {
                           </div>
                           <div>
                             <h3 className="font-semibold text-white">{genre.name}</h3>
-                            <p className="text-sm text-gray-400">Genre d'acteur</p>
+                            <p className="text-sm text-gray-400">
+                              {genre.actor_count || 0} acteur{(genre.actor_count || 0) !== 1 ? 's' : ''}
+                            </p>
                           </div>
                         </div>
                         
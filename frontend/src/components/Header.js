@@ -1,4 +1,4 @@
-import React, { useState, useEffect } from 'react';
+import React, { useEffect, useRef, useState } from 'react';
 import { Link, useLocation } from 'react-router-dom';
 import { Search, Film, Users, Crown, LogOut, Menu, X, Heart, Tag, Play } from 'lucide-react';
 import { Button } from './ui/button';
@@ -10,6 +10,9 @@ import axios from 'axios';
 const BACKEND_URL = process.env.REACT_APP_BACKEND_URL;
 const API = `${BACKEND_URL}/api`;
 
+// Wait for a pause in typing before querying /search: one request per word, not per keystroke
+const SEARCH_DEBOUNCE_MS = 300;
+
 const Header = ({ isAdmin, user, onToggleAdmin, onLogout }) => {
   const [searchQuery, setSearchQuery] = useState('');
   const [searchResults, setSearchResults] = useState(null);
@@ -17,39 +20,42 @@ const Header = ({ isAdmin, user, onToggleAdmin, onLogout }) => {
   const [isMobileMenuOpen, setIsMobileMenuOpen] = useState(false);
   const [selectedMovie, setSelectedMovie] = useState(null);
   const [selectedActor, setSelectedActor] = useState(null);
-  const [actors, setActors] = useState([]);
   const location = useLocation();
-
-  useEffect(() => {
-    loadActors();
-  }, []);
-
-  const loadActors = async () => {
-    try {
-      const response = await axios.get(`${API}/actors`);
-      setActors(response.data);
-    } catch (error) {
-      console.error('Error loading actors:', error);
-    }
-  };
+  // Id of the latest search; a slower response to an older query is dropped
+  const latestSearch = useRef(0);
 
   const handleSearch = async (query) => {
+    const searchId = ++latestSearch.current;
     if (!query.trim()) {
       setSearchResults(null);
+      setIsSearching(false);
       return;
     }
     
     setIsSearching(true);
     try {
-      const response = await axios.get(`${API}/search?q=${encodeURIComponent(query)}`);
-      setSearchResults(response.data);
+      const response = await axios.get(`${API}/search?q=${encodeURIComponent(query)}&expand=actors,movies,genres`);
+      if (searchId === latestSearch.current) {
+        setSearchResults(response.data);
+      }
     } catch (error) {
       console.error('Search error:', error);
     } finally {
-      setIsSearching(false);
+      if (searchId === latestSearch.current) {
+        setIsSearching(false);
+      }
     }
   };
 
+  useEffect(() => {
+    if (!searchQuery.trim()) {
+      handleSearch(searchQuery);
+      return;
+    }
+    const timer = setTimeout(() => handleSearch(searchQuery), SEARCH_DEBOUNCE_MS);
+    return () => clearTimeout(timer);
+  }, [searchQuery]);
+
   const clearSearch = () => {
     setSearchQuery('');
     setSearchResults(null);
@@ -62,11 +68,6 @@ const Header = ({ isAdmin, user, onToggleAdmin, onLogout }) => {
     return `${hours}h ${mins}m`;
   };
 
-  const getActorName = (actorId) => {
-    const actor = actors.find(a => a.id === actorId);
-    return actor?.name || 'Acteur inconnu';
-  };
-
   const toggleFavorite = async (id, currentStatus, type) => {
     try {
       await axios.patch(`${API}/${type}s/${id}/favorite`);
@@ -106,10 +107,7 @@ const Header = ({ isAdmin, user, onToggleAdmin, onLogout }) => {
                 type="text"
                 placeholder="Rechercher un film ou un acteur..."
                 value={searchQuery}
-                onChange={(e) => {
-                  setSearchQuery(e.target.value);
-                  handleSearch(e.target.value);
-                }}
+                onChange={(e) => setSearchQuery(e.target.value)}
                 className="pl-10 bg-gray-800/50 border-gray-700 text-white placeholder-gray-400 focus:border-violet-500"
               />
               {isSearching && (
@@ -265,10 +263,7 @@ const Header = ({ isAdmin, user, onToggleAdmin, onLogout }) => {
                 type="text"
                 placeholder="Rechercher..."
                 value={searchQuery}
-                onChange={(e) => {
-                  setSearchQuery(e.target.value);
-                  handleSearch(e.target.value);
-                }}
+                onChange={(e) => setSearchQuery(e.target.value)}
                 className="pl-10 bg-gray-800/50 border-gray-700 text-white placeholder-gray-400"
               />
             </div>
@@ -398,9 +393,9 @@ const Header = ({ isAdmin, user, onToggleAdmin, onLogout }) => {
                     <div>
                       <h4 className="font-semibold text-white mb-1">Genres</h4>
                       <div className="flex flex-wrap gap-1">
-                        {selectedMovie.genres.map((genreId, index) => (
-                          <Badge key={index} variant="secondary" className="bg-violet-600/20 text-violet-300">
-                            Genre {genreId}
+                        {selectedMovie.genres.map((genre) => (
+                          <Badge key={genre.id} variant="secondary" className="bg-violet-600/20 text-violet-300">
+                            {genre.name}
                           </Badge>
                         ))}
                       </div>
@@ -412,9 +407,9 @@ const Header = ({ isAdmin, user, onToggleAdmin, onLogout }) => {
                   <div>
                     <h4 className="font-semibold text-white mb-2">Acteurs</h4>
                     <div className="space-y-2">
-                      {selectedMovie.actors.map((actorId) => (
-                        <div key={actorId} className="flex items-center gap-3">
-                          <span className="text-gray-200">{getActorName(actorId)}</span>
+                      {selectedMovie.actors.map((actor) => (
+                        <div key={actor.id} className="flex items-center gap-3">
+                          <span className="text-gray-200">{actor.name}</span>
                         </div>
                       ))}
                     </div>
@@ -487,9 +482,9 @@ const Header = ({ isAdmin, user, onToggleAdmin, onLogout }) => {
                     <div>
                       <h4 className="font-semibold text-white mb-1">Genres</h4>
                       <div className="flex flex-wrap gap-1">
-                        {selectedActor.genres.map((genreId, index) => (
-                          <Badge key={index} variant="secondary" className="bg-violet-600/20 text-violet-300">
-                            Genre {genreId}
+                        {selectedActor.genres.map((genre) => (
+                          <Badge key={genre.id} variant="secondary" className="bg-violet-600/20 text-violet-300">
+                            {genre.name}
                           </Badge>
                         ))}
                       </div>
@@ -501,9 +496,9 @@ const Header = ({ isAdmin, user, onToggleAdmin, onLogout }) => {
                   <div>
                     <h4 className="font-semibold text-white mb-2">Filmographie</h4>
                     <div className="grid grid-cols-1 gap-2">
-                      {selectedActor.movies.map((movieId, index) => (
-                        <div key={index} className="flex items-center gap-3 p-2 bg-gray-700/30 rounded">
-                          <span className="text-gray-200 font-medium">Film {movieId}</span>
+                      {selectedActor.movies.map((movie) => (
+                        <div key={movie.id} className="flex items-center gap-3 p-2 bg-gray-700/30 rounded">
+                          <span className="text-gray-200 font-medium">{movie.title}</span>
                         </div>
                       ))}
                     </div>
@@ -29,34 +29,24 @@ const Home = ({ isAdmin }) => {
     try {
       setLoading(true);
       
-      // Load all data in parallel
-      const [featuredRes, recentRes, favoritesRes, genresRes, actorsRes] = await Promise.all([
-        axios.get(`${API}/movies/featured`),
-        axios.get(`${API}/movies/recent?limit=8`),
-        axios.get(`${API}/movies/favorites?limit=6`),
-        axios.get(`${API}/genres?type=movie`),
-        axios.get(`${API}/actors`)
-      ]);
+      // Load the whole home page in a single request
+      const { data } = await axios.get(`${API}/home`, {
+        params: { recent_limit: 8, favorites_limit: 6, genre_count: 3, per_genre: 6 }
+      });
       
-      setFeaturedMovie(featuredRes.data);
-      setRecentMovies(recentRes.data);
-      setFavoriteMovies(favoritesRes.data);
-      setGenres(genresRes.data);
-      setActors(actorsRes.data);
+      setFeaturedMovie(data.featured);
+      setRecentMovies(data.recent);
+      setFavoriteMovies(data.favorites);
+      setGenres(data.genres);
+      setActors(data.actors);
       
-      // Load movies by genre
       const moviesByGenreData = {};
-      for (const genre of genresRes.data.slice(0, 3)) {
-        try {
-          const moviesRes = await axios.get(`${API}/movies/by-genre/${genre.id}?limit=6`);
-          if (moviesRes.data.length > 0) {
-            moviesByGenreData[genre.name] = {
-              genre: genre,
-              movies: moviesRes.data
-            };
-          }
-        } catch (error) {
-          console.error(`Error loading movies for genre ${genre.name}:`, error);
+      for (const section of data.by_genre) {
+        if (section.movies.length > 0) {
+          moviesByGenreData[section.genre.name] = {
+            genre: section.genre,
+            movies: section.movies
+          };
         }
       }
       setMoviesByGenre(moviesByGenreData);
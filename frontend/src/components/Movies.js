@@ -10,14 +10,21 @@ import { Label } from './ui/label';
 import { Textarea } from './ui/textarea';
 import { Slider } from './ui/slider';
 import axios from 'axios';
+import { applyChange, fetchAllPages, fetchItem, patchItem, refreshReferencing, removeItems, thumbnailUrl, upsertItem } from '../lib/api';
+import { localWrite, useChangeFeed } from '../hooks/use-change-feed';
 import { toast } from 'sonner';
 
 const BACKEND_URL = process.env.REACT_APP_BACKEND_URL;
 const API = `${BACKEND_URL}/api`;
 
+// Actors and genres come embedded as { id, name, image } summaries: no need to
+// download the whole actors collection to display names
+const MOVIE_EXPAND = { expand: 'actors,genres' };
+
 const Movies = ({ isAdmin }) => {
   const [movies, setMovies] = useState([]);
-  const [actors, setActors] = useState([]);
+  // Full actor list for the admin form only, loaded when the form opens
+  const [actorOptions, setActorOptions] = useState([]);
   const [genres, setGenres] = useState([]);
   const [filteredMovies, setFilteredMovies] = useState([]);
   const [loading, setLoading] = useState(true);
@@ -28,6 +35,7 @@ const Movies = ({ isAdmin }) => {
   const [showAddDialog, setShowAddDialog] = useState(false);
   const [editingMovie, setEditingMovie] = useState(null);
   const [selectedMovie, setSelectedMovie] = useState(null);
+  const [relatedMovies, setRelatedMovies] = useState([]);
   
   const [newMovie, setNewMovie] = useState({
     title: '',
@@ -49,17 +57,27 @@ const Movies = ({ isAdmin }) => {
     filterMovies();
   }, [movies, searchQuery, selectedActor, selectedGenre, selectedDuration]);
 
+  useEffect(() => {
+    if (showAddDialog) loadActorOptions();
+  }, [showAddDialog]);
+
+  useEffect(() => {
+    setRelatedMovies([]);
+    if (!selectedMovie) return;
+    axios.get(`${API}/movies/${selectedMovie.id}/related?limit=6`)
+      .then(response => setRelatedMovies(response.data))
+      .catch(() => setRelatedMovies([]));
+  }, [selectedMovie?.id]);
+
   const loadData = async () => {
     try {
       setLoading(true);
-      const [moviesRes, actorsRes, genresRes] = await Promise.all([
-        axios.get(`${API}/movies`),
-        axios.get(`${API}/actors`),
+      const [moviesData, genresRes] = await Promise.all([
+        fetchAllPages(`${API}/movies`, MOVIE_EXPAND),
         axios.get(`${API}/genres?type=movie`)
       ]);
       
-      setMovies(moviesRes.data);
-      setActors(actorsRes.data);
+      setMovies(moviesData);
       setGenres(genresRes.data);
     } catch (error) {
       console.error('Error loading data:', error);
@@ -69,6 +87,43 @@ const Movies = ({ isAdmin }) => {
     }
   };
 
+  const loadActorOptions = async () => {
+    try {
+      setActorOptions(await fetchAllPages(`${API}/actors`, { fields: 'name' }));
+    } catch (error) {
+      console.error('Error loading actors:', error);
+    }
+  };
+
+  // Changes made by other clients arrive through the change feed
+  useChangeFeed(['movies', 'actors', 'genres'], async (event) => {
+    try {
+      if (event.collection === 'genres') {
+        const response = await axios.get(`${API}/genres?type=movie`);
+        setGenres(response.data);
+        // A renamed genre is embedded in the movies that use it
+        if (event.op === 'update' && (!event.fields || event.fields.includes('name'))) {
+          if (event.id) await refreshReferencing(setMovies, 'movies', { ...MOVIE_EXPAND, genre: event.id });
+          else loadData();
+        }
+        return;
+      }
+      if (event.collection === 'actors') {
+        // Link changes and deletes also announce the movies themselves
+        if (event.type === 'change' && event.op === 'delete') return;
+        if (event.type === 'change' && event.fields && !event.fields.some(field => ['name', 'image'].includes(field))) return;
+        if (event.id) await refreshReferencing(setMovies, 'movies', { ...MOVIE_EXPAND, actor: event.id });
+        else loadData();
+        return;
+      }
+      if (!(await applyChange(setMovies, 'movies', event, MOVIE_EXPAND))) {
+        loadData();
+      }
+    } catch (error) {
+      console.error('Error applying change:', error);
+    }
+  });
+
   const filterMovies = () => {
     let filtered = movies;
 
@@ -77,21 +132,18 @@ const Movies = ({ isAdmin }) => {
       filtered = filtered.filter(movie => 
         movie.title.toLowerCase().includes(searchQuery.toLowerCase()) ||
         movie.description?.toLowerCase().includes(searchQuery.toLowerCase()) ||
-        movie.actors.some(actorId => {
-          const actor = actors.find(a => a.id === actorId);
-          return actor?.name.toLowerCase().includes(searchQuery.toLowerCase());
-        })
+        movie.actors.some(actor => actor.name?.toLowerCase().includes(searchQuery.toLowerCase()))
       );
     }
 
     // Actor filter
     if (selectedActor && selectedActor !== 'all') {
-      filtered = filtered.filter(movie => movie.actors.includes(selectedActor));
+      filtered = filtered.filter(movie => movie.actors.some(actor => actor.id === selectedActor));
     }
 
     // Genre filter
     if (selectedGenre && selectedGenre !== 'all') {
-      filtered = filtered.filter(movie => movie.genres.includes(selectedGenre));
+      filtered = filtered.filter(movie => movie.genres.some(genre => genre.id === selectedGenre));
     }
 
     // Duration filter
@@ -125,21 +177,23 @@ const Movies = ({ isAdmin }) => {
       };
       
       if (editingMovie) {
-        await axios.put(`${API}/movies/${editingMovie.id}`, movieData, {
+        await localWrite({ movies: [editingMovie.id] }, () => axios.put(`${API}/movies/${editingMovie.id}`, movieData, {
           headers: { Authorization: `Bearer ${token}` }
-        });
+        }));
+        // The write response carries ids; the list holds expanded summaries
+        upsertItem(setMovies, await fetchItem('movies', editingMovie.id, MOVIE_EXPAND));
         toast.success('Film modifié avec succès');
       } else {
-        await axios.post(`${API}/movies`, movieData, {
+        const response = await axios.post(`${API}/movies`, movieData, {
           headers: { Authorization: `Bearer ${token}` }
         });
+        upsertItem(setMovies, await fetchItem('movies', response.data.id, MOVIE_EXPAND));
         toast.success('Film ajouté avec succès');
       }
       
       setShowAddDialog(false);
       setEditingMovie(null);
       resetForm();
-      loadData();
     } catch (error) {
       console.error('Error saving movie:', error);
       toast.error('Erreur lors de la sauvegarde');
@@ -153,11 +207,11 @@ const Movies = ({ isAdmin }) => {
 
     try {
       const token = localStorage.getItem('token');
-      await axios.delete(`${API}/movies/${movieId}`, {
+      await localWrite({ movies: [movieId] }, () => axios.delete(`${API}/movies/${movieId}`, {
         headers: { Authorization: `Bearer ${token}` }
-      });
+      }));
+      removeItems(setMovies, [movieId]);
       toast.success('Film supprimé avec succès');
-      loadData();
     } catch (error) {
       console.error('Error deleting movie:', error);
       toast.error('Erreur lors de la suppression');
@@ -166,9 +220,10 @@ const Movies = ({ isAdmin }) => {
 
   const toggleFavorite = async (movieId, currentStatus) => {
     try {
-      await axios.patch(`${API}/movies/${movieId}/favorite`);
-      toast.success(currentStatus ? 'Retiré des favoris' : 'Ajouté aux favoris');
-      loadData();
+      const response = await localWrite({ movies: [movieId] }, () => axios.patch(`${API}/movies/${movieId}/favorite`));
+      patchItem(setMovies, movieId, response.data);
+      setSelectedMovie(prev => prev?.id === movieId ? { ...prev, ...response.data } : prev);
+      toast.success(response.data.is_favorite ? 'Ajouté aux favoris' : 'Retiré des favoris');
     } catch (error) {
       console.error('Error toggling favorite:', error);
       toast.error('Erreur lors de la modification des favoris');
@@ -193,9 +248,9 @@ const Movies = ({ isAdmin }) => {
       title: movie.title,
       url: movie.url || '',
       image: movie.image || '',
-      actors: movie.actors || [],
+      actors: (movie.actors || []).map(actor => actor.id),
       description: movie.description || '',
-      genres: movie.genres || [],
+      genres: (movie.genres || []).map(genre => genre.id),
       duration: movie.duration ? movie.duration.toString() : ''
     });
     setShowAddDialog(true);
@@ -208,16 +263,17 @@ const Movies = ({ isAdmin }) => {
     return `${hours}h ${mins}m`;
   };
 
+  // Actors offered by the filter: those appearing in the loaded movies
+  const filterActors = Object.values(
+    Object.fromEntries(movies.flatMap(movie => movie.actors).map(actor => [actor.id, actor]))
+  ).sort((a, b) => (a.name || '').localeCompare(b.name || ''));
+
+  // Names for the form chips: full list once loaded, else the edited movie's summaries
   const getActorName = (actorId) => {
-    const actor = actors.find(a => a.id === actorId);
+    const actor = actorOptions.find(a => a.id === actorId) || editingMovie?.actors.find(a => a.id === actorId);
     return actor?.name || 'Acteur inconnu';
   };
 
-  const getGenreName = (genreId) => {
-    const genre = genres.find(g => g.id === genreId);
-    return genre?.name || 'Genre inconnu';
-  };
-
   const clearFilters = () => {
     setSearchQuery('');
     setSelectedActor('all');
@@ -235,9 +291,9 @@ const Movies = ({ isAdmin }) => {
     
     try {
       const token = localStorage.getItem('token');
-      await axios.patch(`${API}/movies/${movieId}/image-settings`, newSettings, {
+      await localWrite({ movies: [movieId] }, () => axios.patch(`${API}/movies/${movieId}/image-settings`, newSettings, {
         headers: { Authorization: `Bearer ${token}` }
-      });
+      }));
       
       // Update local state
       setMovies(prev => prev.map(movie => 
@@ -326,7 +382,7 @@ const Movies = ({ isAdmin }) => {
                 </SelectTrigger>
                 <SelectContent className="bg-gray-800 border-gray-600">
                   <SelectItem value="all">Tous les acteurs</SelectItem>
-                  {actors.map((actor) => (
+                  {filterActors.map((actor) => (
                     <SelectItem key={actor.id} value={actor.id} className="text-white hover:bg-gray-700">
                       {actor.name}
                     </SelectItem>
@@ -425,12 +481,9 @@ const Movies = ({ isAdmin }) => {
                       {movie.image ? (
                         <>
                           <img 
-                            src={movie.image} 
+                            src={thumbnailUrl('movies', movie, 640)} 
                             alt={movie.title}
-                            className="w-full h-full object-cover transition-transform duration-300"
-                            style={{
-                              transform: `scale(${settings.scale / 100}) translate(${(settings.positionX - 50) * 2}%, ${(settings.positionY - 50) * 2}%)`
-                            }}
+                            className="w-full h-full object-cover"
                             onLoad={(e) => {
                               e.target.style.display = 'block';
                               e.target.nextSibling.style.display = 'none';
@@ -729,19 +782,16 @@ const Movies = ({ isAdmin }) => {
                 <div className="space-y-2 mt-2">
                   {newMovie.actors.length > 0 && (
                     <div className="flex flex-wrap gap-2">
-                      {newMovie.actors.map((actorId) => {
-                        const actor = actors.find(a => a.id === actorId);
-                        return actor ? (
-                          <Badge 
-                            key={actorId} 
-                            variant="secondary" 
-                            className="bg-blue-600/20 text-blue-300 cursor-pointer hover:bg-red-500/20 hover:text-red-300"
-                            onClick={() => setNewMovie({...newMovie, actors: newMovie.actors.filter(a => a !== actorId)})}
-                          >
-                            {actor.name} ×
-                          </Badge>
-                        ) : null;
-                      })}
+                      {newMovie.actors.map((actorId) => (
+                        <Badge 
+                          key={actorId} 
+                          variant="secondary" 
+                          className="bg-blue-600/20 text-blue-300 cursor-pointer hover:bg-red-500/20 hover:text-red-300"
+                          onClick={() => setNewMovie({...newMovie, actors: newMovie.actors.filter(a => a !== actorId)})}
+                        >
+                          {getActorName(actorId)} ×
+                        </Badge>
+                      ))}
                     </div>
                   )}
                   <Select 
@@ -756,7 +806,7 @@ const Movies = ({ isAdmin }) => {
                       <SelectValue placeholder="Sélectionner un acteur" />
                     </SelectTrigger>
                     <SelectContent className="bg-gray-800 border-gray-600">
-                      {actors.filter(actor => !newMovie.actors.includes(actor.id)).map((actor) => (
+                      {actorOptions.filter(actor => !newMovie.actors.includes(actor.id)).map((actor) => (
                         <SelectItem key={actor.id} value={actor.id} className="text-white hover:bg-gray-700">
                           {actor.name}
                         </SelectItem>
@@ -826,9 +876,9 @@ const Movies = ({ isAdmin }) => {
                       <div>
                         <h4 className="font-semibold text-white mb-1">Genres</h4>
                         <div className="flex flex-wrap gap-1">
-                          {selectedMovie.genres.map((genreId) => (
-                            <Badge key={genreId} variant="secondary" className="bg-violet-600/20 text-violet-300">
-                              {getGenreName(genreId)}
+                          {selectedMovie.genres.map((genre) => (
+                            <Badge key={genre.id} variant="secondary" className="bg-violet-600/20 text-violet-300">
+                              {genre.name}
                             </Badge>
                           ))}
                         </div>
@@ -840,21 +890,36 @@ const Movies = ({ isAdmin }) => {
                     <div>
                       <h4 className="font-semibold text-white mb-2">Acteurs</h4>
                       <div className="space-y-2">
-                        {selectedMovie.actors.map((actorId) => {
-                          const actor = actors.find(a => a.id === actorId);
-                          return actor ? (
-                            <div key={actorId} className="flex items-center gap-3">
-                              {actor.image && (
-                                <img 
-                                  src={actor.image} 
-                                  alt={actor.name}
-                                  className="w-10 h-10 rounded-full object-cover"
-                                />
-                              )}
-                              <span className="text-gray-200">{actor.name}</span>
-                            </div>
-                          ) : null;
-                        })}
+                        {selectedMovie.actors.map((actor) => (
+                          <div key={actor.id} className="flex items-center gap-3">
+                            {actor.image && (
+                              <img 
+                                src={actor.image} 
+                                alt={actor.name}
+                                className="w-10 h-10 rounded-full object-cover"
+                              />
+                            )}
+                            <span className="text-gray-200">{actor.name}</span>
+                          </div>
+                        ))}
+                      </div>
+                    </div>
+                  )}
+
+                  {relatedMovies.length > 0 && (
+                    <div>
+                      <h4 className="font-semibold text-white mb-2">Films similaires</h4>
+                      <div className="flex flex-wrap gap-2">
+                        {relatedMovies.map((related) => (
+                          <Badge
+                            key={related.id}
+                            variant="secondary"
+                            className="bg-gray-700 text-gray-200 cursor-pointer hover:bg-violet-600/40"
+                            onClick={() => setSelectedMovie(movies.find(movie => movie.id === related.id) || null)}
+                          >
+                            {related.title}
+                          </Badge>
+                        ))}
                       </div>
                     </div>
                   )}
@@ -0,0 +1,52 @@
+import { useEffect, useRef } from 'react';
+
+const API = `${process.env.REACT_APP_BACKEND_URL}/api`;
+
+// Writes made by this tab update local state from their response. Their echo
+// on the feed is skipped, so the feed only triggers refetches for changes made
+// by other clients (and for documents the write touched indirectly).
+const ECHO_WINDOW_MS = 5000;
+const localWrites = new Map();
+
+// targets: { collection: [ids] } written by the request
+export async function localWrite(targets, request) {
+  const keys = Object.entries(targets).flatMap(([collection, ids]) => ids.map(id => `${collection}:${id}`));
+  const expires = Date.now() + ECHO_WINDOW_MS;
+  // Registered before sending: the event can arrive before the response
+  keys.forEach(key => localWrites.set(key, expires));
+  try {
+    return await request();
+  } catch (error) {
+    keys.forEach(key => localWrites.delete(key));
+    throw error;
+  }
+}
+
+function isEcho(event) {
+  if (event.type !== 'change' || !event.id) return false;
+  const key = `${event.collection}:${event.id}`;
+  const expires = localWrites.get(key);
+  if (expires === undefined) return false;
+  localWrites.delete(key);
+  return expires >= Date.now();
+}
+
+// Subscribe to /api/events (server-sent events). EventSource reconnects on its
+// own and sends Last-Event-ID, so the server replays what was missed or asks
+// for a resync when it cannot.
+export function useChangeFeed(collections, onEvent) {
+  const handler = useRef(onEvent);
+  handler.current = onEvent;
+  const key = collections.join(',');
+
+  useEffect(() => {
+    const source = new EventSource(`${API}/events?collections=${key}`);
+    const dispatch = (message) => {
+      const event = JSON.parse(message.data);
+      if (!isEcho(event)) handler.current(event);
+    };
+    source.addEventListener('change', dispatch);
+    source.addEventListener('resync', dispatch);
+    return () => source.close();
+  }, [key]);
+}
@@ -0,0 +1,83 @@
+import axios from 'axios';
+
+// Follow next_cursor until the paginated list endpoint is exhausted
+export async function fetchAllPages(url, params = {}) {
+  const items = [];
+  let cursor = null;
+  do {
+    const response = await axios.get(url, {
+      params: { ...params, limit: 500, ...(cursor ? { cursor } : {}) }
+    });
+    items.push(...response.data.items);
+    cursor = response.data.next_cursor;
+  } while (cursor);
+  return items;
+}
+
+const API = `${process.env.REACT_APP_BACKEND_URL}/api`;
+
+const hashString = (value) => {
+  let hash = 5381;
+  for (let i = 0; i < value.length; i++) {
+    hash = ((hash << 5) + hash + value.charCodeAt(i)) >>> 0;
+  }
+  return hash.toString(36);
+};
+
+// Server-side thumbnail with image_settings applied; `v` changes whenever the
+// source or the settings change, so the response can be cached as immutable
+export function thumbnailUrl(kind, item, width = 320) {
+  const { scale = 100, positionX = 50, positionY = 50 } = item.image_settings || {};
+  const v = `${scale}-${positionX}-${positionY}-${hashString(item.image || '')}`;
+  return `${API}/images/${kind}/${item.id}?width=${width}&v=${v}`;
+}
+
+// Local state updates, shared by write responses and change events
+export function upsertItem(setItems, item) {
+  setItems(prev => prev.some(existing => existing.id === item.id)
+    ? prev.map(existing => existing.id === item.id ? item : existing)
+    : [item, ...prev]);
+}
+
+export function patchItem(setItems, id, changes) {
+  setItems(prev => prev.map(item => item.id === id ? { ...item, ...changes } : item));
+}
+
+export function removeItems(setItems, ids) {
+  setItems(prev => prev.filter(item => !ids.includes(item.id)));
+}
+
+// Apply one change event to a list held in state: deletes are removed locally,
+// other changes refetch the single document. Returns false when the event has
+// no id (bulk change, resync) and the caller has to reload the whole list.
+// `params` is passed to the refetch (e.g. { expand: 'actors,genres' }) so the
+// document keeps the same shape as the list it goes into.
+export async function applyChange(setItems, kind, event, params = {}) {
+  if (event.type !== 'change' || !event.id) return false;
+  if (event.op === 'delete') {
+    removeItems(setItems, [event.id]);
+    return true;
+  }
+  try {
+    const { data } = await axios.get(`${API}/${kind}/${event.id}`, { params });
+    upsertItem(setItems, data);
+  } catch (error) {
+    if (error.response?.status !== 404) throw error;
+    removeItems(setItems, [event.id]);
+  }
+  return true;
+}
+
+// Refetch the items of a list that embed a changed document (e.g. the movies
+// of a renamed actor) instead of reloading the whole list
+export async function refreshReferencing(setItems, kind, params) {
+  const items = await fetchAllPages(`${API}/${kind}`, params);
+  items.forEach(item => upsertItem(setItems, item));
+}
+
+// Single document in the same shape as the list, after a write whose response
+// only carries ids
+export async function fetchItem(kind, id, params) {
+  const { data } = await axios.get(`${API}/${kind}/${id}`, { params });
+  return data;
+}
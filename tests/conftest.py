@@ -0,0 +1,64 @@
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+import pytest
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent / "backend"
+sys.path.insert(0, str(BACKEND_DIR))
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+os.environ.setdefault("DB_NAME", "moviehub_test")
+os.environ.setdefault("IMAGE_CACHE_DIR", tempfile.mkdtemp(prefix="moviehub-images-"))
+
+import httpx  # noqa: E402
+import mongomock_motor  # noqa: E402
+
+import server  # noqa: E402
+from cache import MemoryCache  # noqa: E402
+from events import EventBus  # noqa: E402
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+
+@pytest.fixture
+async def database(monkeypatch):
+    # Base mongomock neuve par test ; TEST_MONGO_URL pour un vrai serveur
+    url = os.environ.get("TEST_MONGO_URL")
+    # tz_aware comme en production (mongo_options) : dates relues en UTC avec fuseau
+    mongo_client = server.connect(url) if url else mongomock_motor.AsyncMongoMockClient(tz_aware=True)
+    name = f"moviehub_test_{os.getpid()}"
+    monkeypatch.setattr(server, "client", mongo_client)
+    # mongomock ne connaît pas les transactions
+    monkeypatch.setattr(server, "_transactions_supported", None if url else False)
+    monkeypatch.setattr(server.cache, "backend", MemoryCache())
+    monkeypatch.setattr(server, "events", EventBus())
+    monkeypatch.setattr(server.rate_limiter, "enabled", False)
+    server.auth_cache.invalidate_user()
+    server.use_database(mongo_client[name])
+    yield server.db
+    if url:
+        await mongo_client.drop_database(name)
+
+
+@pytest.fixture
+async def client(database):
+    transport = httpx.ASGITransport(app=server.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as http_client:
+        yield http_client
+
+
+@pytest.fixture
+async def sample_data(client):
+    response = await client.post("/api/init-data")
+    response.raise_for_status()
+
+
+@pytest.fixture
+async def auth_headers(client, sample_data):
+    response = await client.post("/api/auth/login", json={"username": "admin", "password": "admin123"})
+    response.raise_for_status()
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
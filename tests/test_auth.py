@@ -0,0 +1,113 @@
+import time
+from datetime import datetime
+
+import jwt
+import pytest
+from fastapi import HTTPException
+
+import server
+from cache import AuthCache
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+def auth_cache(monkeypatch):
+    auth_cache = AuthCache(user_ttl=60)
+    monkeypatch.setattr(server, "auth_cache", auth_cache)
+    return auth_cache
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    # Module time avancé de clock[0] secondes, dont les horloges du cache
+    offset = [0.0]
+    real_time, real_monotonic = time.time, time.monotonic
+    monkeypatch.setattr(time, "time", lambda: real_time() + offset[0])
+    monkeypatch.setattr(time, "monotonic", lambda: real_monotonic() + offset[0])
+    return offset
+
+
+async def me(client, token: str):
+    return await client.get("/api/auth/me", headers={"Authorization": f"Bearer {token}"})
+
+
+async def login(client, password: str = "admin123"):
+    return await client.post("/api/auth/login", json={"username": "admin", "password": password})
+
+
+async def test_changes_apply_once_the_user_is_invalidated(client, database, sample_data, auth_cache):
+    token = (await login(client)).json()["access_token"]
+    assert (await me(client, token)).json()["is_admin"] is True
+    assert await server.can_profile({"authorization": f"Bearer {token}"})
+
+    # Modification hors API (script d'administration) : le cache sert l'ancienne version jusqu'au TTL
+    await database.users.update_one(
+        {"username": "admin"}, {"$set": {"is_admin": False, "password_hash": server.get_password_hash("s3cret")}}
+    )
+    assert (await me(client, token)).json()["is_admin"] is True
+
+    auth_cache.invalidate_user("admin")
+    assert (await me(client, token)).json()["is_admin"] is False
+    assert not await server.can_profile({"authorization": f"Bearer {token}"})
+    # La connexion lit toujours la base ; le jeton déjà émis reste valide jusqu'à son exp
+    assert (await login(client)).status_code == 401
+    assert (await login(client, "s3cret")).status_code == 200
+
+    await database.users.delete_one({"username": "admin"})
+    auth_cache.invalidate_user()
+    response = await me(client, token)
+    assert (response.status_code, response.json()["detail"]) == (401, "User not found")
+
+
+async def test_expired_tokens_are_rejected_even_when_cached(database, sample_data, auth_cache, clock, monkeypatch):
+    class Later(datetime):
+        # PyJWT valide exp avec datetime.now, pas time.time
+        @classmethod
+        def now(cls, tz=None):
+            return datetime.fromtimestamp(time.time(), tz)
+
+    monkeypatch.setattr("jwt.api_jwt.datetime", Later)
+    exp = int(time.time()) + 120
+    token = jwt.encode({"sub": "admin", "exp": exp}, server.SECRET_KEY, algorithm=server.ALGORITHM)
+    assert (await server.authenticate(token)).username == "admin"
+    assert (await server.authenticate(token)).username == "admin"
+    assert auth_cache.stats["token_hits"] == 1
+
+    clock[0] = exp - time.time() + 1
+    with pytest.raises(HTTPException) as error:
+        await server.authenticate(token)
+    assert (error.value.status_code, error.value.detail) == (401, "Invalid token")
+    # L'entrée expirée est retirée plutôt que resservie
+    assert auth_cache.info()["tokens"] == 0
+    assert auth_cache.stats["token_misses"] == 2
+
+    # Jeton signé avec une autre clé : jamais mis en cache
+    forged = jwt.encode({"sub": "admin", "exp": exp + 3600}, "not-the-secret", algorithm=server.ALGORITHM)
+    with pytest.raises(HTTPException):
+        await server.authenticate(forged)
+    assert auth_cache.info()["tokens"] == 0
+
+
+async def test_user_ttl_is_honoured(database, sample_data, auth_cache, clock):
+    token = server.create_access_token({"sub": "admin"})
+    await server.authenticate(token)
+    await database.users.update_one({"username": "admin"}, {"$set": {"is_admin": False}})
+
+    clock[0] = auth_cache.user_ttl - 1
+    assert (await server.authenticate(token)).is_admin is True
+    assert (auth_cache.stats["user_hits"], auth_cache.stats["user_misses"]) == (1, 1)
+
+    clock[0] = auth_cache.user_ttl + 1
+    assert (await server.authenticate(token)).is_admin is False
+    assert auth_cache.stats["user_misses"] == 2
+
+    # Les absences sont mises en cache pour la même durée
+    ghost = server.create_access_token({"sub": "ghost"})
+    for _ in range(2):
+        with pytest.raises(HTTPException):
+            await server.authenticate(ghost)
+    assert auth_cache.stats["user_misses"] == 3
+    await database.users.insert_one(server.User(username="ghost", password_hash="x", is_admin=False).dict())
+    clock[0] += auth_cache.user_ttl + 1
+    assert (await server.authenticate(ghost)).username == "ghost"
@@ -0,0 +1,231 @@
+import asyncio
+
+import fakeredis
+import pytest
+
+import server
+from cache import MISS, MemoryCache, RedisCache, ResponseCache
+
+pytestmark = pytest.mark.anyio
+
+TAGS = ("movies", "actors", "genres")
+
+
+def counting_handler(calls: list):
+    async def handler(limit: int = 6):
+        calls.append(limit)
+        return {"limit": limit, "calls": len(calls)}
+    return handler
+
+
+async def test_cache_hit_skips_the_handler():
+    calls = []
+    response_cache = ResponseCache(MemoryCache())
+    handler = response_cache.cached("recent", tags=("movies",))(counting_handler(calls))
+
+    first = await handler(limit=6)
+    second = await handler(limit=6)
+    assert calls == [6]
+    assert first.body == second.body
+
+    await handler(limit=3)
+    assert calls == [6, 3]
+
+    await response_cache.invalidate("movies")
+    await handler(limit=6)
+    assert calls == [6, 3, 6]
+
+
+async def test_fill_is_not_stored_when_a_write_lands_meanwhile():
+    calls = []
+    response_cache = ResponseCache(MemoryCache())
+
+    async def handler():
+        calls.append(1)
+        # Écriture concurrente pendant le calcul : le résultat est servi mais pas mis en cache
+        await response_cache.invalidate("movies")
+        return {"calls": len(calls)}
+
+    cached = response_cache.cached("stale", tags=("movies",))(handler)
+    await cached()
+    assert response_cache.backend.info()["size"] == 0
+
+
+async def test_concurrent_misses_share_one_execution():
+    release = asyncio.Event()
+    calls = []
+    response_cache = ResponseCache(MemoryCache())
+
+    async def handler():
+        calls.append(1)
+        await release.wait()
+        return {"ok": True}
+
+    cached = response_cache.cached("slow", tags=("movies",))(handler)
+    pending = [asyncio.ensure_future(cached()) for _ in range(5)]
+    await asyncio.sleep(0)
+    release.set()
+    responses = await asyncio.gather(*pending)
+    assert calls == [1]
+    assert {response.body for response in responses} == {b'{"ok":true}'}
+    assert response_cache.flights.stats["coalesced"] == 4
+
+
+async def test_app_serves_repeated_reads_from_the_cache(client, sample_data):
+    backend = server.cache.backend
+    first = await client.get("/api/genres")
+    hits = backend.stats["hits"]
+    second = await client.get("/api/genres")
+    assert backend.stats["hits"] == hits + 1
+    assert first.content == second.content
+
+
+async def test_memory_cache_evicts_least_recently_used():
+    backend = MemoryCache(max_entries=2)
+    await backend.set("a", b"1", ("movies",))
+    await backend.set("b", b"2", ("movies",))
+    assert await backend.get("a") == b"1"
+    await backend.set("c", b"3", ("actors",))
+    assert await backend.get("b") is MISS
+    assert await backend.get("a") == b"1"
+    assert await backend.get("c") == b"3"
+    assert backend.stats["evictions"] == 1
+
+    # Les index de tags suivent les évictions
+    await backend.invalidate("movies")
+    assert await backend.get("a") is MISS
+    assert backend.info()["size"] == 1
+
+
+async def test_memory_cache_expires_entries(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr("cache.time.monotonic", lambda: now[0])
+    backend = MemoryCache(ttl=10)
+    await backend.set("a", b"1")
+    await backend.set("b", b"2", ttl=60)
+    now[0] += 11
+    assert await backend.get("a") is MISS
+    assert await backend.get("b") == b"2"
+    assert backend.stats["expirations"] == 1
+
+
+async def first_item(client, path: str) -> dict:
+    response = await client.get(path)
+    body = response.json()
+    return (body["items"] if isinstance(body, dict) else body)[0]
+
+
+async def mutation(client, route: str) -> tuple:
+    movie = await first_item(client, "/api/movies")
+    movie_id = movie["id"]
+    actor_id = (await first_item(client, "/api/actors"))["id"]
+    genre_id = (await first_item(client, "/api/genres"))["id"]
+    routes = {
+        "create_movie": ("POST", "/api/movies", {"title": "Cache test", "actors": [actor_id], "genres": [genre_id]}, TAGS),
+        "update_movie": ("PUT", f"/api/movies/{movie_id}", {"title": "Renamed", "duration": 90}, TAGS),
+        "delete_movie": ("DELETE", f"/api/movies/{movie_id}", None, TAGS),
+        "toggle_movie_favorite": ("PATCH", f"/api/movies/{movie_id}/favorite", None, ("movies",)),
+        "movie_image_settings": ("PATCH", f"/api/movies/{movie_id}/image-settings", {"zoom": 2}, ("movies",)),
+        "create_actor": ("POST", "/api/actors", {"name": "Cache test", "movies": [movie_id]}, TAGS),
+        "update_actor": ("PUT", f"/api/actors/{actor_id}", {"name": "Renamed"}, TAGS),
+        "delete_actor": ("DELETE", f"/api/actors/{actor_id}", None, TAGS),
+        "toggle_actor_favorite": ("PATCH", f"/api/actors/{actor_id}/favorite", None, ("actors",)),
+        "actor_image_settings": ("PATCH", f"/api/actors/{actor_id}/image-settings", {"zoom": 2}, ("actors",)),
+        "create_genre": ("POST", "/api/genres", {"name": "Cache test", "type": "movie"}, ("genres",)),
+        "delete_genre": ("DELETE", f"/api/genres/{genre_id}", None, TAGS),
+        "update_favorites": ("PATCH", "/api/favorites", {"movies": [{"id": movie_id, "is_favorite": not movie["is_favorite"]}]}, ("movies",)),
+    }
+    return routes[route]
+
+
+# Lectures mises en cache et leurs tags : une mutation ne vide que celles de ses tags
+TAGGED_READS = {"/api/movies/recent": {"movies"}, "/api/favorites": {"movies", "actors"}, "/api/genres": {"genres"}}
+
+
+@pytest.mark.parametrize("route", [
+    "create_movie", "update_movie", "delete_movie", "toggle_movie_favorite", "movie_image_settings",
+    "create_actor", "update_actor", "delete_actor", "toggle_actor_favorite", "actor_image_settings",
+    "create_genre", "delete_genre", "update_favorites",
+])
+async def test_mutation_invalidates_its_tags(client, auth_headers, route):
+    method, path, body, tags = await mutation(client, route)
+    backend = server.cache.backend
+    for read in TAGGED_READS:
+        (await client.get(read)).raise_for_status()
+    before = await backend.versions(TAGS)
+    size = backend.info()["size"]
+
+    response = await client.request(method, path, json=body, headers=auth_headers)
+    assert response.status_code == 200, response.text
+
+    after = await backend.versions(TAGS)
+    assert {tag for tag, old, new in zip(TAGS, before, after) if new > old} == set(tags)
+    # Les entrées des tags concernés sont supprimées, les autres restent servies depuis le cache
+    assert backend.info()["size"] < size
+    for read, read_tags in TAGGED_READS.items():
+        if read_tags & set(tags):
+            continue
+        hits = backend.stats["hits"]
+        await client.get(read)
+        assert backend.stats["hits"] == hits + 1, read
+
+
+async def test_etag_revalidation_and_invalidation(client, auth_headers):
+    response = await client.get("/api/genres")
+    etag = response.headers["etag"]
+    assert etag.startswith('W/"')
+    assert response.headers["cache-control"] == server.cache.cache_control
+
+    not_modified = await client.get("/api/genres", headers={"If-None-Match": etag})
+    assert not_modified.status_code == 304
+    assert not_modified.content == b""
+    assert not_modified.headers["etag"] == etag
+    # Comparaison faible, liste d'ETags et joker
+    assert (await client.get("/api/genres", headers={"If-None-Match": f'"other", {etag.removeprefix("W/")}'})).status_code == 304
+    assert (await client.get("/api/genres", headers={"If-None-Match": "*"})).status_code == 304
+    # ETag propre à la requête
+    assert (await client.get("/api/genres?type=movie", headers={"If-None-Match": etag})).status_code == 200
+
+    created = await client.post("/api/genres", json={"name": "Noir", "type": "movie"}, headers=auth_headers)
+    created.raise_for_status()
+    refreshed = await client.get("/api/genres", headers={"If-None-Match": etag})
+    assert refreshed.status_code == 200
+    assert refreshed.headers["etag"] != etag
+    assert "Noir" in {genre["name"] for genre in refreshed.json()}
+
+
+async def test_redis_backend_roundtrip():
+    redis = fakeredis.FakeAsyncRedis()
+    backend = RedisCache(redis, ttl=30)
+    assert await backend.versions(["movies", "actors"]) == [0, 0]
+
+    await backend.set("recent", b"[1]", ("movies",))
+    await backend.set("genres", b"[2]", ("genres",), ttl=5)
+    assert await backend.get("recent") == b"[1]"
+    assert 0 < await redis.ttl("moviehub:cache:genres") <= 5
+    assert await backend.get("missing") is MISS
+
+    await backend.bump("movies")
+    await backend.invalidate("movies")
+    assert await backend.versions(["movies", "genres"]) == [1, 0]
+    assert await backend.get("recent") is MISS
+    assert await backend.get("genres") == b"[2]"
+    assert backend.stats["invalidations"] == 1
+
+    # clear() garde les versions : un ancien ETag ne redevient jamais valide
+    await backend.clear()
+    assert await backend.get("genres") is MISS
+    assert await backend.versions(["movies"]) == [1]
+
+
+async def test_app_with_redis_backend(client, auth_headers, monkeypatch):
+    monkeypatch.setattr(server.cache, "backend", RedisCache(fakeredis.FakeAsyncRedis()))
+    first = await client.get("/api/genres")
+    assert (await client.get("/api/genres", headers={"If-None-Match": first.headers["etag"]})).status_code == 304
+    await client.get("/api/genres")
+    assert server.cache.backend.stats["hits"] == 1
+
+    (await client.post("/api/genres", json={"name": "Noir", "type": "movie"}, headers=auth_headers)).raise_for_status()
+    refreshed = await client.get("/api/genres")
+    assert refreshed.headers["etag"] != first.headers["etag"]
+    assert "Noir" in {genre["name"] for genre in refreshed.json()}
@@ -0,0 +1,158 @@
+import orjson
+import pytest
+
+import server
+
+pytestmark = pytest.mark.anyio
+
+
+def ndjson(*records) -> bytes:
+    return b"".join(orjson.dumps(record) + b"\n" for record in records)
+
+
+async def export(client, auth_headers, **params) -> list:
+    response = await client.get("/api/export", params=params, headers=auth_headers)
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+    return [orjson.loads(line) for line in response.content.splitlines()]
+
+
+async def import_lines(client, auth_headers, content: bytes, **params):
+    return await client.post("/api/import", content=content, params=params, headers=auth_headers)
+
+
+async def catalog(database) -> dict:
+    return {
+        collection: sorted(
+            [doc async for doc in database[collection].find({}, {"_id": 0})],
+            key=lambda doc: doc["id"]
+        )
+        for collection in server.CATALOG_MODELS
+    }
+
+
+async def test_export_import_round_trip(client, database, auth_headers):
+    before = await catalog(database)
+    records = await export(client, auth_headers)
+
+    # Genres et acteurs avant les films ; jamais les utilisateurs ni les champs internes
+    collections = [record["collection"] for record in records]
+    assert collections == sorted(collections, key=list(server.CATALOG_MODELS).index)
+    assert {record["collection"] for record in records} == set(server.CATALOG_MODELS)
+    assert not any("search_keys" in record["document"] or "password_hash" in record["document"] for record in records)
+    assert len(records) == sum(map(len, before.values()))
+    assert [record["collection"] for record in await export(client, auth_headers, collections="genres")] == ["genres"] * len(before["genres"])
+
+    for collection in server.CATALOG_MODELS:
+        await database[collection].delete_many({})
+    response = await import_lines(client, auth_headers, ndjson(*records), batch_size=2)
+    assert response.status_code == 200
+    report = response.json()
+    assert report["imported"] == {collection: len(docs) for collection, docs in before.items()}
+    assert (report["lines"], report["error_count"], report["errors"]) == (len(records), 0, [])
+
+    # Même catalogue, au format de stockage (dates natives, défauts omis, clés de recherche) ;
+    # les films d'exemple ne sont liés que côté film, l'import complète le côté acteur
+    for actor in before["actors"]:
+        actor["movies"] = sorted(movie["id"] for movie in before["movies"] if actor["id"] in movie["actors"])
+        actor["movie_count"] = len(actor["movies"])
+    assert any(actor["movies"] for actor in before["actors"])
+    assert await catalog(database) == before
+    assert await database.users.count_documents({}) == 1
+
+
+async def test_unknown_export_collection(client, auth_headers):
+    response = await client.get("/api/export", params={"collections": "movies,users"}, headers=auth_headers)
+    assert (response.status_code, response.json()["detail"]) == (400, "Unknown collections: users")
+
+
+async def test_malformed_lines_are_reported_with_their_number(client, database, auth_headers):
+    content = b"\n".join([
+        orjson.dumps({"collection": "genres", "document": {"id": "g1", "name": "Noir", "type": "movie"}}),
+        b"{not json",
+        b"",
+        orjson.dumps({"collection": "users", "document": {"username": "mallory"}}),
+        orjson.dumps({"collection": "movies", "document": {"id": "m1"}}),
+        orjson.dumps({"collection": "movies"}),
+        orjson.dumps({"collection": "movies", "document": {"id": "m2", "title": "Kept", "genres": ["g1"]}}),
+    ])
+    report = (await import_lines(client, auth_headers, content)).json()
+
+    # Les lignes vides ne sont pas comptées
+    assert report["lines"] == 6
+    assert report["imported"] == {"genres": 1, "actors": 0, "movies": 1}
+    assert report["error_count"] == 4
+    assert [error["line"] for error in report["errors"]] == [2, 3, 4, 5]
+    assert report["errors"][1]["error"] == "Unknown collection: users"
+    assert await database.users.find_one({"username": "mallory"}) is None
+    genre = await database.genres.find_one({"id": "g1"})
+    assert genre["movie_count"] == 1
+
+
+async def test_oversized_line_is_rejected(client, database, auth_headers):
+    genres = await database.genres.count_documents({})
+    name = "x" * server.MAX_IMPORT_LINE
+    for content in (
+        # Ligne complète dans un même morceau, puis ligne finale sans retour
+        ndjson({"collection": "genres", "document": {"name": name, "type": "movie"}}),
+        orjson.dumps({"collection": "genres", "document": {"name": name, "type": "movie"}}),
+    ):
+        response = await import_lines(client, auth_headers, content)
+        assert (response.status_code, response.json()["detail"]) == (400, f"Import line longer than {server.MAX_IMPORT_LINE} bytes")
+    assert await database.genres.count_documents({}) == genres
+
+    # Juste sous la limite : accepté
+    line = orjson.dumps({"collection": "genres", "document": {"name": "", "type": "movie"}})
+    fitting = {"name": "x" * (server.MAX_IMPORT_LINE - len(line)), "type": "movie"}
+    response = await import_lines(client, auth_headers, ndjson({"collection": "genres", "document": fitting}))
+    assert response.json()["imported"]["genres"] == 1
+
+
+async def test_insert_reports_duplicates_and_upsert_replaces(client, database, auth_headers):
+    await server.ensure_indexes(database)
+    content = ndjson(
+        {"collection": "actors", "document": {"id": "a1", "name": "First"}},
+        {"collection": "actors", "document": {"id": "a2", "name": "Second"}},
+    )
+    assert (await import_lines(client, auth_headers, content)).json()["imported"]["actors"] == 2
+
+    # Insertion : doublons signalés par id, sans numéro de ligne
+    report = (await import_lines(client, auth_headers, content)).json()
+    assert report["imported"]["actors"] == 0
+    assert report["error_count"] == 2
+    assert {error["line"] for error in report["errors"]} == {None}
+    assert report["errors"][0]["error"].startswith("actors a1: ")
+
+    renamed = ndjson({"collection": "actors", "document": {"id": "a1", "name": "Renamed"}})
+    report = (await import_lines(client, auth_headers, renamed, upsert="true")).json()
+    assert (report["imported"]["actors"], report["error_count"]) == (1, 0)
+    assert (await database.actors.find_one({"id": "a1"}))["name"] == "Renamed"
+    assert await database.actors.count_documents({"id": {"$in": ["a1", "a2"]}}) == 2
+    # Le cache des listes est invalidé
+    listed = (await client.get("/api/actors", params={"limit": 100})).json()["items"]
+    assert "Renamed" in {actor["name"] for actor in listed}
+
+
+async def test_import_links_both_sides(client, database, auth_headers):
+    content = ndjson(
+        {"collection": "actors", "document": {"id": "a1", "name": "Lead", "movies": ["m2"]}},
+        {"collection": "actors", "document": {"id": "a2", "name": "Support"}},
+        {"collection": "movies", "document": {"id": "m1", "title": "One", "actors": ["a1", "a2", "missing"]}},
+        {"collection": "movies", "document": {"id": "m2", "title": "Two"}},
+    )
+    # Lots d'une ligne : le passage de liens est lui aussi découpé
+    assert (await import_lines(client, auth_headers, content, batch_size=1)).json()["error_count"] == 0
+
+    actors = {doc["id"]: doc async for doc in database.actors.find({"id": {"$in": ["a1", "a2", "missing"]}})}
+    movies = {doc["id"]: doc async for doc in database.movies.find({"id": {"$in": ["m1", "m2"]}})}
+    assert set(actors) == {"a1", "a2"}
+    assert sorted(actors["a1"]["movies"]) == ["m1", "m2"]
+    assert actors["a2"]["movies"] == ["m1"]
+    assert movies["m2"]["actors"] == ["a1"]
+    # Compteurs recalculés après le passage de liens
+    assert (actors["a1"]["movie_count"], actors["a2"]["movie_count"]) == (2, 1)
+    assert (movies["m1"]["actor_count"], movies["m2"]["actor_count"]) == (3, 1)
+
+    # Réimport : les liens ne sont pas dupliqués
+    await import_lines(client, auth_headers, content, upsert="true")
+    assert sorted((await database.actors.find_one({"id": "a1"}))["movies"]) == ["m1", "m2"]
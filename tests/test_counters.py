@@ -0,0 +1,116 @@
+import asyncio
+
+import pytest
+
+import server
+
+pytestmark = pytest.mark.anyio
+
+
+async def expected_counters(database) -> tuple:
+    movies = await database.movies.find({}).to_list(None)
+    actors = await database.actors.find({}).to_list(None)
+    genres = await database.genres.find({}).to_list(None)
+    stats = {
+        "movie_count": len(movies),
+        "actor_count": len(actors),
+        "genre_count": len(genres),
+        "total_runtime": sum(movie.get("duration") or 0 for movie in movies),
+    }
+    per_genre = {
+        genre["id"]: {
+            "movie_count": sum(genre["id"] in movie.get("genres", []) for movie in movies),
+            "actor_count": sum(genre["id"] in actor.get("genres", []) for actor in actors),
+            "total_runtime": sum(movie.get("duration") or 0 for movie in movies if genre["id"] in movie.get("genres", [])),
+        }
+        for genre in genres
+    }
+    return stats, per_genre
+
+
+async def test_concurrent_writes_keep_counters_consistent(client, database, auth_headers):
+    genres = [genre["id"] for genre in (await client.get("/api/genres", params={"type": "movie"})).json()][:2]
+    actors = [actor["id"] for actor in (await client.get("/api/actors", params={"limit": 3})).json()["items"]]
+
+    # Les mêmes compteurs (genre, acteurs, catalogue) sont modifiés par toutes les requêtes
+    created = await asyncio.gather(*[
+        client.post("/api/movies", json={"title": f"Concurrent {i}", "actors": actors, "genres": genres[:1], "duration": 90 + i}, headers=auth_headers)
+        for i in range(12)
+    ])
+    assert [response.status_code for response in created] == [200] * 12
+    ids = [response.json()["id"] for response in created]
+
+    updated = await asyncio.gather(*[
+        client.put(f"/api/movies/{movie_id}", json={"title": "Updated", "actors": actors[:1], "genres": genres, "duration": 120}, headers=auth_headers)
+        for movie_id in ids[:6]
+    ])
+    deleted = await asyncio.gather(*[client.delete(f"/api/movies/{movie_id}", headers=auth_headers) for movie_id in ids[6:9]])
+    assert [response.status_code for response in updated + deleted] == [200] * 9
+
+    stats, per_genre = await expected_counters(database)
+    served = (await client.get("/api/stats")).json()
+    assert {field: served[field] for field in stats} == stats
+    for genre in served["genres"]:
+        assert {field: genre[field] for field in per_genre[genre["id"]]} == per_genre[genre["id"]], genre["name"]
+    for actor_id in actors:
+        actor = await database.actors.find_one({"id": actor_id})
+        assert actor.get("movie_count", 0) == len(actor.get("movies", []))
+
+
+async def test_failed_write_is_not_published(client, auth_headers):
+    stats = (await client.get("/api/stats")).json()
+    published = server.events.info()["published"]
+    response = await client.put("/api/movies/unknown", json={"title": "Missing"}, headers=auth_headers)
+    assert response.status_code == 404
+    assert server.events.info()["published"] == published
+    assert (await client.get("/api/stats")).json() == stats
+
+
+class FakeSession:
+    def __init__(self, attempts: int):
+        self.attempts = attempts
+        self.calls = 0
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def with_transaction(self, callback):
+        # Comme pymongo : le callback est rejoué tant que l'erreur est transitoire
+        while True:
+            self.calls += 1
+            try:
+                return await callback(self)
+            except RuntimeError:
+                if self.calls >= self.attempts:
+                    raise
+
+
+class FakeClient:
+    def __init__(self, session: FakeSession):
+        self.session = session
+
+    async def start_session(self):
+        return self.session
+
+
+async def test_run_in_transaction_uses_the_retrying_helper(monkeypatch):
+    session = FakeSession(attempts=3)
+    monkeypatch.setattr(server, "client", FakeClient(session))
+    monkeypatch.setattr(server, "_transactions_supported", True)
+    monkeypatch.setattr(server, "USE_TRANSACTIONS", True)
+    seen = []
+
+    async def apply(current):
+        seen.append(current)
+        if len(seen) < 3:
+            raise RuntimeError("WriteConflict")
+        return "committed"
+
+    assert await server.run_in_transaction(apply) == "committed"
+    assert seen == [session] * 3
+
+    monkeypatch.setattr(server, "_transactions_supported", False)
+    assert await server.run_in_transaction(lambda current: asyncio.sleep(0, result=current)) is None
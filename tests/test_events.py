@@ -0,0 +1,104 @@
+import asyncio
+
+import fakeredis
+import pytest
+from redis.exceptions import ConnectionError
+
+import server
+from events import EventBus, RedisEventRelay
+
+pytestmark = pytest.mark.anyio
+
+
+async def next_event(subscription) -> dict:
+    return await asyncio.wait_for(subscription.get(), 1)
+
+
+@pytest.fixture
+async def workers():
+    # Deux processus simulés partageant un serveur Redis
+    redis_server = fakeredis.FakeServer()
+    buses = [EventBus(relay=RedisEventRelay(fakeredis.FakeAsyncRedis(server=redis_server))) for _ in range(2)]
+    tasks = [asyncio.ensure_future(bus.relay.run(bus)) for bus in buses]
+    for bus in buses:
+        await asyncio.wait_for(bus.relay.connected.wait(), 1)
+    yield buses
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+
+async def test_relay_delivers_local_writes_to_every_worker(workers):
+    first, second = workers
+    subscriptions = [bus.subscribe(["movies"]) for bus in workers]
+
+    first.publish_local("movies", "update", ["m1"], ["title", "search_keys"])
+    first.resync_local("movies")
+    for subscription in subscriptions:
+        change = await next_event(subscription)
+        assert {key: change[key] for key in ("type", "collection", "id", "op", "fields")} == {
+            "type": "change", "collection": "movies", "id": "m1", "op": "update", "fields": ["title"]
+        }
+        assert (await next_event(subscription))["type"] == "resync"
+        # Une seule livraison, y compris dans le worker émetteur
+        assert subscription.queue.empty()
+
+    assert first.info()["relay"]["sent"] == 2
+    assert first.info()["published"] == second.info()["published"] == 2
+    assert second.info()["relay"]["received"] == 2
+
+
+async def test_relay_preserves_write_order(workers):
+    first, second = workers
+    subscription = second.subscribe()
+    for index in range(20):
+        first.publish_local("movies", "update", [f"m{index}"], ["title"])
+    assert [(await next_event(subscription))["id"] for _ in range(20)] == [f"m{index}" for index in range(20)]
+
+
+async def test_change_streams_bypass_the_relay(workers):
+    first, second = workers
+    subscription = second.subscribe()
+    first.source = "change_stream"
+    first.publish_local("movies", "delete", ["m1"])
+    first.source = "memory"
+    first.publish_local("actors", "insert", ["a1"])
+    assert (await next_event(subscription))["collection"] == "actors"
+
+
+class FlakyRedis(fakeredis.FakeAsyncRedis):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.failures = 1
+
+    async def publish(self, channel, message):
+        if self.failures:
+            self.failures -= 1
+            raise ConnectionError("connection reset")
+        return await super().publish(channel, message)
+
+
+async def test_relay_reconnects_and_asks_for_a_resync():
+    bus = EventBus(relay=RedisEventRelay(FlakyRedis(), retry_delay=0))
+    subscription = bus.subscribe()
+    task = asyncio.ensure_future(bus.relay.run(bus))
+    try:
+        bus.publish_local("movies", "insert", ["lost"])
+        # L'événement perdu est remplacé par un rechargement complet
+        assert (await next_event(subscription))["type"] == "resync"
+        bus.publish_local("movies", "insert", ["m2"])
+        assert (await next_event(subscription))["id"] == "m2"
+        assert bus.relay.stats["errors"] == 1
+    finally:
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+
+
+async def test_api_writes_reach_other_workers(client, auth_headers, monkeypatch, workers):
+    first, second = workers
+    monkeypatch.setattr(server, "events", first)
+    subscription = second.subscribe(["genres"])
+    created = await client.post("/api/genres", json={"name": "Noir", "type": "movie"}, headers=auth_headers)
+    created.raise_for_status()
+    event = await next_event(subscription)
+    assert (event["collection"], event["op"], event["id"]) == ("genres", "insert", created.json()["id"])
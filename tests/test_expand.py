@@ -0,0 +1,90 @@
+import pytest
+
+import server
+
+pytestmark = pytest.mark.anyio
+
+
+class CountingDatabase:
+    # Enregistre les find() de chaque collection avant de les déléguer
+    def __init__(self, database):
+        self.database = database
+        self.finds = []
+
+    def __getitem__(self, name):
+        collection = self.database[name]
+        finds = self.finds
+
+        class Collection:
+            def __getattr__(self, attribute):
+                return getattr(collection, attribute)
+
+            def find(self, *args, **kwargs):
+                finds.append((name, args[0] if args else kwargs.get("filter")))
+                return collection.find(*args, **kwargs)
+
+        return Collection()
+
+    def __getattr__(self, name):
+        return getattr(self.database, name)
+
+
+async def create(client, auth_headers, path: str, **body) -> dict:
+    response = await client.post(f"/api/{path}", json=body, headers=auth_headers)
+    response.raise_for_status()
+    return response.json()
+
+
+async def test_expand_embeds_summaries(client, database, auth_headers):
+    actor = await create(client, auth_headers, "actors", name="Jodie Foster", image="https://img.test/jodie.png")
+    genre = await create(client, auth_headers, "genres", name="Thriller", type="movie")
+    movie = await create(client, auth_headers, "movies", title="Contact", duration=150, actors=[actor["id"]], genres=[genre["id"]])
+
+    expanded = (await client.get(f"/api/movies/{movie['id']}", params={"expand": "actors,genres"})).json()
+    assert expanded["actors"] == [{"id": actor["id"], "name": "Jodie Foster", "image": "https://img.test/jodie.png"}]
+    assert expanded["genres"] == [{"id": genre["id"], "name": "Thriller"}]
+
+    listed = (await client.get("/api/actors", params={"expand": "movies", "limit": 100})).json()["items"]
+    filmography = next(item for item in listed if item["id"] == actor["id"])["movies"]
+    # Valeur par défaut restituée pour un champ absent du stockage
+    assert filmography == [{"id": movie["id"], "title": "Contact", "image": None, "duration": 150}]
+    # Sans expand, les ids restent tels quels
+    assert (await client.get(f"/api/movies/{movie['id']}")).json()["actors"] == [actor["id"]]
+
+
+async def test_expand_batches_one_query_per_collection(client, database, sample_data, monkeypatch):
+    movies = (await client.get("/api/movies", params={"limit": 100})).json()["items"]
+    # expand_references remplace les listes sur place
+    references = [(movie["actors"], movie["genres"]) for movie in movies]
+    assert all(actors and genres for actors, genres in references)
+    counting = CountingDatabase(server.read_db)
+    monkeypatch.setattr(server, "read_db", counting)
+
+    expanded = await server.expand_references(movies, ["actors", "genres"])
+    assert sorted(name for name, _ in counting.finds) == ["actors", "genres"]
+    queried = dict(counting.finds)
+    # Un seul $in par collection, avec l'union des références de tous les films
+    assert set(queried["actors"]["id"]["$in"]) == {ref for actors, _ in references for ref in actors}
+    assert set(queried["genres"]["id"]["$in"]) == {ref for _, genres in references for ref in genres}
+    assert [[actor["id"] for actor in movie["actors"]] for movie in expanded] == [actors for actors, _ in references]
+
+    # Aucune référence : aucune requête
+    counting.finds.clear()
+    await server.expand_references([{"id": "m", "actors": [], "genres": []}], ["actors", "genres"])
+    assert counting.finds == []
+
+
+async def test_expand_drops_unknown_ids(client, database, auth_headers):
+    actor = await create(client, auth_headers, "actors", name="Known")
+    movie = await create(client, auth_headers, "movies", title="Partial", actors=[actor["id"]])
+    await database.movies.update_one({"id": movie["id"]}, {"$push": {"actors": "ghost"}})
+    await server.cache.invalidate("movies")
+
+    expanded = (await client.get(f"/api/movies/{movie['id']}", params={"expand": "actors"})).json()
+    assert [summary["id"] for summary in expanded["actors"]] == [actor["id"]]
+
+
+async def test_expand_rejects_unknown_fields(client, sample_data):
+    response = await client.get("/api/movies", params={"expand": "actors,directors"})
+    assert (response.status_code, response.json()["detail"]) == (400, "Cannot expand: directors")
+    assert (await client.get("/api/actors", params={"expand": "actors"})).status_code == 400
@@ -0,0 +1,118 @@
+import asyncio
+import os
+
+import pytest
+
+import server
+
+pytestmark = pytest.mark.anyio
+
+# mongomock n'évalue pas $$REMOVE dans les mises à jour par pipeline
+requires_mongo = pytest.mark.skipif(
+    not os.environ.get("TEST_MONGO_URL"), reason="pipeline updates need a real MongoDB (TEST_MONGO_URL)"
+)
+
+
+async def reset_favorites(database) -> tuple:
+    await database.movies.update_many({}, {"$unset": {"is_favorite": ""}})
+    await database.actors.update_many({}, {"$unset": {"is_favorite": ""}})
+    movies = sorted([doc["id"] async for doc in database.movies.find({}, {"id": 1})])
+    actors = sorted([doc["id"] async for doc in database.actors.find({}, {"id": 1})])
+    return movies, actors
+
+
+async def favorite_ids(client) -> dict:
+    response = await client.get("/api/favorites")
+    response.raise_for_status()
+    return {name: {item["id"] for item in items} for name, items in response.json().items()}
+
+
+@requires_mongo
+@pytest.mark.parametrize("toggles", [10, 11])
+async def test_concurrent_toggles_keep_parity(client, database, sample_data, toggles):
+    movies, actors = await reset_favorites(database)
+    stats = (await client.get("/api/stats")).json()
+
+    responses = await asyncio.gather(*[client.patch(f"/api/movies/{movies[0]}/favorite") for _ in range(toggles)])
+    states = [response.json()["is_favorite"] for response in responses]
+    # Chaque inversion voit un état distinct : aucune n'est perdue
+    assert states.count(True) == (toggles + 1) // 2
+    assert states.count(False) == toggles // 2
+
+    stored = await database.movies.find_one({"id": movies[0]})
+    assert stored.get("is_favorite", False) is (toggles % 2 == 1)
+    # « non favori » est stocké comme un champ absent
+    assert "is_favorite" in stored or toggles % 2 == 0
+    assert (await client.get(f"/api/movies/{movies[0]}")).json()["is_favorite"] is (toggles % 2 == 1)
+    assert (await favorite_ids(client))["movies"] == ({movies[0]} if toggles % 2 else set())
+    assert (await client.get("/api/stats")).json() == stats
+
+
+@requires_mongo
+async def test_toggles_and_bulk_updates_interleave(client, database, sample_data):
+    movies, actors = await reset_favorites(database)
+    requests = [client.patch(f"/api/actors/{actors[0]}/favorite") for _ in range(4)]
+    requests += [client.patch("/api/favorites", json={"actors": [{"id": actors[1], "is_favorite": True}]}) for _ in range(4)]
+    await asyncio.gather(*requests)
+    assert (await favorite_ids(client))["actors"] == {actors[1]}
+    assert "is_favorite" not in await database.actors.find_one({"id": actors[0]})
+
+
+async def test_concurrent_bulk_updates(client, database, sample_data):
+    movies, actors = await reset_favorites(database)
+    await database.movies.update_one({"id": movies[2]}, {"$set": {"is_favorite": True}})
+    stats = (await client.get("/api/stats")).json()
+
+    body = {
+        "movies": [{"id": movies[0], "is_favorite": True}, {"id": movies[1], "is_favorite": True}, {"id": movies[2], "is_favorite": False}],
+        "actors": [{"id": actors[0], "is_favorite": True}],
+    }
+    responses = await asyncio.gather(*[client.patch("/api/favorites", json=body) for _ in range(8)])
+    results = [response.json() for response in responses]
+
+    # Requêtes idempotentes : chaque document n'est modifié qu'une fois, quel que soit l'ordre
+    assert all(result["movies"]["matched"] == 3 and result["actors"]["matched"] == 1 for result in results)
+    assert sum(result["movies"]["modified"] for result in results) == 3
+    assert sum(result["actors"]["modified"] for result in results) == 1
+
+    assert await favorite_ids(client) == {"movies": {movies[0], movies[1]}, "actors": {actors[0]}}
+    assert "is_favorite" not in await database.movies.find_one({"id": movies[2]})
+    listed = (await client.get("/api/movies", params={"favorite": "true", "limit": 100})).json()["items"]
+    assert {movie["id"] for movie in listed} == {movies[0], movies[1]}
+    assert (await client.get("/api/stats")).json() == stats
+
+
+async def test_bulk_update_last_state_wins_and_unknown_ids(client, database, sample_data):
+    movies, _ = await reset_favorites(database)
+    body = {"movies": [
+        {"id": movies[0], "is_favorite": True},
+        {"id": movies[0], "is_favorite": False},
+        {"id": "unknown", "is_favorite": True},
+    ]}
+    result = (await client.patch("/api/favorites", json=body)).json()
+    assert result["movies"] == {"matched": 1, "modified": 0}
+    assert result["actors"] == {"matched": 0, "modified": 0}
+    assert await favorite_ids(client) == {"movies": set(), "actors": set()}
+
+
+@pytest.mark.parametrize("kind", ["movies", "actors"])
+async def test_single_toggle_marks_a_favorite(client, database, sample_data, kind):
+    # Le retour à « non favori » ($$REMOVE) est couvert par les tests TEST_MONGO_URL ci-dessus
+    movies, actors = await reset_favorites(database)
+    item_id = (movies if kind == "movies" else actors)[0]
+    subscription = server.events.subscribe([kind])
+    assert (await client.get(f"/api/{kind}/{item_id}")).json()["is_favorite"] is False
+
+    response = await client.patch(f"/api/{kind}/{item_id}/favorite")
+    assert (response.status_code, response.json()) == (200, {"is_favorite": True})
+    assert (await database[kind].find_one({"id": item_id}))["is_favorite"] is True
+    # Cache invalidé : la lecture suivante voit le nouvel état
+    assert (await client.get(f"/api/{kind}/{item_id}")).json()["is_favorite"] is True
+    assert (await favorite_ids(client))[kind] == {item_id}
+    event = await asyncio.wait_for(subscription.get(), 1)
+    assert (event["op"], event["id"], event["fields"]) == ("update", item_id, ["is_favorite"])
+
+
+async def test_toggle_unknown_item(client, sample_data):
+    assert (await client.patch("/api/movies/unknown/favorite")).status_code == 404
+    assert (await client.patch("/api/actors/unknown/favorite")).status_code == 404
@@ -0,0 +1,139 @@
+import mongomock_motor
+import pytest
+from pymongo import _csot
+from pymongo.errors import ExecutionTimeout, OperationFailure, ServerSelectionTimeoutError
+from starlette.testclient import TestClient
+
+import server
+from cache import MemoryCache
+from events import EventBus
+from images import DiskLRUCache, ImageProxy
+
+
+class SwitchableClient:
+    # Client mongomock dont le ping échoue sur demande, comme un serveur injoignable
+    def __init__(self, client):
+        self.client = client
+        self.down = False
+        self.closed = False
+
+    def __getattr__(self, name):
+        return getattr(self.client, name)
+
+    @property
+    def admin(self):
+        return self
+
+    async def command(self, *args, **kwargs):
+        if self.down:
+            raise ServerSelectionTimeoutError("mongo:27017: [Errno 111] Connection refused")
+        return {"ok": 1.0}
+
+    def close(self):
+        self.closed = True
+
+
+@pytest.fixture
+def mongo(monkeypatch, tmp_path):
+    # TestClient fait tourner le lifespan dans sa propre boucle : fixture synchrone
+    mongo_client = SwitchableClient(mongomock_motor.AsyncMongoMockClient(tz_aware=True))
+    monkeypatch.setattr(server, "client", mongo_client)
+    monkeypatch.setattr(server, "_transactions_supported", False)
+    monkeypatch.setattr(server.cache, "backend", MemoryCache())
+    monkeypatch.setattr(server, "events", EventBus())
+    monkeypatch.setattr(server, "image_proxy", ImageProxy(DiskLRUCache(tmp_path, 1024 * 1024)))
+    monkeypatch.setattr(server.rate_limiter, "enabled", False)
+    for name in ("_started", "_events_task", "_relay_task", "_related_task"):
+        monkeypatch.setattr(server, name, getattr(server, name))
+    monkeypatch.setattr(server, "db", server.db)
+    monkeypatch.setattr(server, "read_db", server.read_db)
+    server.use_database(mongo_client.client["moviehub_test_health"])
+    return mongo_client
+
+
+def readiness(http_client) -> tuple:
+    response = http_client.get("/api/health/ready")
+    return response.status_code, response.json()
+
+
+def test_lifespan_starts_and_stops_background_tasks(mongo):
+    with TestClient(server.app) as http_client:
+        assert server._started
+        tasks = [server._events_task, server._related_task]
+        # Sans change streams (standalone, mongomock) le suivi s'arrête aussitôt et les handlers publient
+        assert server._events_task is not None and server.events.source == "memory"
+        assert not server._related_task.done()
+        # Pas de relais Redis configuré
+        assert server._relay_task is None
+        # Index créés au démarrage
+        assert "id_unique" in http_client.portal.call(mongo.client["moviehub_test_health"].movies.index_information)
+        status_code, body = readiness(http_client)
+        assert (status_code, body["status"], body["error"]) == (200, "ready", None)
+
+    assert not server._started
+    assert all(task.cancelled() or task.done() for task in tasks)
+    assert mongo.closed
+
+
+def test_readiness_follows_mongo(mongo):
+    # Hors lifespan : pas encore prêt même si Mongo répond
+    status_code, body = readiness(TestClient(server.app))
+    assert (status_code, body["status"]) == (503, "starting")
+
+    with TestClient(server.app) as http_client:
+        mongo.down = True
+        status_code, body = readiness(http_client)
+        assert (status_code, body["status"]) == (503, "unavailable")
+        assert "Connection refused" in body["error"]
+        assert set(body) == {"status", "error", "pool", "related_ready", "events"}
+
+        mongo.down = False
+        status_code, body = readiness(http_client)
+        assert (status_code, body["status"], body["error"]) == (200, "ready", None)
+
+
+class TimingOutCollection:
+    # Échoue comme pymongo quand le budget maxTimeMS de la requête est épuisé
+    def __init__(self, error):
+        self.error = error
+        self.budgets = []
+
+    def find(self, *args, **kwargs):
+        self.budgets.append(_csot.get_timeout())
+        raise self.error
+
+
+class Database:
+    def __init__(self, database, genres):
+        self.database = database
+        self.genres = genres
+
+    def __getattr__(self, name):
+        return getattr(self.database, name)
+
+
+@pytest.mark.parametrize("error, status_code", [
+    (ExecutionTimeout("operation exceeded time limit", 50), 504),
+    (ServerSelectionTimeoutError("No servers found yet"), 504),
+    # Les autres erreurs Mongo ne sont pas déguisées en délai
+    (OperationFailure("not authorized", 13), 500),
+])
+def test_mongo_timeouts_become_gateway_timeouts(mongo, monkeypatch, error, status_code):
+    genres = TimingOutCollection(error)
+    monkeypatch.setattr(server, "read_db", Database(server.read_db, genres))
+
+    with TestClient(server.app, raise_server_exceptions=False) as http_client:
+        response = http_client.get("/api/genres")
+        assert response.status_code == status_code
+        if status_code == 504:
+            assert response.json() == {"detail": "Database operation timed out"}
+        # Budget de lecture du middleware transmis aux opérations Mongo
+        assert genres.budgets == [server.MONGO_READ_TIMEOUT]
+
+
+def test_timeout_budget_per_route():
+    middleware = server.MongoTimeoutMiddleware(None, read_timeout=5, write_timeout=15, exempt=("/api/export", "/api/health/"))
+    assert middleware.budget({"path": "/api/movies", "method": "GET"}) == 5
+    assert middleware.budget({"path": "/api/movies", "method": "POST"}) == 15
+    assert middleware.budget({"path": "/api/export", "method": "GET"}) is None
+    assert middleware.budget({"path": "/api/health/ready", "method": "GET"}) is None
@@ -0,0 +1,33 @@
+import pytest
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_home_sections(client, sample_data):
+    response = await client.get("/api/home", params={"recent_limit": 2, "per_genre": 1, "genre_count": 2})
+    assert response.status_code == 200
+    home = response.json()
+    assert [movie["id"] for movie in home["recent"]][:1] == [home["featured"]["id"]]
+    assert len(home["recent"]) == 2
+    assert all(movie["is_favorite"] for movie in home["favorites"])
+    assert len(home["by_genre"]) == 2
+    assert all(len(group["movies"]) == 1 and group["genre"]["id"] in group["movies"][0]["genres"] for group in home["by_genre"])
+    counts = [group["genre"]["movie_count"] for group in home["by_genre"]]
+    assert counts == sorted(counts, reverse=True)
+    assert {genre["type"] for genre in home["genres"]} == {"movie"}
+    shown_actors = {actor_id for movie in home["recent"] + home["favorites"] for actor_id in movie["actors"]}
+    assert shown_actors <= {actor["id"] for actor in home["actors"]}
+
+
+async def test_home_empty_catalog_still_lists_genres(client, database):
+    await database.genres.insert_one({"id": "g1", "name": "Drame", "type": "movie"})
+    home = (await client.get("/api/home")).json()
+    assert home["featured"] is None
+    assert home["by_genre"] == []
+    assert [genre["id"] for genre in home["genres"]] == ["g1"]
+
+
+@pytest.mark.parametrize("param", ["recent_limit", "favorites_limit", "genre_count", "per_genre"])
+async def test_home_rejects_out_of_range_limits(client, param):
+    assert (await client.get("/api/home", params={param: 0})).status_code == 422
+    assert (await client.get("/api/home", params={param: 1000})).status_code == 422
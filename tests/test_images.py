@@ -0,0 +1,227 @@
+import asyncio
+import socket
+from io import BytesIO
+
+import httpx
+import pytest
+from PIL import Image
+
+import images
+import server
+from images import ASPECT_RATIOS, WIDTHS, DiskLRUCache, ImageError, ImageProxy, normalize_settings
+
+pytestmark = pytest.mark.anyio
+
+ORIGIN = "https://origin.test"
+HOSTS = {
+    "origin.test": ["93.184.215.14", "2606:2800:21f:cb07:6820:80da:af6b:8b2c"],
+    "intranet.test": ["10.0.0.5"],
+    # Une seule adresse interne suffit à refuser l'hôte
+    "rebind.test": ["93.184.215.14", "127.0.0.1"],
+}
+
+
+async def resolve(host: str) -> list:
+    if host not in HOSTS:
+        raise socket.gaierror(socket.EAI_NONAME, "Name or service not known")
+    return HOSTS[host]
+
+
+def png(width: int = 600, height: int = 900) -> bytes:
+    output = BytesIO()
+    Image.new("RGB", (width, height), (200, 30, 30)).save(output, "PNG")
+    return output.getvalue()
+
+
+class Origin:
+    def __init__(self):
+        self.requests = []
+        self.poster = png()
+
+    async def __call__(self, request: httpx.Request) -> httpx.Response:
+        self.requests.append(request.url.path)
+        # Laisse aux requêtes concurrentes le temps de se chevaucher
+        await asyncio.sleep(0.01)
+        path = request.url.path
+        if path == "/poster.png":
+            return httpx.Response(200, content=self.poster, headers={"content-type": "image/png"})
+        if path == "/page.html":
+            return httpx.Response(200, content=b"<html></html>", headers={"content-type": "text/html"})
+        if path == "/broken.png":
+            return httpx.Response(200, content=b"not an image", headers={"content-type": "image/png"})
+        if path == "/down.png":
+            raise httpx.ConnectError("connection refused", request=request)
+        if path == "/moved.png":
+            return httpx.Response(302, headers={"location": "/poster.png"})
+        if path == "/metadata.png":
+            return httpx.Response(302, headers={"location": "http://169.254.169.254/latest/meta-data/"})
+        if path == "/loop.png":
+            return httpx.Response(302, headers={"location": "/loop.png"})
+        return httpx.Response(404)
+
+
+@pytest.fixture
+def origin():
+    return Origin()
+
+
+@pytest.fixture
+async def proxy(origin, tmp_path):
+    image_proxy = ImageProxy(
+        DiskLRUCache(tmp_path, 10 * 1024 * 1024),
+        client=httpx.AsyncClient(transport=httpx.MockTransport(origin)),
+        resolver=resolve
+    )
+    yield image_proxy
+    await image_proxy.close()
+
+
+async def render(proxy, kind: str, width: int, image_format: str = "webp", url: str = f"{ORIGIN}/poster.png") -> bytes:
+    settings = normalize_settings(None)
+    key = proxy.variant_key(url, settings, width, image_format)
+    return await proxy.thumbnail(key, url, settings, width, round(width * ASPECT_RATIOS[kind]), image_format)
+
+
+@pytest.mark.parametrize("kind", sorted(ASPECT_RATIOS))
+@pytest.mark.parametrize("image_format", ["webp", "jpeg"])
+async def test_thumbnail_sizes(proxy, kind, image_format):
+    for width in WIDTHS:
+        with Image.open(BytesIO(await render(proxy, kind, width, image_format))) as thumbnail:
+            assert thumbnail.size == (width, round(width * ASPECT_RATIOS[kind]))
+            assert thumbnail.format == image_format.upper()
+
+
+async def test_concurrent_requests_fetch_the_origin_once(proxy, origin):
+    bodies = await asyncio.gather(*[render(proxy, "movies", 320) for _ in range(10)])
+    assert len(set(bodies)) == 1
+    assert origin.requests == ["/poster.png"]
+
+    # Autres variantes : la source est déjà sur disque
+    await asyncio.gather(*[render(proxy, "movies", width) for width in WIDTHS])
+    assert origin.requests == ["/poster.png"]
+    assert proxy._locks == {}
+
+
+async def test_cached_variant_survives_a_restart(proxy, origin, tmp_path):
+    first = await render(proxy, "actors", 160)
+    restarted = ImageProxy(DiskLRUCache(tmp_path, 10 * 1024 * 1024), client=proxy.client)
+    assert await render(restarted, "actors", 160) == first
+    assert origin.requests == ["/poster.png"]
+
+
+def test_disk_cache_evicts_least_recently_used(tmp_path):
+    cache = DiskLRUCache(tmp_path, max_bytes=250)
+    cache.put("aa01", b"a" * 100)
+    cache.put("bb02", b"b" * 100)
+    assert cache.get("aa01") == b"a" * 100
+    cache.put("cc03", b"c" * 100)
+
+    assert cache.get("bb02") is None
+    assert not (tmp_path / "bb" / "bb02").exists()
+    assert cache.get("aa01") == b"a" * 100
+    assert cache.info()["bytes"] == 200
+    assert cache.stats["evictions"] == 1
+
+    # Une entrée plus grande que la limite est gardée seule
+    cache.put("dd04", b"d" * 300)
+    assert cache.info()["entries"] == 1
+    assert cache.get("dd04") == b"d" * 300
+
+
+def test_disk_cache_rebuilds_its_index_from_disk(tmp_path):
+    cache = DiskLRUCache(tmp_path, max_bytes=1000)
+    cache.put("aa01", b"a" * 100)
+    cache.put("bb02", b"b" * 100)
+    reopened = DiskLRUCache(tmp_path, max_bytes=1000)
+    assert reopened.info()["entries"] == 2
+    assert reopened.get("bb02") == b"b" * 100
+
+
+@pytest.mark.parametrize("url, status_code, detail", [
+    ("ftp://origin.test/poster.png", 400, "Unsupported image URL"),
+    (f"{ORIGIN}/missing.png", 502, "Origin returned 404"),
+    (f"{ORIGIN}/page.html", 502, "Origin did not return an image"),
+    (f"{ORIGIN}/down.png", 502, "Origin fetch failed"),
+    (f"{ORIGIN}/broken.png", 502, "Origin image could not be decoded"),
+    (f"{ORIGIN}/loop.png", 502, "Origin redirected too many times"),
+    ("https://unknown.test/poster.png", 502, "Origin fetch failed"),
+])
+async def test_origin_errors(proxy, url, status_code, detail):
+    with pytest.raises(ImageError) as error:
+        await render(proxy, "movies", 320, url=url)
+    assert error.value.status_code == status_code
+    assert error.value.detail.startswith(detail)
+    # Aucune vignette n'est mise en cache après un échec
+    key = proxy.variant_key(url, normalize_settings(None), 320, "webp")
+    assert proxy.cache.get(key) is None
+
+
+@pytest.mark.parametrize("url", [
+    "http://127.0.0.1/poster.png",
+    "http://localhost.localdomain@10.1.2.3/poster.png",
+    "http://169.254.169.254/latest/meta-data/",
+    "http://[::1]:8001/poster.png",
+    "http://[::ffff:127.0.0.1]/poster.png",
+    "http://[fe80::1]/poster.png",
+    "http://0.0.0.0/poster.png",
+    "http://224.0.0.1/poster.png",
+    "http://100.64.0.1/poster.png",
+    "https://intranet.test/poster.png",
+    "https://rebind.test/poster.png",
+    f"{ORIGIN}/metadata.png",
+])
+async def test_internal_origins_are_refused(proxy, origin, url):
+    with pytest.raises(ImageError) as error:
+        await render(proxy, "movies", 320, url=url)
+    assert (error.value.status_code, error.value.detail) == (400, "Image URL does not resolve to a public address")
+    # Seule la redirection publique a été suivie jusqu'à l'origine
+    assert origin.requests == (["/metadata.png"] if url.endswith("/metadata.png") else [])
+
+
+async def test_redirects_to_public_origins_are_followed(proxy, origin):
+    assert await render(proxy, "movies", 160, url=f"{ORIGIN}/moved.png")
+    assert origin.requests == ["/moved.png", "/poster.png"]
+
+
+async def test_default_resolver_checks_every_address(monkeypatch):
+    async def getaddrinfo(host, port, **kwargs):
+        assert host == "cdn.test"
+        return [(socket.AF_INET, socket.SOCK_STREAM, 6, "", ("93.184.215.14", 0)), (socket.AF_INET, socket.SOCK_STREAM, 6, "", ("192.168.1.4", 0))]
+
+    monkeypatch.setattr(asyncio.get_running_loop(), "getaddrinfo", getaddrinfo)
+    assert await images.resolve_host("cdn.test") == ["93.184.215.14", "192.168.1.4"]
+    assert images.is_public_address("93.184.215.14")
+    assert not images.is_public_address("192.168.1.4")
+
+
+async def test_oversized_origin_image(proxy, monkeypatch):
+    monkeypatch.setattr(images, "MAX_SOURCE_BYTES", 1024)
+    with pytest.raises(ImageError) as error:
+        await render(proxy, "movies", 320)
+    assert (error.value.status_code, error.value.detail) == (502, "Origin image too large")
+
+
+async def test_image_endpoint(client, database, sample_data, proxy, monkeypatch):
+    monkeypatch.setattr(server, "image_proxy", proxy)
+    movie = await database.movies.find_one({})
+    await database.movies.update_one({"id": movie["id"]}, {"$set": {"image": f"{ORIGIN}/poster.png"}})
+
+    response = await client.get(f"/api/images/movies/{movie['id']}", params={"width": 160})
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "image/webp"
+    with Image.open(BytesIO(response.content)) as thumbnail:
+        assert thumbnail.size == (160, 90)
+
+    not_modified = await client.get(
+        f"/api/images/movies/{movie['id']}", params={"width": 160}, headers={"If-None-Match": response.headers["etag"]}
+    )
+    assert not_modified.status_code == 304
+
+    assert (await client.get(f"/api/images/movies/{movie['id']}", params={"width": 200})).status_code == 400
+    assert (await client.get(f"/api/images/movies/{movie['id']}", params={"format": "gif"})).status_code == 400
+    assert (await client.get("/api/images/movies/unknown")).status_code == 404
+
+    await database.movies.update_one({"id": movie["id"]}, {"$set": {"image": f"{ORIGIN}/missing.png"}})
+    failed = await client.get(f"/api/images/movies/{movie['id']}")
+    assert failed.status_code == 502
+    assert failed.json()["detail"] == "Origin returned 404"
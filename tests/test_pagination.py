@@ -0,0 +1,93 @@
+import base64
+import json
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+import server
+
+pytestmark = pytest.mark.anyio
+
+START = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+
+async def insert_movies(database, count: int, prefix: str = "m", created_at=None, offset: int = 0):
+    docs = [
+        server.CODECS["movies"].encode({
+            "id": f"{prefix}{index:03d}",
+            "title": f"Film {index}",
+            "actors": [],
+            "genres": [],
+            "created_at": created_at or START + timedelta(minutes=offset + index),
+        })
+        for index in range(count)
+    ]
+    await database.movies.insert_many(docs)
+    return [doc["id"] for doc in docs]
+
+
+async def collect_pages(client, limit: int, between_pages=None):
+    ids, cursor, pages = [], None, 0
+    while True:
+        params = {"limit": limit, **({"cursor": cursor} if cursor else {})}
+        response = await client.get("/api/movies", params=params)
+        assert response.status_code == 200
+        page = response.json()
+        ids += [movie["id"] for movie in page["items"]]
+        pages += 1
+        cursor = page["next_cursor"]
+        if cursor is None:
+            return ids, pages
+        if between_pages:
+            await between_pages(pages)
+
+
+async def test_pages_follow_created_at_then_id_descending(client, database):
+    await insert_movies(database, 7)
+    ids, pages = await collect_pages(client, limit=3)
+    assert ids == [f"m{index:03d}" for index in reversed(range(7))]
+    assert pages == 3
+
+
+async def test_last_full_page_has_no_next_cursor(client, database):
+    await insert_movies(database, 6)
+    first = (await client.get("/api/movies", params={"limit": 3})).json()
+    last = (await client.get("/api/movies", params={"limit": 3, "cursor": first["next_cursor"]})).json()
+    assert len(last["items"]) == 3
+    assert last["next_cursor"] is None
+
+
+async def test_equal_created_at_is_broken_by_id(client, database):
+    await insert_movies(database, 10, created_at=START)
+    ids, _ = await collect_pages(client, limit=4)
+    assert ids == sorted(ids, reverse=True)
+    assert len(ids) == len(set(ids)) == 10
+
+
+async def test_paging_is_stable_across_inserts(client, database):
+    original = await insert_movies(database, 9)
+
+    async def insert_newer(page: int):
+        # Plus récents que tout le catalogue : déjà « derrière » le curseur
+        await insert_movies(database, 2, prefix=f"new{page}-", offset=1000 + page * 10)
+
+    ids, _ = await collect_pages(client, limit=2, between_pages=insert_newer)
+    assert ids == sorted(original, reverse=True)
+
+
+@pytest.mark.parametrize("cursor", [
+    "not-base64!",
+    base64.urlsafe_b64encode(b"not json").decode(),
+    base64.urlsafe_b64encode(json.dumps(["2024-01-01T00:00:00"]).encode()).decode(),
+    base64.urlsafe_b64encode(json.dumps(["yesterday", "m001"]).encode()).decode(),
+    base64.urlsafe_b64encode(json.dumps([12, "m001"]).encode()).decode(),
+])
+async def test_malformed_cursor_is_rejected(client, database, cursor):
+    response = await client.get("/api/movies", params={"cursor": cursor})
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Invalid cursor"
+
+
+def test_cursor_round_trip():
+    doc = {"created_at": START + timedelta(milliseconds=5), "id": "m001"}
+    assert server.decode_cursor(server.encode_cursor(doc)) == (doc["created_at"], "m001")
@@ -0,0 +1,115 @@
+import fastapi.dependencies.utils as dependency_utils
+import fastapi.routing as routing
+import pytest
+
+import profiling
+import server
+from profiling import TimedRoute
+
+pytestmark = pytest.mark.anyio
+
+
+def server_timing(response) -> dict:
+    timings = {}
+    for part in response.headers["server-timing"].split(", "):
+        name, duration = part.split(";")[:2]
+        timings[name] = float(duration.removeprefix("dur="))
+    return timings
+
+
+async def test_server_timing_breaks_down_the_request(client, auth_headers):
+    movie = (await client.get("/api/movies", params={"limit": 1})).json()["items"][0]
+    response = await client.put(f"/api/movies/{movie['id']}", json={"title": "Renamed", "duration": 90}, headers=auth_headers)
+    response.raise_for_status()
+    timings = server_timing(response)
+    assert set(timings) == {"db", "validation", "serialization", "app", "total"}
+    # Corps MovieCreate, dépendance d'authentification et response_model Movie
+    assert timings["validation"] > 0
+    # Valeurs arrondies au centième de milliseconde
+    assert timings["validation"] + timings["serialization"] + timings["app"] <= timings["total"] + 0.02
+
+
+async def test_validation_is_recorded_per_route(client, sample_data):
+    (await client.get("/api/genres", params={"type": "movie"})).raise_for_status()
+    metrics = (await client.get("/api/metrics")).text
+    line = next(line for line in metrics.splitlines() if 'route="/api/genres",segment="validation"' in line)
+    assert float(line.rsplit(" ", 1)[1]) > 0
+
+
+def test_routes_keep_their_signature_without_patching_fastapi():
+    routes = [route for route in server.app.routes if getattr(route, "path", "").startswith("/api/")]
+    assert routes and all(isinstance(route, TimedRoute) for route in routes)
+    # Enveloppées une seule fois, même après include_router
+    assert all(not getattr(route.endpoint.__wrapped__, "__timed_endpoint__", False) for route in routes)
+
+    parameters = server.app.openapi()["paths"]["/api/movies"]["get"]["parameters"]
+    assert {"limit", "cursor", "genre"} <= {parameter["name"] for parameter in parameters}
+    for func in (dependency_utils.request_params_to_args, dependency_utils.request_body_to_args, routing.serialize_response):
+        assert func.__module__.startswith("fastapi.")
+        assert not hasattr(func, "__wrapped__")
+
+
+class StubProfiler:
+    # Remplace pyinstrument : le rapport dépend seulement de la requête profilée
+    instances = []
+
+    def __init__(self, interval: float, async_mode: str):
+        self.options = (interval, async_mode)
+        self.running = False
+        StubProfiler.instances.append(self)
+
+    def start(self):
+        self.running = True
+
+    def stop(self):
+        self.running = False
+
+    def output_text(self, unicode: bool, color: bool) -> str:
+        return "profile report"
+
+    def output_html(self) -> str:
+        return "<html>profile report</html>"
+
+
+@pytest.fixture
+def profiler(monkeypatch):
+    StubProfiler.instances = []
+    monkeypatch.setattr(profiling, "Profiler", StubProfiler)
+    return StubProfiler
+
+
+async def test_profile_header_returns_the_report(client, auth_headers, profiler):
+    headers = {**auth_headers, "X-Profile": "text"}
+    response = await client.get("/api/movies/unknown", headers=headers)
+    # Réponse de la route remplacée ; son statut reste visible
+    assert (response.status_code, response.text) == (200, "profile report")
+    assert response.headers["content-type"].startswith("text/plain")
+    assert response.headers["x-profiled-status"] == "404"
+    assert "total" in server_timing(response)
+    assert profiler.instances[0].options == (0.001, "enabled")
+    assert not profiler.instances[0].running
+
+    response = await client.get("/api/genres", headers={**auth_headers, "X-Profile": "1"})
+    assert (response.text, response.headers["x-profiled-status"]) == ("<html>profile report</html>", "200")
+    assert response.headers["content-type"].startswith("text/html")
+    # La requête profilée reste comptée dans les métriques
+    metrics = (await client.get("/api/metrics")).text
+    assert 'route="/api/movies/{movie_id}",status="404"' in metrics
+
+
+async def test_profile_header_needs_an_admin(client, database, auth_headers, profiler, monkeypatch):
+    assert (await client.get("/api/genres", headers={"X-Profile": "text"})).headers["content-type"].startswith("application/json")
+    forged = {"Authorization": "Bearer not-a-token", "X-Profile": "text"}
+    assert (await client.get("/api/genres", headers=forged)).status_code == 200
+
+    await database.users.update_one({"username": "admin"}, {"$set": {"is_admin": False}})
+    server.auth_cache.invalidate_user("admin")
+    response = await client.get("/api/genres", headers={**auth_headers, "X-Profile": "text"})
+    assert "x-profiled-status" not in response.headers
+    assert profiler.instances == []
+
+    # Sans pyinstrument l'en-tête est ignoré
+    await database.users.update_one({"username": "admin"}, {"$set": {"is_admin": True}})
+    server.auth_cache.invalidate_user("admin")
+    monkeypatch.setattr(profiling, "Profiler", None)
+    assert "x-profiled-status" not in (await client.get("/api/genres", headers={**auth_headers, "X-Profile": "text"})).headers
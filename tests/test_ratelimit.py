@@ -0,0 +1,72 @@
+import httpx
+import pytest
+
+import server
+from ratelimit import MemoryBucketStore, RateLimiter, create_rate_limiter, parse_networks
+
+pytestmark = pytest.mark.anyio
+
+
+def scope(peer: str, forwarded=()) -> dict:
+    return {"client": (peer, 50000), "headers": [(b"x-forwarded-for", value.encode()) for value in forwarded]}
+
+
+def test_disabled_by_default(monkeypatch):
+    for name in ("RATE_LIMIT_ENABLED", "RATE_LIMIT_TRUSTED_PROXIES", "RATE_LIMIT_REDIS_URL", "CACHE_REDIS_URL"):
+        monkeypatch.delenv(name, raising=False)
+    limiter = create_rate_limiter()
+    assert not limiter.enabled
+    assert limiter.trusted_proxies == []
+
+    monkeypatch.setenv("RATE_LIMIT_ENABLED", "true")
+    monkeypatch.setenv("RATE_LIMIT_TRUSTED_PROXIES", "10.0.0.1, 172.16.0.0/12")
+    limiter = create_rate_limiter()
+    assert limiter.enabled
+    assert limiter.info()["trusted_proxies"] == ["10.0.0.1/32", "172.16.0.0/12"]
+
+
+@pytest.mark.parametrize("trusted, peer, forwarded, expected", [
+    # Sans liste de proxies, l'en-tête est ignoré
+    ("", "10.0.0.1", ["198.51.100.1"], "10.0.0.1"),
+    # Pair non fiable : impossible de choisir sa clé
+    ("10.0.0.1", "203.0.113.7", ["198.51.100.1"], "203.0.113.7"),
+    ("10.0.0.1", "10.0.0.1", ["198.51.100.1"], "198.51.100.1"),
+    # Entrées ajoutées par le client à gauche : seul le saut le plus à droite non fiable compte
+    ("10.0.0.1", "10.0.0.1", ["1.2.3.4, 198.51.100.1"], "198.51.100.1"),
+    ("10.0.0.1", "10.0.0.1", ["1.2.3.4", "198.51.100.1"], "198.51.100.1"),
+    ("10.0.0.1, 172.16.0.0/12", "172.20.0.3", ["1.2.3.4, 198.51.100.1, 172.16.5.4"], "198.51.100.1"),
+    ("10.0.0.1, 172.16.0.0/12", "10.0.0.1", ["172.16.5.4"], "172.16.5.4"),
+    ("10.0.0.1", "10.0.0.1", ["garbage"], "garbage"),
+    ("10.0.0.1", "10.0.0.1", [], "10.0.0.1"),
+])
+def test_client_key(trusted, peer, forwarded, expected):
+    limiter = RateLimiter(MemoryBucketStore(), {}, trusted_proxies=parse_networks(trusted))
+    assert limiter.client_key(scope(peer, forwarded)) == expected
+
+
+@pytest.fixture
+def limiter(monkeypatch, database):
+    limiter = RateLimiter(MemoryBucketStore(), {"write": (0.001, 2), "search": (0.001, 2)}, True, parse_networks("10.0.0.1"))
+    monkeypatch.setattr(server.rate_limiter, "store", limiter.store)
+    monkeypatch.setattr(server.rate_limiter, "rules", limiter.rules)
+    monkeypatch.setattr(server.rate_limiter, "trusted_proxies", limiter.trusted_proxies)
+    monkeypatch.setattr(server.rate_limiter, "enabled", True)
+    return server.rate_limiter
+
+
+async def statuses(peer: str, count: int, forwarded=None) -> list:
+    transport = httpx.ASGITransport(app=server.app, client=(peer, 50000))
+    headers = {"X-Forwarded-For": forwarded} if forwarded else {}
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as http_client:
+        return [(await http_client.post("/api/auth/login", json={}, headers=headers)).status_code for _ in range(count)]
+
+
+async def test_clients_behind_a_trusted_proxy_get_their_own_bucket(limiter):
+    assert await statuses("10.0.0.1", 3, "198.51.100.1") == [422, 422, 429]
+    assert await statuses("10.0.0.1", 2, "198.51.100.2") == [422, 422]
+
+
+async def test_spoofed_header_from_an_untrusted_peer_is_ignored(limiter):
+    assert await statuses("203.0.113.7", 2, "198.51.100.1") == [422, 422]
+    # Un autre X-Forwarded-For ne donne pas un nouveau seau
+    assert await statuses("203.0.113.7", 1, "198.51.100.9") == [429]
@@ -0,0 +1,94 @@
+import pytest
+
+import server
+
+pytestmark = pytest.mark.anyio
+
+
+async def create(client, auth_headers, path: str, **body) -> dict:
+    response = await client.post(f"/api/{path}", json=body, headers=auth_headers)
+    response.raise_for_status()
+    return response.json()
+
+
+async def dangling(database) -> list:
+    # Références vers des documents absents, pour tous les champs de liens
+    found = []
+    for collection, field, target in server.REFERENCE_FIELDS:
+        existing = set(await database[target].distinct("id"))
+        async for doc in database[collection].find({}, {"id": 1, field: 1}):
+            found += [(collection, doc["id"], ref) for ref in doc.get(field, []) if ref not in existing]
+    return found
+
+
+async def assert_link_counters(database):
+    async for movie in database.movies.find({}):
+        assert movie.get("actor_count", 0) == len(movie.get("actors", [])), movie["id"]
+    async for actor in database.actors.find({}):
+        assert actor.get("movie_count", 0) == len(actor.get("movies", [])), actor["id"]
+
+
+async def test_compaction_removes_ghost_references(client, database, auth_headers):
+    actors = [await create(client, auth_headers, "actors", name=f"Actor {i}") for i in range(3)]
+    genre = await create(client, auth_headers, "genres", name="Noir", type="movie")
+    movies = [
+        await create(client, auth_headers, "movies", title=f"Movie {i}", actors=[actor["id"] for actor in actors], genres=[genre["id"]])
+        for i in range(3)
+    ]
+    # Fantômes : documents supprimés sans passer par l'API
+    await database.actors.delete_one({"id": actors[0]["id"]})
+    await database.genres.delete_one({"id": genre["id"]})
+    await database.movies.update_one({"id": movies[0]["id"]}, {"$push": {"actors": "ghost"}, "$inc": {"actor_count": 1}})
+    assert len(await dangling(database)) == 7
+
+    # Lots de 2 : la pagination sur _id est parcourue
+    status = await server.compact_references(database, batch_size=2)
+    assert await dangling(database) == []
+    await assert_link_counters(database)
+    assert status["running"] is False and status["error"] is None
+    # Films d'exemple parcourus aussi, seuls les trois films liés sont modifiés
+    assert {key: status["fields"]["movies.actors"][key] for key in ("updated", "removed")} == {"updated": 3, "removed": 4}
+    assert {key: status["fields"]["movies.genres"][key] for key in ("updated", "removed")} == {"updated": 3, "removed": 3}
+    assert status["fields"]["actors.movies"]["removed"] == 0
+
+    kept = await database.movies.find_one({"id": movies[0]["id"]})
+    assert kept["actors"] == [actors[1]["id"], actors[2]["id"]]
+    assert kept["actor_count"] == 2
+    # Déjà compacté : rien à retirer
+    again = await server.compact_references(database)
+    assert all(counters["removed"] == 0 for counters in again["fields"].values())
+
+
+async def test_compaction_endpoint(client, database, auth_headers):
+    actor = await create(client, auth_headers, "actors", name="Ghost")
+    movie = await create(client, auth_headers, "movies", title="Haunted", actors=[actor["id"]])
+    await database.actors.delete_one({"id": actor["id"]})
+    listed = (await client.get(f"/api/movies/{movie['id']}")).json()
+    assert listed["actors"] == [actor["id"]]
+
+    started = await client.post("/api/admin/compact-references", headers=auth_headers)
+    assert started.status_code == 202
+    await server._compaction_task
+    status = (await client.get("/api/admin/compact-references", headers=auth_headers)).json()
+    assert status["fields"]["movies.actors"]["removed"] == 1
+    # Le cache est invalidé : la lecture suivante voit la référence retirée
+    assert (await client.get(f"/api/movies/{movie['id']}")).json()["actors"] == []
+
+
+async def test_deletes_leave_no_dangling_ids(client, database, auth_headers):
+    actors = [await create(client, auth_headers, "actors", name=f"Actor {i}") for i in range(2)]
+    genres = [await create(client, auth_headers, "genres", name=f"Genre {i}", type="movie") for i in range(2)]
+    ids = {"actors": [actor["id"] for actor in actors], "genres": [genre["id"] for genre in genres]}
+    movies = [await create(client, auth_headers, "movies", title=f"Movie {i}", **ids) for i in range(2)]
+    (await client.put(f"/api/actors/{actors[1]['id']}", json={"name": "Actor 1", "genres": ids["genres"], "movies": [movie["id"] for movie in movies]}, headers=auth_headers)).raise_for_status()
+
+    for path in (f"actors/{actors[0]['id']}", f"genres/{genres[0]['id']}", f"movies/{movies[0]['id']}"):
+        response = await client.delete(f"/api/{path}", headers=auth_headers)
+        assert response.status_code == 200, path
+        assert await dangling(database) == [], path
+        await assert_link_counters(database)
+
+    remaining = await database.movies.find_one({"id": movies[1]["id"]})
+    assert (remaining["actors"], remaining["genres"]) == ([actors[1]["id"]], [genres[1]["id"]])
+    actor = await database.actors.find_one({"id": actors[1]["id"]})
+    assert (actor["movies"], actor["genres"]) == ([movies[1]["id"]], [genres[1]["id"]])
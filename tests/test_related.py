@@ -0,0 +1,129 @@
+import random
+
+import pytest
+
+import server
+from related import RelatedIndexes, SimilarityIndex
+
+pytestmark = pytest.mark.anyio
+
+WEIGHTS = {"actors": 1.0, "genres": 0.5}
+POOLS = {"actors": [f"a{i}" for i in range(12)], "genres": [f"g{i}" for i in range(5)]}
+
+
+def random_features(rng: random.Random) -> dict:
+    return {kind: rng.sample(pool, rng.randint(0, 4)) for kind, pool in POOLS.items()}
+
+
+def referrers(index: SimilarityIndex) -> dict:
+    return {item_id: listed for item_id, listed in index.referrers.items() if listed}
+
+
+@pytest.mark.parametrize("require", [None, "actors"])
+@pytest.mark.parametrize("seed", [1, 7, 42])
+def test_incremental_updates_match_a_full_rebuild(require, seed):
+    rng = random.Random(seed)
+    # top_k réduit : les évictions et réintégrations des listes sont exercées
+    incremental = SimilarityIndex(WEIGHTS, top_k=3, require=require)
+    items = {}
+    for step in range(400):
+        ids = sorted(items)
+        draw = rng.random()
+        if draw < 0.2 and ids:
+            item_id = rng.choice(ids)
+            del items[item_id]
+            incremental.remove(item_id)
+        else:
+            item_id = rng.choice(ids) if draw < 0.6 and ids else f"m{step:03d}"
+            items[item_id] = random_features(rng)
+            incremental.update(item_id, items[item_id], {"id": item_id})
+
+    rebuilt = SimilarityIndex(WEIGHTS, top_k=3, require=require)
+    rebuilt.rebuild([(item_id, features, {"id": item_id}) for item_id, features in items.items()], block_size=4)
+    assert set(incremental.features) == set(rebuilt.features) == set(items)
+    for item_id in items:
+        assert incremental.related(item_id, 3) == rebuilt.related(item_id, 3), item_id
+    assert referrers(incremental) == referrers(rebuilt)
+    assert incremental.sizes == rebuilt.sizes
+
+
+def test_remove_unknown_item_is_a_no_op():
+    index = SimilarityIndex(WEIGHTS, top_k=3)
+    index.update("m1", {"actors": ["a1"]}, {"id": "m1"})
+    index.remove("unknown")
+    assert len(index) == 1 and index.related("m1", 3) == []
+
+
+@pytest.fixture
+def related(monkeypatch):
+    # Index neuf par test : la construction est déclenchée à la main, sans lifespan
+    indexes = RelatedIndexes(server.related.specs, top_k=server.related.top_k, decode=server.related.decode)
+    monkeypatch.setattr(server, "related", indexes)
+    return indexes
+
+
+def shares(item: dict, other: dict, kinds) -> dict:
+    return {kind: len(set(item.get(kind) or []) & set(other.get(kind) or [])) for kind in kinds}
+
+
+async def test_related_movies_endpoint(client, database, sample_data, related, auth_headers):
+    movie = await database.movies.find_one({"actors.0": {"$exists": True}})
+    assert (await client.get(f"/api/movies/{movie['id']}/related")).status_code == 503
+    await related.rebuild(database)
+
+    response = await client.get(f"/api/movies/{movie['id']}/related")
+    assert response.status_code == 200
+    items = response.json()
+    assert items and movie["id"] not in {item["id"] for item in items}
+    assert [item["score"] for item in items] == sorted((item["score"] for item in items), reverse=True)
+    for item in items:
+        assert {"id", "title", "image", "image_settings", "score", "shared"} <= set(item)
+        other = await database.movies.find_one({"id": item["id"]})
+        counts = shares(movie, other, ("actors", "genres"))
+        assert item["shared"] == {kind: count for kind, count in counts.items() if count}
+        assert 0 < item["score"] <= 1
+
+    limited = (await client.get(f"/api/movies/{movie['id']}/related", params={"limit": 1})).json()
+    assert limited == items[:1]
+    not_found = await client.get("/api/movies/unknown/related")
+    assert (not_found.status_code, not_found.json()["detail"]) == (404, "Movie not found")
+
+    # Un film aux mêmes liens devient le plus proche une fois l'index rafraîchi
+    twin = (await client.post("/api/movies", json={
+        "title": "Twin", "actors": movie["actors"], "genres": movie.get("genres", [])
+    }, headers=auth_headers)).json()
+    await related.refresh(database, "movies", [twin["id"]])
+    first = (await client.get(f"/api/movies/{movie['id']}/related")).json()[0]
+    assert (first["id"], first["title"], first["score"]) == (twin["id"], "Twin", 1.0)
+
+    await client.delete(f"/api/movies/{twin['id']}", headers=auth_headers)
+    await related.refresh(database, "movies", [twin["id"]])
+    assert (await client.get(f"/api/movies/{movie['id']}/related")).json() == items
+    assert (await client.get(f"/api/movies/{twin['id']}/related")).status_code == 404
+
+
+async def test_actor_costars_endpoint(client, database, sample_data, related, auth_headers):
+    actors = sorted([doc["id"] async for doc in database.actors.find({}, {"id": 1})])
+    assert (await client.get(f"/api/actors/{actors[0]}/costars")).status_code == 503
+    # Les acteurs d'exemple n'ont aucun film en commun
+    (await client.post("/api/movies", json={"title": "Ensemble", "actors": actors[:2]}, headers=auth_headers)).raise_for_status()
+    await related.rebuild(database)
+
+    docs = {doc["id"]: doc for doc in await database.actors.find({}).to_list(None)}
+    for actor_id, actor in docs.items():
+        response = await client.get(f"/api/actors/{actor_id}/costars", params={"limit": 100})
+        assert response.status_code == 200
+        for costar in response.json():
+            # Partenaire : au moins un film en commun, pas seulement un genre
+            shared = shares(actor, docs[costar["id"]], ("movies", "genres"))
+            assert shared["movies"] > 0
+            assert costar["shared"] == {kind: count for kind, count in shared.items() if count}
+            assert {"id", "name", "image", "image_settings", "score"} <= set(costar)
+
+    costars = (await client.get(f"/api/actors/{actors[0]}/costars")).json()
+    assert [costar["id"] for costar in costars] == [actors[1]]
+    assert costars[0]["name"] == docs[actors[1]]["name"]
+    assert (await client.get(f"/api/actors/{actors[2]}/costars")).json() == []
+
+    not_found = await client.get("/api/actors/unknown/costars")
+    assert (not_found.status_code, not_found.json()["detail"]) == (404, "Actor not found")
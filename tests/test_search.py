@@ -0,0 +1,85 @@
+from datetime import datetime, timezone
+
+import pytest
+
+import server
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.mark.parametrize("limit", [0, -1, 101])
+async def test_search_rejects_out_of_range_limit(client, limit):
+    assert (await client.get("/api/search", params={"q": "inception", "limit": limit})).status_code == 422
+
+
+async def test_search_without_tokens_skips_the_database(client):
+    response = await client.get("/api/search", params={"q": "!!", "limit": 100})
+    assert response.status_code == 200
+    assert response.json() == {"movies": [], "actors": []}
+
+
+def test_search_keys_fold_accents_and_prefix_titles():
+    keys = server.build_search_keys("Comédie", "Une histoire")
+    assert {"c", "com", "comedie", "d:une", "d:histoire"} <= set(keys)
+    assert "d:comedie" not in keys
+
+
+async def create(client, auth_headers, path: str, **body) -> dict:
+    response = await client.post(f"/api/{path}", json=body, headers=auth_headers)
+    response.raise_for_status()
+    return response.json()
+
+
+async def search(client, q: str, **params) -> dict:
+    response = await client.get("/api/search", params={"q": q, **params})
+    assert response.status_code == 200, response.text
+    return {collection: [item["id"] for item in items] for collection, items in response.json().items()}
+
+
+async def test_search_folds_accents_and_case(client, auth_headers):
+    movie = await create(client, auth_headers, "movies", title="Le Fabuleux Destin d'Amélie Poulain")
+    actor = await create(client, auth_headers, "actors", name="Audrey Tautou", description="Révélée par Amélie")
+    for q in ("amelie", "AMÉLIE", "Amélie"):
+        assert await search(client, q) == {"movies": [movie["id"]], "actors": [actor["id"]]}, q
+    assert (await search(client, "fabuleux destin"))["movies"] == [movie["id"]]
+
+
+async def test_search_matches_title_prefixes_but_whole_description_words(client, auth_headers):
+    movie = await create(client, auth_headers, "movies", title="Interstellar", description="Voyage spatial")
+    assert (await search(client, "inter"))["movies"] == [movie["id"]]
+    assert (await search(client, "voyage"))["movies"] == [movie["id"]]
+    # Pas de préfixes dans la description
+    assert (await search(client, "voya"))["movies"] == []
+    # Tous les mots de la requête doivent correspondre
+    assert (await search(client, "inter voyage"))["movies"] == [movie["id"]]
+    assert (await search(client, "inter nowhere"))["movies"] == []
+
+
+async def test_search_ranks_title_matches_first(client, database, auth_headers):
+    described = await create(client, auth_headers, "movies", title="Midnight", description="Une nuit à Paris")
+    titled = await create(client, auth_headers, "movies", title="Paris, Texas")
+    both = await create(client, auth_headers, "movies", title="Paris Blues", description="Jazz à Paris")
+    newer = await create(client, auth_headers, "movies", title="Paris Je T'aime")
+    # Dates distinctes : deux créations peuvent tomber dans la même milliseconde
+    for day, movie in enumerate((described, titled, both, newer), start=1):
+        await database.movies.update_one({"id": movie["id"]}, {"$set": {"created_at": datetime(2024, 1, day, tzinfo=timezone.utc)}})
+    await server.cache.invalidate("movies")
+
+    # Titre (poids 10) avant description (poids 1) ; à score égal, le plus récent d'abord
+    assert (await search(client, "paris"))["movies"] == [both["id"], newer["id"], titled["id"], described["id"]]
+    assert (await search(client, "paris", limit=2))["movies"] == [both["id"], newer["id"]]
+
+
+async def test_search_type_filter(client, auth_headers):
+    movie = await create(client, auth_headers, "movies", title="Matrix")
+    actor = await create(client, auth_headers, "actors", name="Matrix Fan")
+    assert await search(client, "matrix", type="movies") == {"movies": [movie["id"]], "actors": []}
+    assert await search(client, "matrix", type="actors") == {"movies": [], "actors": [actor["id"]]}
+    assert await search(client, "matrix") == {"movies": [movie["id"]], "actors": [actor["id"]]}
+
+
+async def test_search_follows_renames(client, auth_headers):
+    movie = await create(client, auth_headers, "movies", title="Working Title")
+    (await client.put(f"/api/movies/{movie['id']}", json={"title": "Final Cut"}, headers=auth_headers)).raise_for_status()
+    assert (await search(client, "working"))["movies"] == []
+    assert (await search(client, "final"))["movies"] == [movie["id"]]
@@ -0,0 +1,103 @@
+from datetime import datetime, timezone
+
+import pytest
+
+import server
+from storage import StorageCodec, migrate_storage
+
+pytestmark = pytest.mark.anyio
+
+CREATED = "2024-03-01T12:30:45.123000+00:00"
+
+
+@pytest.fixture
+def codec():
+    return StorageCodec(server.Movie)
+
+
+def test_encode_converts_iso_dates_and_omits_defaults(codec):
+    movie = server.Movie(title="Heat", actors=["a1"], duration=170).dict()
+    movie["created_at"] = CREATED
+    encoded = codec.encode(movie)
+
+    assert encoded["created_at"] == datetime(2024, 3, 1, 12, 30, 45, 123000, tzinfo=timezone.utc)
+    assert set(encoded) == {"id", "title", "actors", "genres", "duration", "created_at"}
+    # Les tableaux restent stockés même vides
+    assert encoded["genres"] == []
+    # Une date illisible est conservée telle quelle
+    assert codec.encode({"created_at": "yesterday"}) == {"created_at": "yesterday"}
+
+
+def test_decode_restores_defaults(codec):
+    movie = server.Movie(title="Heat", is_favorite=True).dict()
+    decoded = codec.decode(codec.encode(movie))
+    assert decoded == movie
+    assert server.Movie(**decoded) == server.Movie(**movie)
+
+    # Projection : seuls les champs demandés sont complétés
+    partial = codec.decode({"id": movie["id"], "title": "Heat"}, {"id": 1, "title": 1, "image_settings": 1, "duration": 1})
+    assert partial == {"id": movie["id"], "title": "Heat", "image_settings": movie["image_settings"], "duration": None}
+
+
+def test_public_docs_use_the_codec_defaults(codec, monkeypatch):
+    monkeypatch.setattr(server, "FAST_RESPONSES", True)
+    assert server.MODEL_CODECS[server.Movie] is server.CODECS["movies"]
+    # Une seule table : les tableaux sont restitués mais jamais omis à l'écriture
+    assert codec.defaults["actors"] == [] and "actors" not in codec.omitted
+    assert codec.omitted == {name: value for name, value in codec.defaults.items() if name not in ("actors", "genres")}
+    stored = {"_id": 1, "id": "m1", "title": "Heat", "created_at": datetime.fromisoformat(CREATED), "search_keys": ["heat"]}
+    served = server.public_docs([dict(stored)], server.Movie)[0]
+    # Chemin rapide : même résultat que la validation complète
+    assert served == {**codec.defaults, "id": "m1", "title": "Heat", "created_at": stored["created_at"]}
+    assert served == server.Movie(**stored).dict()
+
+
+def test_update_unsets_fields_back_to_their_default(codec):
+    update = codec.update({"title": "Heat", "duration": None, "is_favorite": False, "created_at": CREATED})
+    assert update == {
+        "$set": {"title": "Heat", "created_at": datetime.fromisoformat(CREATED)},
+        "$unset": {"duration": "", "is_favorite": ""},
+    }
+    assert codec.update({"is_favorite": False}) == {"$unset": {"is_favorite": ""}}
+    assert codec.update({"is_favorite": True}) == {"$set": {"is_favorite": True}}
+
+
+async def test_api_serves_native_dates_as_iso_strings(client, database, auth_headers):
+    created = (await client.post("/api/movies", json={"title": "Heat"}, headers=auth_headers)).json()
+    stored = await database.movies.find_one({"id": created["id"]})
+    assert isinstance(stored["created_at"], datetime)
+    assert "is_favorite" not in stored and "duration" not in stored
+
+    served = (await client.get(f"/api/movies/{created['id']}")).json()
+    # Date BSON : UTC explicite, précision à la milliseconde
+    assert served["created_at"].endswith("+00:00")
+    written = datetime.fromisoformat(created["created_at"])
+    assert datetime.fromisoformat(served["created_at"]) == written.replace(microsecond=written.microsecond // 1000 * 1000)
+    assert served["is_favorite"] is False and served["duration"] is None
+
+
+async def test_date_migration_is_idempotent(database, sample_data):
+    await database.movies.insert_many([
+        {"id": "legacy-1", "title": "Legacy", "actors": [], "genres": [], "created_at": CREATED, "is_favorite": False},
+        {"id": "legacy-2", "title": "Legacy", "actors": [], "genres": [], "created_at": "2023-12-31T23:00:00"},
+    ])
+    await database.actors.insert_one({"id": "legacy-3", "name": "Legacy", "movies": [], "genres": [], "created_at": CREATED})
+
+    first = await migrate_storage(database, server.CODECS, dates_only=True)
+    assert (first["movies"]["scanned"], first["movies"]["updated"]) == (2, 2)
+    assert first["actors"]["updated"] == 1
+    assert first["genres"]["updated"] == 0
+
+    legacy = await database.movies.find_one({"id": "legacy-1"})
+    assert legacy["created_at"] == datetime.fromisoformat(CREATED)
+    # dates_only ne touche qu'aux dates : le défaut explicite reste en place
+    assert legacy["is_favorite"] is False
+
+    second = await migrate_storage(database, server.CODECS, dates_only=True)
+    assert all(report["scanned"] == report["updated"] == 0 for report in second.values())
+
+    # Migration complète ensuite : les défauts sont retirés, une seule fois
+    full = await migrate_storage(database, server.CODECS)
+    assert full["movies"]["updated"] == 1
+    assert "is_favorite" not in await database.movies.find_one({"id": "legacy-1"})
+    assert all(report["updated"] == 0 for report in (await migrate_storage(database, server.CODECS)).values())